@@ -9,6 +9,10 @@ stocks = [
     ("002475", "lixunjingmi")
 ]
 
+# Also append the latest 1-minute bars to the intraday store (utils/minute_store.py).
+# Eastmoney only serves the last few sessions of minute data, so run this every trading day.
+PULL_MINUTE_BARS = False
+
 for code, name in stocks:
     # Get stock data
     stock_data = ak.stock_zh_a_hist(symbol=code,
@@ -25,4 +29,12 @@ for code, name in stocks:
     # Save to CSV
     filename = f"{name}_{code}_history.csv"
     stock_data.to_csv(filename, index=False, encoding='utf-8-sig')
-    print(f"{name} data saved to {filename}")
\ No newline at end of file
+    print(f"{name} data saved to {filename}")
+
+if PULL_MINUTE_BARS:
+    from utils.minute_store import append_bars, store_root
+    for code, name in stocks:
+        # unadjusted: a qfq series is re-based after every dividend, which an append-only store cannot follow
+        minute_data = ak.stock_zh_a_hist_min_em(symbol=code, period="1", adjust="")
+        written = append_bars(code, minute_data)
+        print(f"{name}: {written} new minute bars appended to {store_root()}")
@@ -2,14 +2,19 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-from sections.sidebar import render_sidebar
+from sections.sidebar import render_sidebar, render_performance_panel
 from sections.stock_charts import render_stock_charts
 from sections.returns_analysis import render_returns_analysis
 from sections.correlation_analysis import render_correlation_analysis
 from sections.portfolio_optimization import render_portfolio_optimization
 from sections.portfolio_selection import render_portfolio_selection
 from sections.garch_model import render_garch_model
+from sections.stress_testing import render_stress_testing
+from sections.bulk_evaluation import render_bulk_evaluation
+from sections.market_replay import render_market_replay
+from sections.screener import render_screener
 from utils.data_loader import load_stock_data
+from utils.profiling import profiled, profile_stage, cache_probe, start_profiling_run
 
 # Set page configuration
 st.set_page_config(
@@ -19,11 +24,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-def portfolio_performance(weights, mean_returns, cov_matrix):
-    returns = np.sum(weights * mean_returns)
-    std = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))
-    return std, returns
-
+@profiled()
 def render_project_background():
     st.header("Project Background")
     try:
@@ -33,6 +34,7 @@ def render_project_background():
     except FileNotFoundError:
         st.error("Project background file not found.")
 
+@profiled()
 def render_stock_overview(stocks):
     st.subheader("1. Stock Overview")
     st.write("Basic information about the loaded stock data.")
@@ -55,92 +57,28 @@ def render_stock_overview(stocks):
         for code, df in stocks.items():
             st.write(f"{code}: {len(df):,} records")
 
+def screened_universe(stocks):
+    codes = [code for code in st.session_state.get('screened_codes') or [] if code in stocks]
+    if len(codes) < 2:
+        return stocks
+    return {code: stocks[code] for code in codes}
+
+def optimized_universe(stocks):
+    # the stocks the stored optimization results were computed on
+    codes = st.session_state.portfolio_results.get('codes')
+    if codes is None:
+        return stocks
+    return {code: stocks[code] for code in codes}
+
 def render_portfolio_optimization_section(stocks):
-    st.subheader("5. Portfolio Optimization")
-    st.write("This section constructs optimal portfolios considering risk-return trade-offs using Modern Portfolio Theory.")
-    
-    # Calculate returns data
-    returns_data = pd.DataFrame()
-    for code, df in stocks.items():
-        returns_data[code] = df['Returns']
-    
-    # Calculate portfolio statistics
-    mean_returns = returns_data.mean() * 252
-    cov_matrix = returns_data.cov() * 252
-    
-    # Generate random portfolios
-    num_portfolios = 10000
-    results = np.zeros((3, num_portfolios))
-    weight_list = []
-    
-    for i in range(num_portfolios):
-        weights = np.random.random(len(stocks))
-        weights /= np.sum(weights)
-        weight_list.append(weights)
-        
-        portfolio_std, portfolio_return = portfolio_performance(weights, mean_returns, cov_matrix)
-        results[0,i] = portfolio_std
-        results[1,i] = portfolio_return
-        results[2,i] = portfolio_return / portfolio_std
-    
-    # Convert to DataFrame
-    results_df = pd.DataFrame(results.T, columns=['Volatility', 'Return', 'Sharpe'])
-    weights_df = pd.DataFrame(weight_list, columns=list(stocks.keys()))
-    
-    # Find optimal portfolios
-    max_sharpe_idx = results_df['Sharpe'].idxmax()
-    min_vol_idx = results_df['Volatility'].idxmin()
-    
-    # Plot efficient frontier
-    fig_frontier = go.Figure()
-    
-    # Scatter plot of all portfolios
-    fig_frontier.add_trace(go.Scatter(
-        x=results_df['Volatility'],
-        y=results_df['Return'],
-        mode='markers',
-        marker=dict(
-            size=3,
-            color=results_df['Sharpe'],
-            colorscale='Viridis',
-            showscale=True,
-            colorbar=dict(title="Sharpe Ratio")
-        ),
-        name='Random Portfolios'
-    ))
-    
-    # Mark optimal portfolios
-    fig_frontier.add_trace(go.Scatter(
-        x=[results_df.loc[max_sharpe_idx, 'Volatility']],
-        y=[results_df.loc[max_sharpe_idx, 'Return']],
-        mode='markers',
-        marker=dict(size=10, color='gold', symbol='star'),
-        name='Max Sharpe Ratio'
-    ))
-    
-    fig_frontier.add_trace(go.Scatter(
-        x=[results_df.loc[min_vol_idx, 'Volatility']],
-        y=[results_df.loc[min_vol_idx, 'Return']],
-        mode='markers',
-        marker=dict(size=10, color='red', symbol='x'),
-        name='Min Volatility'
-    ))
+    universe = screened_universe(stocks)
+    if len(universe) < len(stocks):
+        st.info(f"Optimizing the {len(universe)} stocks selected in the Stock Screener.")
+    results_df, weight_list, max_sharpe_idx, min_vol_idx, mean_returns, cov_matrix = render_portfolio_optimization(universe)
     
-    fig_frontier.update_layout(
-        title="Efficient Frontier - Portfolio Optimization",
-        xaxis_title="Annualized Volatility",
-        yaxis_title="Annualized Return",
-        height=400,
-        showlegend=True
-    )
-    
-    st.plotly_chart(fig_frontier, use_container_width=True)
-    
-    st.info("""
-    **Efficient Frontier Analysis**:
-    - **Minimum Volatility Portfolio**: Located at the far left of the efficient frontier, lowest risk configuration
-    - **Maximum Sharpe Ratio Portfolio**: Optimal risk-return point, highest return per unit of risk
-    """)
+    if results_df is None:
+        st.session_state.pop('portfolio_results', None)
+        return
     
     # Store results in session state
     st.session_state.portfolio_results = {
@@ -149,9 +87,11 @@ def render_portfolio_optimization_section(stocks):
         'max_sharpe_idx': max_sharpe_idx,
         'min_vol_idx': min_vol_idx,
         'mean_returns': mean_returns,
-        'cov_matrix': cov_matrix
+        'cov_matrix': cov_matrix,
+        'codes': list(universe.keys())
     }
 
+@profiled()
 def render_portfolio_selection_section(stocks):
     st.subheader("6. Portfolio Selection")
     st.write("This section provides detailed analysis of optimal portfolio selection.")
@@ -164,8 +104,20 @@ def render_portfolio_selection_section(stocks):
     weight_list = st.session_state.portfolio_results['weight_list']
     max_sharpe_idx = st.session_state.portfolio_results['max_sharpe_idx']
     min_vol_idx = st.session_state.portfolio_results['min_vol_idx']
+    cov_matrix = st.session_state.portfolio_results.get('cov_matrix')
     
-    render_portfolio_selection(stocks, results_df, weight_list, max_sharpe_idx, min_vol_idx)
+    render_portfolio_selection(optimized_universe(stocks), results_df, weight_list, max_sharpe_idx, min_vol_idx, cov_matrix)
+
+@profiled()
+def render_stress_testing_section(stocks):
+    if 'portfolio_results' not in st.session_state:
+        st.header("7. Stress Testing")
+        st.warning("Please run Portfolio Optimization first to get optimal portfolios.")
+        return
+    
+    results = st.session_state.portfolio_results
+    render_stress_testing(optimized_universe(stocks), results['results_df'], results['weight_list'],
+                          results['max_sharpe_idx'], results['min_vol_idx'])
 
 def render_technical_analysis(stocks):
     st.header("Technical Analysis")
@@ -177,7 +129,11 @@ def render_technical_analysis(stocks):
         "Returns Analysis": "3. Returns Analysis",
         "Correlation Analysis": "4. Correlation Analysis",
         "Portfolio Optimization": "5. Portfolio Optimization",
-        "Portfolio Selection": "6. Portfolio Selection"
+        "Portfolio Selection": "6. Portfolio Selection",
+        "Stress Testing": "7. Stress Testing",
+        "Bulk Portfolio Evaluation": "8. Bulk Portfolio Evaluation",
+        "Market Replay": "9. Market Replay",
+        "Stock Screener": "10. Stock Screener"
     }
     
     selected_analysis = st.selectbox(
@@ -198,7 +154,16 @@ def render_technical_analysis(stocks):
         render_portfolio_optimization_section(stocks)
     elif selected_analysis == "Portfolio Selection":
         render_portfolio_selection_section(stocks)
+    elif selected_analysis == "Stress Testing":
+        render_stress_testing_section(stocks)
+    elif selected_analysis == "Bulk Portfolio Evaluation":
+        render_bulk_evaluation(stocks)
+    elif selected_analysis == "Market Replay":
+        render_market_replay(stocks)
+    elif selected_analysis == "Stock Screener":
+        render_screener(stocks)
 
+@profiled()
 def render_conclusions():
     st.header("Conclusions and Recommendations")
     
@@ -243,7 +208,10 @@ def render_conclusions():
 
 def main():
     selected_module = render_sidebar()
-    stocks = load_stock_data()
+    start_profiling_run()
+    
+    with cache_probe("load_stock_data"), profile_stage("load_stock_data"):
+        stocks = load_stock_data(st.session_state.get('compact_memory', False))
     
     if not stocks:
         st.error("No stock data loaded. Please check file paths and formats.")
@@ -257,6 +225,8 @@ def main():
         render_technical_analysis(stocks)
     elif selected_module == "Conclusions":
         render_conclusions()
+    
+    render_performance_panel(stocks)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
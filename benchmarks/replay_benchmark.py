@@ -0,0 +1,37 @@
+# Replays one synthetic session of 1-minute bars through the streaming risk model and
+# prints per-update latency percentiles. Run from the repository root:
+#   python benchmarks/replay_benchmark.py --tickers 1000
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.replay import synthetic_feed, take_warmup, start_replay, replay, latency_summary, MINUTES_PER_SESSION
+from utils.rng import DEFAULT_SEED
+
+
+def replay_benchmark(n_tickers=1000, n_bars=MINUTES_PER_SESSION, warmup=60, seed=DEFAULT_SEED):
+    codes = [f"S{j:04d}" for j in range(n_tickers)]
+    feed = synthetic_feed(codes, warmup + n_bars, seed)
+    state = start_replay(take_warmup(feed, warmup), np.full(n_tickers, 1 / n_tickers),
+                         periods_per_year=252 * MINUTES_PER_SESSION)
+    for _ in replay(feed, state):
+        pass
+    return latency_summary(state['latencies'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Streaming replay latency benchmark")
+    parser.add_argument('--tickers', type=int, default=1000)
+    parser.add_argument('--bars', type=int, default=MINUTES_PER_SESSION)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+    summary = replay_benchmark(args.tickers, args.bars, args.warmup, args.seed)
+    print(pd.Series(summary).to_string())
+    if summary['Bar Budget Used (P99)'] >= 1:
+        sys.exit("Updates do not keep up with 1-minute bars")
@@ -0,0 +1,83 @@
+import streamlit as st
+import numpy as np
+from utils.profiling import profiled, profile_stage
+from utils.data_loader import get_returns_matrix
+from utils.bulk_evaluation import evaluate_portfolio_file, weight_template, CHUNK_ROWS
+
+@profiled()
+def render_bulk_evaluation(stocks):
+    st.header("8. Bulk Portfolio Evaluation")
+    st.write("Upload a file of portfolios (one row per portfolio, one column per stock code) to score them all at once.")
+    
+    returns_data = get_returns_matrix(stocks)
+    codes = list(returns_data.columns)
+    mean_returns = returns_data.mean() * 252
+    cov_matrix = returns_data.cov() * 252
+    
+    optimization = st.session_state.get('portfolio_results')
+    if optimization is not None and optimization.get('codes', codes) != codes:
+        # results from a screened subset do not line up with the full universe
+        optimization = None
+    covariance_source = "Sample Covariance"
+    if optimization is not None and optimization.get('cov_matrix') is not None:
+        covariance_source = st.radio("Covariance:", ["Sample Covariance", "Portfolio Optimization Model"], horizontal=True)
+        if covariance_source == "Portfolio Optimization Model":
+            cov_matrix = optimization['cov_matrix']
+    
+    example = optimization['weight_list'][optimization['max_sharpe_idx']] if optimization is not None else None
+    st.download_button("Download Template (CSV)", weight_template(codes, example),
+                       file_name="portfolio_template.csv", mime="text/csv")
+    
+    uploaded = st.file_uploader("Portfolio weights", type=['csv', 'parquet'])
+    
+    with st.expander("Evaluation Settings", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            confidence = st.slider("VaR confidence (%)", 90, 99, 95) / 100
+            chunk_rows = st.number_input("Rows per chunk", min_value=100, max_value=100000, value=CHUNK_ROWS, step=100)
+        with col2:
+            include_contributions = st.checkbox("Include every stock's risk contribution", value=False)
+    
+    if uploaded is None:
+        st.info("Columns must be stock codes (e.g. 000063); an optional first column named 'portfolio' holds the portfolio id. "
+                "Weights for codes outside the loaded universe are reported as unmapped.")
+        return
+    
+    file_format = 'parquet' if uploaded.name.lower().endswith('.parquet') else 'csv'
+    try:
+        with st.spinner("Evaluating portfolios..."), profile_stage("bulk_evaluation"):
+            results = evaluate_portfolio_file(uploaded, mean_returns, cov_matrix, returns_data,
+                                              file_format=file_format, chunk_rows=int(chunk_rows),
+                                              confidence=confidence, include_contributions=include_contributions)
+    except (ValueError, ImportError) as e:
+        st.error(f"Could not evaluate the file: {e}")
+        return
+    
+    st.subheader("Results")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Portfolios", f"{len(results):,}")
+    with col2:
+        st.metric("Median Sharpe Ratio", f"{results['Sharpe Ratio'].median():.2f}")
+    with col3:
+        st.metric(f"Worst Parametric VaR {confidence:.0%}", f"{results[f'Parametric VaR {confidence:.0%}'].max():.2%}")
+    
+    if (np.abs(results['Gross Weight'] - 1) > 1e-6).any():
+        st.warning("Some portfolios do not sum to 100%; they are evaluated as given, without rescaling.")
+    if (results['Unmapped Weight'] != 0).any():
+        st.warning("Some portfolios hold codes outside the loaded universe; that weight is excluded from the risk figures.")
+    
+    st.dataframe(results.head(1000), use_container_width=True)
+    if len(results) > 1000:
+        st.caption(f"Showing the first 1,000 of {len(results):,} portfolios; the download contains all of them.")
+    
+    st.download_button("Download Results (CSV)", results.to_csv(index=False).encode('utf-8'),
+                       file_name="portfolio_evaluation.csv", mime="text/csv")
+    
+    st.info(f"""
+    **Evaluation Metrics**:
+    - **Expected Return / Volatility / Sharpe Ratio**: Annualized, from the selected covariance ({covariance_source})
+    - **Parametric VaR**: One-day loss not exceeded with {confidence:.0%} confidence under a normal distribution
+    - **Historical VaR**: The same quantile of the portfolio's own daily returns over the loaded history, using only sessions where every held stock traded (VaR Sessions counts them)
+    - **Top Risk Contributor**: Stock with the largest share of portfolio variance
+    """)
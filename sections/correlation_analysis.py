@@ -2,101 +2,139 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from utils.profiling import profiled, profile_stage
+from utils.data_loader import get_returns_matrix
+from utils.figure_cache import cached_image
 
+def compute_correlation_matrix(returns_data):
+    # pairwise-complete correlation (same result as DataFrame.corr) built from
+    # matrix products, so thousands of tickers take BLAS time instead of a pairwise loop
+    values = returns_data.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    x = np.where(mask, values, 0.0)
+    m = mask.astype(float)
+    
+    n = m.T @ m
+    sum_x = x.T @ m
+    sum_xx = (x * x).T @ m
+    sum_xy = x.T @ x
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = sum_x / n
+        mean_y = sum_x.T / n
+        cov = sum_xy / n - mean_x * mean_y
+        var_x = sum_xx / n - mean_x**2
+        var_y = sum_xx.T / n - mean_y**2
+        corr = cov / np.sqrt(var_x * var_y)
+    
+    corr[n < 2] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr, index=returns_data.columns, columns=returns_data.columns)
+
+def correlation_heatmap(corr_matrix):
+    fig, ax = plt.subplots(figsize=(2.5, 2.5))
+    im = ax.imshow(corr_matrix.values, cmap='RdBu_r', vmin=-1, vmax=1)
+    
+    ax.set_xticks(np.arange(len(corr_matrix.columns)))
+    ax.set_yticks(np.arange(len(corr_matrix.index)))
+    ax.set_xticklabels(corr_matrix.columns, fontsize=7)
+    ax.set_yticklabels(corr_matrix.index, fontsize=7)
+    
+    plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    
+    for i in range(len(corr_matrix.index)):
+        for j in range(len(corr_matrix.columns)):
+            text = ax.text(j, i, f"{corr_matrix.iloc[i, j]:.2f}",
+                          ha="center", va="center", color="black" if abs(corr_matrix.iloc[i, j]) < 0.7 else "white",
+                          fontsize=6)
+    
+    cbar = ax.figure.colorbar(im, ax=ax, shrink=0.7)
+    cbar.ax.tick_params(labelsize=6)
+    
+    ax.set_title("Correlation Matrix", fontsize=8)
+    plt.tight_layout()
+    return fig
+
+def correlation_histogram(corr_matrix):
+    corr_values = []
+    for i in range(len(corr_matrix.columns)):
+        for j in range(i+1, len(corr_matrix.columns)):
+            corr_values.append(corr_matrix.iloc[i, j])
+    
+    fig_hist, ax_hist = plt.subplots(figsize=(2.5, 2.5))
+    ax_hist.hist(corr_values, bins=15, color='skyblue', edgecolor='black', alpha=0.7)
+    ax_hist.axvline(x=0, color='red', linestyle='--', linewidth=1, label='Zero')
+    ax_hist.set_xlabel('Correlation', fontsize=7)
+    ax_hist.set_ylabel('Frequency', fontsize=7)
+    ax_hist.set_title('Correlation Distribution', fontsize=8)
+    ax_hist.legend(fontsize=6)
+    ax_hist.grid(True, alpha=0.3)
+    ax_hist.tick_params(axis='both', which='major', labelsize=6)
+    return fig_hist
+
+def average_correlation_bars(corr_matrix):
+    avg_correlations = []
+    for stock in corr_matrix.columns:
+        other_correlations = [corr_matrix.loc[stock, other] for other in corr_matrix.columns if other != stock]
+        avg_correlation = np.mean(other_correlations)
+        avg_correlations.append({
+            'Stock': stock,
+            'Average Correlation': avg_correlation
+        })
+    
+    avg_corr_df = pd.DataFrame(avg_correlations)
+    
+    fig_bar, ax_bar = plt.subplots(figsize=(2.5, 2.5))
+    bars = ax_bar.bar(avg_corr_df['Stock'], avg_corr_df['Average Correlation'], 
+                     color=['red' if x > 0.3 else 'blue' if x < -0.1 else 'gray' for x in avg_corr_df['Average Correlation']],
+                     width=0.6)
+    
+    ax_bar.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+    ax_bar.set_xlabel('Stocks', fontsize=7)
+    ax_bar.set_ylabel('Avg Correlation', fontsize=7)
+    ax_bar.set_title('Average Correlation', fontsize=8)
+    
+    for bar in bars:
+        height = bar.get_height()
+        ax_bar.text(bar.get_x() + bar.get_width()/2., height,
+                   f'{height:.2f}',
+                   ha='center', va='bottom' if height >= 0 else 'top',
+                   fontsize=5)
+    
+    plt.xticks(rotation=45, fontsize=6)
+    plt.yticks(fontsize=6)
+    plt.tight_layout()
+    return fig_bar
+
+@profiled()
 def render_correlation_analysis(stocks):
     st.header("4. Correlation Analysis")  
     st.write("This section examines correlation structure between different stocks.")
     
     # Calculate returns data
-    returns_data = pd.DataFrame()
-    for code, df in stocks.items():
-        returns_data[code] = df['Returns']
+    returns_data = get_returns_matrix(stocks)
     
     # Calculate correlation matrix
-    corr_matrix = returns_data.corr()
+    with profile_stage("correlation_matrix"):
+        corr_matrix = compute_correlation_matrix(returns_data)
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.subheader("Correlation Heatmap")
         
-        fig, ax = plt.subplots(figsize=(2.5, 2.5))
-        im = ax.imshow(corr_matrix.values, cmap='RdBu_r', vmin=-1, vmax=1)
-        
-        ax.set_xticks(np.arange(len(corr_matrix.columns)))
-        ax.set_yticks(np.arange(len(corr_matrix.index)))
-        ax.set_xticklabels(corr_matrix.columns, fontsize=7)
-        ax.set_yticklabels(corr_matrix.index, fontsize=7)
-        
-        plt.setp(ax.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
-        
-        for i in range(len(corr_matrix.index)):
-            for j in range(len(corr_matrix.columns)):
-                text = ax.text(j, i, f"{corr_matrix.iloc[i, j]:.2f}",
-                              ha="center", va="center", color="black" if abs(corr_matrix.iloc[i, j]) < 0.7 else "white",
-                              fontsize=6)
-        
-        cbar = ax.figure.colorbar(im, ax=ax, shrink=0.7)
-        cbar.ax.tick_params(labelsize=6)
-        
-        ax.set_title("Correlation Matrix", fontsize=8)
-        plt.tight_layout()
-        st.pyplot(fig)
+        st.image(cached_image("correlation_heatmap", correlation_heatmap, corr_matrix), use_container_width=True)
     
     with col2:
         st.subheader("Correlation Distribution")
         
-        corr_values = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                corr_values.append(corr_matrix.iloc[i, j])
-        
-        fig_hist, ax_hist = plt.subplots(figsize=(2.5, 2.5))
-        ax_hist.hist(corr_values, bins=15, color='skyblue', edgecolor='black', alpha=0.7)
-        ax_hist.axvline(x=0, color='red', linestyle='--', linewidth=1, label='Zero')
-        ax_hist.set_xlabel('Correlation', fontsize=7)
-        ax_hist.set_ylabel('Frequency', fontsize=7)
-        ax_hist.set_title('Correlation Distribution', fontsize=8)
-        ax_hist.legend(fontsize=6)
-        ax_hist.grid(True, alpha=0.3)
-        ax_hist.tick_params(axis='both', which='major', labelsize=6)
-        st.pyplot(fig_hist)
+        st.image(cached_image("correlation_histogram", correlation_histogram, corr_matrix), use_container_width=True)
     
     with col3:
         st.subheader("Average Correlation")
         
-        avg_correlations = []
-        for stock in corr_matrix.columns:
-            other_correlations = [corr_matrix.loc[stock, other] for other in corr_matrix.columns if other != stock]
-            avg_correlation = np.mean(other_correlations)
-            avg_correlations.append({
-                'Stock': stock,
-                'Average Correlation': avg_correlation
-            })
-        
-        avg_corr_df = pd.DataFrame(avg_correlations)
-        
-        fig_bar, ax_bar = plt.subplots(figsize=(2.5, 2.5))
-        bars = ax_bar.bar(avg_corr_df['Stock'], avg_corr_df['Average Correlation'], 
-                         color=['red' if x > 0.3 else 'blue' if x < -0.1 else 'gray' for x in avg_corr_df['Average Correlation']],
-                         width=0.6)
-        
-        ax_bar.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-        ax_bar.set_xlabel('Stocks', fontsize=7)
-        ax_bar.set_ylabel('Avg Correlation', fontsize=7)
-        ax_bar.set_title('Average Correlation', fontsize=8)
-        
-        for bar in bars:
-            height = bar.get_height()
-            ax_bar.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{height:.2f}',
-                       ha='center', va='bottom' if height >= 0 else 'top',
-                       fontsize=5)
-        
-        plt.xticks(rotation=45, fontsize=6)
-        plt.yticks(fontsize=6)
-        plt.tight_layout()
-        st.pyplot(fig_bar)
+        st.image(cached_image("average_correlation", average_correlation_bars, corr_matrix), use_container_width=True)
     
     st.subheader("Detailed Correlation Matrix")
     
@@ -4,11 +4,21 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from arch import arch_model
+from utils.profiling import profiled, profile_stage, cache_probe, mark_cache_miss
+from utils.dcc import fit_dcc, forecast_correlation, forecast_covariance, average_correlation_series
+from utils.garch_search import search_garch_specs, describe_spec, garch_persistence, EARLY_ITERATIONS
+from utils.forecast_surface import extract_forecast_inputs, build_forecast_surface, surface_frame, MAX_HORIZON
+from utils.data_loader import get_returns_matrix, get_realized_volatility, get_trading_calendar
+from utils.trading_calendar import align_series
+from utils.minute_store import REALIZED_ESTIMATORS
+from utils.rng import DEFAULT_SEED
+from utils.figure_cache import cached_plotly
 
-def fit_garch_models(returns_data):
+@profiled(kind="stage")
+def fit_garch_models(returns_data, search=False, criterion='aic', n_workers=1):
     garch_results = {}
-    volatilities = pd.DataFrame()
     failed_stocks = []
+    search_inputs = {}
     
     for stock in returns_data.columns:
         try:
@@ -26,6 +36,10 @@ def fit_garch_models(returns_data):
                 
             scaled_returns = returns * 100
             
+            if search:
+                search_inputs[stock] = scaled_returns
+                continue
+            
             model = arch_model(scaled_returns, vol='Garch', p=1, q=1, 
                              mean='Constant', dist='normal')
             
@@ -38,17 +52,181 @@ def fit_garch_models(returns_data):
                 continue
                 
             garch_results[stock] = result
-            volatilities[stock] = result.conditional_volatility / 100    #gain the volatility
             
         except Exception as e:
             st.warning(f"GARCH fitting failed for {stock}: {str(e)}")
             failed_stocks.append(stock)
     
+    if search_inputs:
+        with profile_stage("garch_spec_search"):
+            search_results, summaries, errors = search_garch_specs(search_inputs, criterion=criterion, n_workers=n_workers)
+        if summaries:
+            screened = sum(summary['candidates'] for summary in summaries.values())
+            pruned = sum(summary['pruned'] for summary in summaries.values())
+            st.caption(f"Specification search: {pruned} of {screened} candidate fits pruned after "
+                       f"{EARLY_ITERATIONS} iterations, {screened - pruned} fitted to convergence.")
+        for stock in search_inputs:
+            if stock in search_results:
+                garch_results[stock] = search_results[stock]
+            else:
+                st.warning(f"GARCH specification search failed for {stock}: {errors.get(stock)}")
+                failed_stocks.append(stock)
+    
     if failed_stocks:
         st.info(f"GARCH models could not be fitted for: {', '.join(failed_stocks)}")
     
-    return garch_results, volatilities
+    return garch_results
+
+def garch_volatilities(garch_results, calendar):
+    # each ticker's conditional volatility sits on its own sessions; placing them on the
+    # master calendar keeps late listings and suspensions aligned with everyone else
+    series = {stock: result.conditional_volatility / 100 for stock, result in garch_results.items()}
+    return align_series(calendar, series).dropna(how='all')
+
+@st.cache_resource(show_spinner=False)
+def fit_garch_models_cached(returns_data, search=False, criterion='aic', _n_workers=1):
+    # fitted models are reused read-only, so they are cached as resources rather than copied
+    mark_cache_miss("fit_garch_models")
+    return fit_garch_models(returns_data, search=search, criterion=criterion, n_workers=_n_workers)
+
+@st.cache_data(show_spinner=False)
+def cached_forecast_surface(forecast_inputs, n_sims=2000, seed=DEFAULT_SEED):
+    mark_cache_miss("forecast_surface")
+    return build_forecast_surface(forecast_inputs, n_sims=n_sims, seed=seed)
+
+@st.cache_resource(show_spinner=False)
+def fit_garch_dcc(returns_data, search=False, criterion='aic'):
+    mark_cache_miss("fit_garch_dcc")
+    with cache_probe("fit_garch_models"):
+        garch_results = fit_garch_models_cached(returns_data, search, criterion)
+    with profile_stage("fit_dcc"):
+        dcc = fit_dcc(garch_results)
+    return garch_results, dcc
+
+def dcc_covariance_forecast(returns_data, horizon):
+    with cache_probe("fit_garch_dcc"):
+        garch_results, dcc = fit_garch_dcc(returns_data)
+    return forecast_covariance(dcc, garch_results, horizon)
+
+def render_dcc_section(returns_data, forecast_horizon, search=False, criterion='aic'):
+    st.subheader("Dynamic Conditional Correlation (DCC-GARCH)")
+    st.write("""
+    DCC-GARCH reuses the univariate GARCH fits above and models how correlations change over time:
+    \\( Q_t = (1-a-b)\\bar{Q} + a z_{t-1}z_{t-1}' + bQ_{t-1} \\), where \\( z_t \\) are the standardized residuals.
+    """)
+    
+    try:
+        with cache_probe("fit_garch_dcc"):
+            garch_results, dcc = fit_garch_dcc(returns_data, search, criterion)
+    except ValueError as e:
+        st.warning(f"DCC model could not be fitted: {e}")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("a (shock reaction)", f"{dcc['a']:.4f}")
+    col2.metric("b (correlation memory)", f"{dcc['b']:.4f}")
+    col3.metric("Persistence (a + b)", f"{dcc['a'] + dcc['b']:.4f}")
+    
+    average_corr = average_correlation_series(dcc)
+    fig_corr = go.Figure()
+    fig_corr.add_trace(go.Scatter(x=average_corr.index, y=average_corr.values, mode='lines',
+                                  name='Average Pairwise Correlation'))
+    fig_corr.add_hline(y=average_corr.mean(), line_dash="dash", line_color="red",
+                       annotation_text="Full-Sample Average")
+    fig_corr.update_layout(
+        title="Average Dynamic Correlation Across Stocks",
+        xaxis_title="Date",
+        yaxis_title="Correlation",
+        height=400
+    )
+    st.plotly_chart(fig_corr, use_container_width=True)
+    
+    forecast_corr = pd.DataFrame(forecast_correlation(dcc, forecast_horizon),
+                                 index=dcc['codes'], columns=dcc['codes'])
+    forecast_cov = forecast_covariance(dcc, garch_results, forecast_horizon)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**Forecast Correlation (Day {forecast_horizon})**")
+        st.dataframe(forecast_corr.style.format("{:.3f}"), use_container_width=True)
+    with col2:
+        st.write(f"**Forecast Covariance (Annualized, Days 1-{forecast_horizon})**")
+        st.dataframe(forecast_cov.style.format("{:.4f}"), use_container_width=True)
+    
+    st.info("""
+    **DCC Interpretation:**
+    - **a**: How strongly correlations react to the latest joint shock
+    - **b**: How long correlation changes persist
+    - The forecast covariance can be used by Portfolio Optimization instead of the static sample covariance
+    """)
 
+def render_realized_comparison(volatilities, sampling='5min'):
+    st.subheader("GARCH vs Intraday Realized Volatility")
+    realized = get_realized_volatility(list(volatilities.columns), sampling)
+    if not realized:
+        st.info("No minute bars in the intraday store for these stocks. Run akshare.py with PULL_MINUTE_BARS = True "
+                "to start collecting them; realized volatility appears here once sessions overlap the daily history.")
+        return
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        stock = st.selectbox("Stock:", list(realized.keys()), key="realized_stock")
+    with col2:
+        estimators = st.multiselect("Estimators:", REALIZED_ESTIMATORS, default=['Realized Vol', 'Parkinson Vol'])
+    
+    # GARCH volatility here is close-to-close (overnight included); the realized estimators cover the session only
+    estimates = realized[stock]
+    garch_vol = volatilities[stock].reindex(estimates.index)
+    overlap = garch_vol.notna()
+    if not overlap.any():
+        st.info(f"Stored minute bars for {stock} do not overlap the daily history yet.")
+        return
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=estimates.index[overlap], y=garch_vol[overlap], name='GARCH', mode='lines',
+                             line=dict(color='black', width=2)))
+    for estimator in estimators:
+        fig.add_trace(go.Scatter(x=estimates.index[overlap], y=estimates.loc[overlap, estimator],
+                                 name=estimator, mode='lines'))
+    fig.update_layout(title=f"{stock}: Daily Volatility, GARCH vs {sampling} Realized", xaxis_title="Date",
+                      yaxis_title="Daily Volatility", height=400)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    comparison = []
+    for estimator in REALIZED_ESTIMATORS:
+        paired = pd.concat([garch_vol, estimates[estimator]], axis=1).dropna()
+        if len(paired) < 2:
+            continue
+        comparison.append({
+            'Estimator': estimator,
+            'Sessions': len(paired),
+            'Mean Realized': paired.iloc[:, 1].mean(),
+            'Mean GARCH': paired.iloc[:, 0].mean(),
+            'RMSE': np.sqrt(((paired.iloc[:, 0] - paired.iloc[:, 1])**2).mean()),
+            'Correlation': paired.iloc[:, 0].corr(paired.iloc[:, 1]),
+        })
+    if comparison:
+        st.dataframe(pd.DataFrame(comparison), use_container_width=True)
+
+def garch_volatility_figure(volatilities):
+    fig_vol = go.Figure()
+    for column in volatilities.columns:
+        fig_vol.add_trace(go.Scatter(
+            x=volatilities.index,
+            y=volatilities[column],
+            name=column,
+            mode='lines'
+        ))
+    
+    fig_vol.update_layout(
+        title="Conditional Volatility from GARCH(1,1) Model",
+        xaxis_title="Date",
+        yaxis_title="Conditional Volatility",
+        height=400
+    )
+    return fig_vol
+
+@profiled()
 def render_garch_model(stocks):
     st.header("GARCH Volatility Modeling")
     st.write("""
@@ -85,25 +263,37 @@ def render_garch_model(stocks):
         - **Stationarity**: Requires α + β < 1
         """)
     
+    search = st.checkbox("Model selection: search GARCH / GJR-GARCH / EGARCH with Normal, Student-t and Skew-t errors")
+    criterion = 'aic'
+    n_workers = 1
+    if search:
+        col1, col2 = st.columns(2)
+        with col1:
+            criterion = st.radio("Selection criterion:", ["AIC", "BIC"], horizontal=True).lower()
+        with col2:
+            n_workers = st.slider("Worker processes", 1, 8, 4)
+    
     with st.spinner('Fitting GARCH models... This may take a while.'):
-        returns_data = pd.DataFrame()
-        for code, df in stocks.items():
-            returns_data[code] = df['Returns']
+        returns_data = get_returns_matrix(stocks)
         
-        garch_results, volatilities = fit_garch_models(returns_data)
+        with cache_probe("fit_garch_models"):
+            garch_results = fit_garch_models_cached(returns_data, search, criterion, n_workers)
+        volatilities = garch_volatilities(garch_results, get_trading_calendar(stocks))
     
     if garch_results:
-        st.subheader("GARCH(1,1) Model Parameters")
+        st.subheader("Selected GARCH Model Parameters" if search else "GARCH(1,1) Model Parameters")
         garch_params = []
         for stock, result in garch_results.items():
             try:
                 params = result.params
                 garch_params.append({
                     'Stock': stock,
+                    'Model': describe_spec(result),
                     'Omega (Constant)': params.get('omega', np.nan),
                     'Alpha (ARCH)': params.get('alpha[1]', np.nan),
+                    'Gamma (Asymmetry)': params.get('gamma[1]', np.nan),
                     'Beta (GARCH)': params.get('beta[1]', np.nan),
-                    'Persistence': params.get('alpha[1]', 0) + params.get('beta[1]', 0),
+                    'Persistence': garch_persistence(result),
                     'Log Likelihood': result.loglikelihood,
                     'AIC': result.aic,
                     'BIC': result.bic
@@ -120,81 +310,85 @@ def render_garch_model(stocks):
             - **Omega**: Constant term in volatility equation
             - **Alpha**: Effect of past squared returns (ARCH effect)
             - **Beta**: Effect of past volatility (GARCH effect)
-            - **Persistence**: Alpha + Beta, measures volatility clustering
+            - **Gamma**: Extra response to negative shocks (GJR-GARCH / EGARCH only)
+            - **Persistence**: Alpha + Beta (+ Gamma / 2 for GJR, Beta for EGARCH), measures volatility clustering
             - **Persistence close to 1**: Volatility shocks are highly persistent
             - **High Alpha**: Volatility is very responsive to market movements
             - **High Beta**: Volatility has strong memory of its own past
             """)
             
             st.subheader("Conditional Volatility (GARCH)")
-            fig_vol = go.Figure()
-            for column in volatilities.columns:
-                fig_vol.add_trace(go.Scatter(
-                    x=volatilities.index,
-                    y=volatilities[column],
-                    name=column,
-                    mode='lines'
-                ))
-            
-            fig_vol.update_layout(
-                title="Conditional Volatility from GARCH(1,1) Model",
-                xaxis_title="Date",
-                yaxis_title="Conditional Volatility",
-                height=400
-            )
-            st.plotly_chart(fig_vol, use_container_width=True)
+            fig_vol = cached_plotly("garch_volatility", garch_volatility_figure, volatilities)
+            with profile_stage("plotly:garch_volatility", kind="render"):
+                st.plotly_chart(fig_vol, use_container_width=True)
+            
+            render_realized_comparison(volatilities)
             
             st.subheader("Volatility Forecast")
             st.write("Generate future volatility forecasts based on fitted GARCH models:")
             
-            forecast_horizon = st.slider("Forecast Horizon (days)", 1, 30, 10)
+            forecast_horizon = st.slider("Forecast Horizon (days)", 1, MAX_HORIZON, 10)
+            
+            show_bands = st.checkbox("Show simulated 5%-95% forecast bands", value=True)
             
             try:
-                forecast_data = []
-                for stock, result in garch_results.items():
-                    try:
-                        forecast = result.forecast(horizon=forecast_horizon)
-                        forecast_variance = forecast.variance.iloc[-1] / (100**2)
-                        forecast_volatility = np.sqrt(forecast_variance)
-                        
-                        for i, vol in enumerate(forecast_volatility):
-                            forecast_data.append({
-                                'Stock': stock,
-                                'Day': i + 1,
-                                'Forecasted Volatility': vol
-                            })
-                    except Exception as e:
-                        st.warning(f"Forecast failed for {stock}: {e}")
+                # the surface covers every horizon up to one year, so the slider only slices it
+                with profile_stage("garch_forecast"):
+                    forecast_inputs = extract_forecast_inputs(garch_results)
+                    with cache_probe("forecast_surface"):
+                        surface = cached_forecast_surface(forecast_inputs)
+                forecast_df = surface_frame(surface, forecast_horizon)
                 
-                if forecast_data:
-                    forecast_df = pd.DataFrame(forecast_data)
-                    
-                    fig_forecast = px.line(forecast_df, x='Day', y='Forecasted Volatility', 
-                                          color='Stock', title=f'GARCH Volatility Forecast ({forecast_horizon} days)')
-                    fig_forecast.update_layout(height=400)
-                    st.plotly_chart(fig_forecast, use_container_width=True)
-                    
-                    st.subheader("Forecast Summary")
-                    summary_data = []
-                    for stock in forecast_df['Stock'].unique():
-                        stock_forecasts = forecast_df[forecast_df['Stock'] == stock]
-                        initial_vol = stock_forecasts['Forecasted Volatility'].iloc[0]
-                        final_vol = stock_forecasts['Forecasted Volatility'].iloc[-1]
-                        change = ((final_vol - initial_vol) / initial_vol) * 100
-                        
-                        summary_data.append({
-                            'Stock': stock,
-                            'Initial Volatility': initial_vol,
-                            f'Day {forecast_horizon} Volatility': final_vol,
-                            'Change (%)': change
-                        })
-                    
-                    summary_df = pd.DataFrame(summary_data)
-                    st.dataframe(summary_df, use_container_width=True)
+                fig_forecast = go.Figure()
+                colors = px.colors.qualitative.Plotly
+                for i, stock in enumerate(surface['codes']):
+                    stock_forecasts = forecast_df[forecast_df['Stock'] == stock]
+                    color = colors[i % len(colors)]
+                    if show_bands:
+                        fig_forecast.add_trace(go.Scatter(
+                            x=np.concatenate([stock_forecasts['Day'], stock_forecasts['Day'][::-1]]),
+                            y=np.concatenate([stock_forecasts['P95'], stock_forecasts['P5'][::-1]]),
+                            fill='toself', fillcolor=color, opacity=0.15, line=dict(width=0),
+                            hoverinfo='skip', showlegend=False, legendgroup=stock
+                        ))
+                    fig_forecast.add_trace(go.Scatter(
+                        x=stock_forecasts['Day'], y=stock_forecasts['Forecasted Volatility'],
+                        mode='lines', name=stock, line=dict(color=color), legendgroup=stock
+                    ))
+                
+                fig_forecast.update_layout(
+                    title=f'GARCH Volatility Forecast ({forecast_horizon} days)',
+                    xaxis_title="Day",
+                    yaxis_title="Forecasted Volatility",
+                    height=400
+                )
+                st.plotly_chart(fig_forecast, use_container_width=True)
+                
+                st.subheader("Forecast Summary")
+                summary_data = []
+                for stock in surface['codes']:
+                    stock_forecasts = forecast_df[forecast_df['Stock'] == stock]
+                    initial_vol = stock_forecasts['Forecasted Volatility'].iloc[0]
+                    final_vol = stock_forecasts['Forecasted Volatility'].iloc[-1]
+                    change = ((final_vol - initial_vol) / initial_vol) * 100
                     
+                    summary_data.append({
+                        'Stock': stock,
+                        'Initial Volatility': initial_vol,
+                        f'Day {forecast_horizon} Volatility': final_vol,
+                        f'Day {forecast_horizon} 5%': stock_forecasts['P5'].iloc[-1],
+                        f'Day {forecast_horizon} 95%': stock_forecasts['P95'].iloc[-1],
+                        'Change (%)': change
+                    })
+                
+                summary_df = pd.DataFrame(summary_data)
+                st.dataframe(summary_df, use_container_width=True)
+                
             except Exception as e:
                 st.warning(f"Volatility forecasting failed: {e}")
             
+            render_dcc_section(returns_data, forecast_horizon, search, criterion)
+            
         else:
             st.warning("No GARCH parameters were successfully extracted.")
     else:
@@ -205,9 +399,7 @@ def render_garch_model(stocks):
         
         st.info("Alternative Approach: Use rolling historical volatility")
         
-        returns_data = pd.DataFrame()
-        for code, df in stocks.items():
-            returns_data[code] = df['Returns']
+        returns_data = get_returns_matrix(stocks)
             
         rolling_vol = returns_data.rolling(window=30).std() * np.sqrt(252)
         fig_alt = go.Figure()
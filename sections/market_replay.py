@@ -0,0 +1,148 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from utils.profiling import profiled, profile_stage
+from utils.data_loader import get_trading_calendar
+from utils.trading_calendar import align_column
+from utils.rng import DEFAULT_SEED
+from utils.replay import (history_feed, synthetic_feed, take_warmup, start_replay, replay, replay_stock_frame,
+                          replay_correlation, latency_summary, ROLLING_WINDOW,
+                          EWMA_LAMBDA, GARCH_ALPHA, GARCH_BETA, MINUTES_PER_SESSION)
+
+def replay_weights(codes):
+    options = {"Equal Weight": np.full(len(codes), 1 / len(codes))}
+    results = st.session_state.get('portfolio_results')
+    if results is not None:
+        # the optimization may have run on a screened subset; stocks outside it get zero weight
+        optimized_codes = results.get('codes', codes)
+        for name, idx in [("Max Sharpe", results['max_sharpe_idx']), ("Min Volatility", results['min_vol_idx'])]:
+            weights = pd.Series(results['weight_list'][idx], index=optimized_codes)
+            options[name] = weights.reindex(codes).fillna(0.0).to_numpy(dtype=float)
+    choice = st.selectbox("Portfolio:", list(options.keys()), index=len(options) - 2 if len(options) > 1 else 0)
+    return choice, options[choice]
+
+def render_replay_results(results):
+    snapshots = results['snapshots']
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Bars Replayed", f"{len(snapshots):,}")
+    with col2:
+        st.metric("Cumulative P&L", f"¥{snapshots['cumulative_pnl'].iloc[-1]:,.0f}")
+    with col3:
+        st.metric("P99 Update Latency", f"{results['latency']['P99 (ms)']:.2f} ms")
+    with col4:
+        st.metric("Average Correlation", f"{snapshots['average_correlation'].iloc[-1]:.2f}")
+    
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        subplot_titles=("Cumulative P&L", "Annualized Portfolio Volatility"))
+    fig.add_trace(go.Scatter(x=snapshots['timestamp'], y=snapshots['cumulative_pnl'], name='P&L',
+                             line=dict(color='green')), row=1, col=1)
+    for column, label in [('rolling_vol', 'Rolling'), ('ewma_vol', 'EWMA'), ('garch_vol', 'GARCH')]:
+        fig.add_trace(go.Scatter(x=snapshots['timestamp'], y=snapshots[column], name=label), row=2, col=1)
+    fig.update_yaxes(tickformat='.0%', row=2, col=1)
+    fig.update_layout(height=600, title=f"Replay: {results['label']}")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**Per-Stock State After the Last Bar**")
+        st.dataframe(results['stocks'].style.format({
+            'Last Price': "{:.2f}", 'Position': "¥{:,.0f}", 'Weight': "{:.2%}",
+            'Rolling Vol': "{:.2%}", 'EWMA Vol': "{:.2%}", 'GARCH Vol': "{:.2%}"
+        }), use_container_width=True)
+    with col2:
+        st.write("**EWMA Correlation**")
+        fig_corr = go.Figure(go.Heatmap(z=results['correlation'].to_numpy(), x=results['correlation'].columns,
+                                        y=results['correlation'].index, colorscale='RdBu', zmid=0, zmin=-1, zmax=1))
+        fig_corr.update_layout(height=350, margin=dict(t=20))
+        st.plotly_chart(fig_corr, use_container_width=True)
+    
+    st.write("**Update Latency**")
+    fig_latency = go.Figure(go.Histogram(x=snapshots['latency_ms'], nbinsx=50, marker_color='lightblue'))
+    fig_latency.update_layout(xaxis_title="Milliseconds per bar", yaxis_title="Bars", height=300)
+    st.plotly_chart(fig_latency, use_container_width=True)
+    st.dataframe(pd.DataFrame([results['latency']]), use_container_width=True)
+
+@profiled()
+def render_market_replay(stocks):
+    st.header("9. Market Replay")
+    st.write("Streams bars through the risk model one at a time, updating returns, volatility, correlation, "
+             "GARCH variance and portfolio P&L incrementally instead of recomputing the full history.")
+    
+    codes = list(stocks.keys())
+    calendar = get_trading_calendar(stocks)
+    source = st.radio("Feed:", ["Stored History (daily)", "Synthetic Feed (1-minute)"], horizontal=True)
+    label, weights = replay_weights(codes)
+    
+    with st.expander("Replay Settings", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            warmup = st.number_input("Warm-up bars", min_value=30, max_value=2000, value=250, step=10)
+            n_bars = st.number_input("Bars to replay", min_value=10, max_value=20000,
+                                     value=500 if source.startswith("Stored") else MINUTES_PER_SESSION, step=10)
+            window = st.slider("Rolling window (bars)", 5, 120, ROLLING_WINDOW)
+            refresh = st.slider("Redraw every N bars", 1, 200, 25)
+        with col2:
+            lam = st.slider("EWMA lambda", 0.80, 0.99, EWMA_LAMBDA, 0.01)
+            alpha = st.slider("GARCH alpha", 0.01, 0.30, GARCH_ALPHA, 0.01)
+            beta = st.slider("GARCH beta", 0.50, 0.98, GARCH_BETA, 0.01)
+            seed = st.number_input("Synthetic feed seed", min_value=0, value=DEFAULT_SEED, step=1)
+            portfolio_value = st.number_input("Portfolio value (CNY)", min_value=1e4, value=1e6, step=1e5, format="%.0f")
+    
+    if alpha + beta >= 1:
+        st.error("GARCH alpha + beta must be below 1.")
+        return
+    
+    if st.button("Start Replay"):
+        closes = align_column(stocks, calendar, '收盘', codes)
+        if source.startswith("Stored"):
+            start = max(0, len(calendar['dates']) - int(n_bars) - int(warmup))
+            feed = history_feed(stocks, calendar, codes, calendar['dates'][start])
+            periods_per_year = 252
+        else:
+            feed = synthetic_feed(codes, int(warmup) + int(n_bars), int(seed),
+                                  initial_prices=closes.ffill().iloc[-1].fillna(10.0).to_numpy())
+            periods_per_year = 252 * MINUTES_PER_SESSION
+    
+        warmup_prices = take_warmup(feed, int(warmup))
+        warmup_prices.columns = codes
+        state = start_replay(warmup_prices, weights, window=window, lam=lam, alpha=alpha, beta=beta,
+                             portfolio_value=portfolio_value, periods_per_year=periods_per_year)
+    
+        progress = st.progress(0.0)
+        live_chart = st.empty()
+        snapshots = []
+        with profile_stage("market_replay"):
+            for snapshot in replay(feed, state, int(n_bars)):
+                snapshots.append(snapshot)
+                if len(snapshots) % refresh == 0:
+                    progress.progress(min(len(snapshots) / n_bars, 1.0))
+                    live_chart.line_chart(pd.DataFrame(snapshots).set_index('timestamp')['cumulative_pnl'])
+        progress.empty()
+        live_chart.empty()
+    
+        if not snapshots:
+            st.warning("The feed ended during the warm-up; lower the warm-up or the number of bars.")
+            return
+        st.session_state.replay_results = {
+            'label': f"{label}, {source}",
+            'snapshots': pd.DataFrame(snapshots),
+            'stocks': replay_stock_frame(state),
+            'correlation': replay_correlation(state),
+            'latency': latency_summary(state['latencies']),
+        }
+    
+    if 'replay_results' in st.session_state:
+        render_replay_results(st.session_state.replay_results)
+    
+    st.info("""
+    **Replay Mechanics**:
+    - **Warm-up**: The first bars are processed in batch, so streaming starts from a fitted state
+    - **Rolling Vol**: Running sums over a ring buffer; halted bars drop out of the window
+    - **EWMA**: Rank-one covariance update per bar; correlations are read off the covariance
+    - **GARCH**: One-step GJR-GARCH(1,1) update with variance targeting on the warm-up sample
+    - **P&L**: Buy-and-hold positions drift with each bar's returns
+    """)
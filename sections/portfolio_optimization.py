@@ -2,60 +2,95 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+from utils.profiling import profiled, profile_stage
+from utils.optimizer import constrained_frontier, board_groups, random_portfolios
+from utils.rng import DEFAULT_SEED
+from sections.garch_model import dcc_covariance_forecast
+from utils.data_loader import get_returns_matrix
+from utils.factor_model import fit_factor_model
+from utils.figure_cache import cached_plotly
 
 def portfolio_performance(weights, mean_returns, cov_matrix):
     returns = np.sum(weights * mean_returns)             #calucate returns
-    std = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights)))   #caculate std
+    std = np.sqrt(np.dot(weights.T, cov_matrix.dot(weights)))   #caculate std
     return std, returns
 
-def render_portfolio_optimization(stocks):
-    st.header("5. Portfolio Optimization")
-    st.write("This section constructs optimal portfolios using Modern Portfolio Theory.")
-    
-    returns_data = pd.DataFrame()
-    for code, df in stocks.items():
-        returns_data[code] = df['Returns']
-    
-    mean_returns = returns_data.mean() * 252
-    cov_matrix = returns_data.cov() * 252
-    
-    num_portfolios = 10000
-    results = np.zeros((3, num_portfolios))
-    weight_list = []
+def simulate_random_portfolios(mean_returns, cov_matrix, num_portfolios=10000, seed=DEFAULT_SEED):
+    with profile_stage("frontier_simulation"):
+        weights, returns, vols = random_portfolios(mean_returns, cov_matrix, num_portfolios, seed)
     
-    for i in range(num_portfolios):
-        weights = np.random.random(len(stocks))
-        weights /= np.sum(weights)
-        weight_list.append(weights)
+    results_df = pd.DataFrame({'Volatility': vols, 'Return': returns, 'Sharpe': returns / vols})
+    return results_df, list(weights)
+
+def render_constraint_inputs(codes):
+    with st.expander("Mandate Constraints", expanded=True):
+        col1, col2 = st.columns(2)
         
-        portfolio_std, portfolio_return = portfolio_performance(weights, mean_returns, cov_matrix)
-        results[0,i] = portfolio_std
-        results[1,i] = portfolio_return
-        results[2,i] = portfolio_return / portfolio_std
-    
-    results_df = pd.DataFrame(results.T, columns=['Volatility', 'Return', 'Sharpe'])
-    weights_df = pd.DataFrame(weight_list, columns=list(stocks.keys()))
-    
-    max_sharpe_idx = results_df['Sharpe'].idxmax()
-    min_vol_idx = results_df['Volatility'].idxmin()
-    
-    st.subheader("Efficient Frontier")
-    
+        with col1:
+            max_weight = st.slider("Max weight per stock (%)", 5, 100, 100, step=5) / 100
+            min_weight = st.slider("Min weight per stock (%)", 0, 15, 0) / 100
+        
+        with col2:
+            group_caps = {}
+            for board, members in board_groups(codes).items():
+                cap = st.slider(f"{board} cap (%) - {', '.join(members)}", 0, 100, 100, step=5) / 100
+                if cap < 1:
+                    group_caps[board] = (members, cap)
+        
+        current_weights = None
+        max_turnover = None
+        if st.checkbox("Limit turnover against current holdings"):
+            holdings = st.data_editor(
+                pd.DataFrame({'Stock': codes, 'Current Weight (%)': [100 / len(codes)] * len(codes)}),
+                disabled=['Stock'], hide_index=True, use_container_width=True
+            )
+            current = holdings['Current Weight (%)'].clip(lower=0).to_numpy(dtype=float)
+            if current.sum() > 0:
+                current_weights = current / current.sum()
+                max_turnover = st.slider("Max one-way turnover (%)", 0, 100, 20) / 100
+            else:
+                st.warning("Current holdings must have a positive total weight; turnover limit ignored.")
+    
+    return {
+        'min_weight': min_weight,
+        'max_weight': max_weight,
+        'group_caps': group_caps,
+        'current_weights': current_weights,
+        'max_turnover': max_turnover
+    }
+
+def frontier_figure(results_df, max_sharpe_idx, min_vol_idx, method):
     fig_frontier = go.Figure()
     
-    fig_frontier.add_trace(go.Scatter(
-        x=results_df['Volatility'],
-        y=results_df['Return'],
-        mode='markers',
-        marker=dict(
-            size=3,
-            color=results_df['Sharpe'],
-            colorscale='Viridis',
-            showscale=True,
-            colorbar=dict(title="Sharpe Ratio")
-        ),
-        name='Random Portfolios'
-    ))
+    if method == "Constrained Frontier":
+        fig_frontier.add_trace(go.Scatter(
+            x=results_df['Volatility'],
+            y=results_df['Return'],
+            mode='lines+markers',
+            marker=dict(
+                size=5,
+                color=results_df['Sharpe'],
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Sharpe Ratio")
+            ),
+            line=dict(color='gray', width=1),
+            name='Constrained Frontier'
+        ))
+    else:
+        fig_frontier.add_trace(go.Scatter(
+            x=results_df['Volatility'],
+            y=results_df['Return'],
+            mode='markers',
+            marker=dict(
+                size=3,
+                color=results_df['Sharpe'],
+                colorscale='Viridis',
+                showscale=True,
+                colorbar=dict(title="Sharpe Ratio")
+            ),
+            name='Random Portfolios'
+        ))
     
     fig_frontier.add_trace(go.Scatter(
         x=[results_df.loc[max_sharpe_idx, 'Volatility']],
@@ -87,11 +122,67 @@ def render_portfolio_optimization(stocks):
             x=0.01
         )
     )
+    return fig_frontier
+
+@profiled()
+def render_portfolio_optimization(stocks):
+    st.header("5. Portfolio Optimization")
+    st.write("This section constructs optimal portfolios using Modern Portfolio Theory.")
+    
+    returns_data = get_returns_matrix(stocks)
+    
+    mean_returns = returns_data.mean() * 252
+    cov_matrix = returns_data.cov() * 252
+    
+    covariance_model = st.radio("Covariance Model:", ["Sample Covariance", "DCC-GARCH Forecast", "PCA Factor Model"], horizontal=True)
+    if covariance_model == "DCC-GARCH Forecast":
+        horizon = st.slider("Forecast horizon for covariance (days)", 1, 60, 21)
+        try:
+            with st.spinner("Fitting GARCH and DCC models..."):
+                dcc_cov = dcc_covariance_forecast(returns_data, horizon)
+            if list(dcc_cov.index) == list(returns_data.columns):
+                cov_matrix = dcc_cov
+            else:
+                st.warning("DCC forecast does not cover every stock; using the sample covariance.")
+        except ValueError as e:
+            st.warning(f"DCC model could not be fitted ({e}); using the sample covariance.")
+    elif covariance_model == "PCA Factor Model":
+        max_factors = max(1, min(10, len(returns_data.columns) - 1))
+        n_factors = st.slider("Number of statistical factors", 1, max_factors, min(3, max_factors))
+        with profile_stage("factor_model"):
+            cov_matrix = fit_factor_model(returns_data, n_factors)
+        st.caption(f"{cov_matrix.n_factors} factors explain {cov_matrix.explained_variance:.1%} of total return variance; "
+                   "only the loadings and specific variances are stored.")
+    
+    method = st.radio("Optimization Method:", ["Constrained Frontier", "Random Portfolios"], horizontal=True)
+    
+    if method == "Constrained Frontier":
+        constraints = render_constraint_inputs(list(stocks.keys()))
+        try:
+            with profile_stage("constrained_frontier"):
+                results_df, weight_list, failed_targets = constrained_frontier(mean_returns, cov_matrix, **constraints)
+        except ValueError as e:
+            st.error(f"Constrained optimization failed: {e}")
+            return None, None, None, None, mean_returns, cov_matrix
+        if failed_targets:
+            st.warning(f"{len(failed_targets)} of {len(failed_targets) + len(results_df)} frontier points did not converge to a "
+                       f"feasible portfolio and are omitted (target returns: {', '.join(f'{t:.2%}' for t in failed_targets)}).")
+    else:
+        seed = st.number_input("Random seed", min_value=0, value=DEFAULT_SEED, step=1)
+        results_df, weight_list = simulate_random_portfolios(mean_returns, cov_matrix, seed=int(seed))
+    
+    max_sharpe_idx = results_df['Sharpe'].idxmax()
+    min_vol_idx = results_df['Volatility'].idxmin()
+    
+    st.subheader("Efficient Frontier")
+    
+    fig_frontier = cached_plotly("efficient_frontier", frontier_figure, results_df, max_sharpe_idx, min_vol_idx, method)
     
     col1, col2 = st.columns([10, 1])
     
     with col1:
-        st.plotly_chart(fig_frontier, use_container_width=True)
+        with profile_stage("plotly:efficient_frontier", kind="render"):
+            st.plotly_chart(fig_frontier, use_container_width=True)
     
     with col2:
         st.write("")
@@ -100,6 +191,7 @@ def render_portfolio_optimization(stocks):
     **Efficient Frontier Analysis**:
     - **Minimum Volatility Portfolio**: Lowest risk configuration
     - **Maximum Sharpe Ratio Portfolio**: Highest return per unit of risk
+    - **Constrained Frontier**: Every point respects the per-stock bounds, board caps and turnover limit
     """)
     
     return results_df, weight_list, max_sharpe_idx, min_vol_idx, mean_returns, cov_matrix
\ No newline at end of file
@@ -2,8 +2,204 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
+from utils.profiling import profiled, profile_stage
+from utils.allocators import ALLOCATORS, risk_contributions
+from utils.resampling import bootstrap_max_sharpe
+from sections.correlation_analysis import compute_correlation_matrix
+from utils.data_loader import get_returns_matrix, get_trading_calendar
+from utils.liquidity import liquidity_snapshot, position_liquidity, liquidity_adjusted_var, PARTICIPATION_RATE, LIQUIDITY_WINDOW
+from utils.rng import DEFAULT_SEED
+from utils.figure_cache import cached_plotly
 
-def render_portfolio_selection(stocks, results_df, weight_list, max_sharpe_idx, min_vol_idx):
+def render_risk_based_allocations(stocks, returns_data, corr_matrix, max_sharpe_weights, min_vol_weights, cov_matrix=None):
+    st.subheader("Risk-Based Allocations")
+    st.write("Allocations built from the correlation matrix and stock volatilities only, without inverting the covariance matrix.")
+    
+    mean_returns = returns_data.mean() * 252
+    volatilities = returns_data.std() * np.sqrt(252)
+    if cov_matrix is None:
+        cov_matrix = returns_data.cov() * 252
+    
+    portfolios = {
+        'Max Sharpe': pd.Series(max_sharpe_weights, index=list(stocks.keys())),
+        'Min Volatility': pd.Series(min_vol_weights, index=list(stocks.keys()))
+    }
+    with profile_stage("risk_based_allocators"):
+        for name, allocator in ALLOCATORS.items():
+            portfolios[name] = allocator(corr_matrix, volatilities)
+    
+    summary_data = []
+    for name, weights in portfolios.items():
+        portfolio_return = weights @ mean_returns
+        portfolio_volatility = np.sqrt(weights @ cov_matrix.dot(weights))
+        contributions = risk_contributions(weights, cov_matrix)
+        summary_data.append({
+            'Portfolio': name,
+            'Expected Return': f"{portfolio_return:.2%}",
+            'Volatility': f"{portfolio_volatility:.2%}",
+            'Sharpe Ratio': f"{portfolio_return / portfolio_volatility:.2f}",
+            'Max Weight': f"{weights.max():.2%}",
+            'Max Risk Contribution': f"{contributions.max():.2%}"
+        })
+    
+    st.dataframe(pd.DataFrame(summary_data), use_container_width=True)
+    
+    fig_weights = go.Figure()
+    for name, weights in portfolios.items():
+        fig_weights.add_trace(go.Bar(x=weights.index, y=weights.values, name=name))
+    
+    fig_weights.update_layout(
+        title="Weights by Allocation Method",
+        xaxis_title="Stock",
+        yaxis_title="Weight",
+        yaxis_tickformat='.0%',
+        barmode='group',
+        height=400
+    )
+    st.plotly_chart(fig_weights, use_container_width=True)
+    
+    st.info("""
+    **Risk-Based Allocation Methods**:
+    - **Hierarchical Risk Parity**: Clusters stocks by correlation, then splits risk between clusters top-down
+    - **Equal Risk Contribution**: Every stock contributes the same share of portfolio volatility
+    - **Inverse Volatility**: Weights proportional to 1 / volatility, ignoring correlations
+    """)
+
+def render_liquidity_check(stocks, returns_data, max_sharpe_weights, min_vol_weights, cov_matrix=None):
+    st.subheader("Liquidity Check")
+    st.write("Daily value traded, Amihud illiquidity and the high-low spread estimate show how quickly each position could be exited.")
+    
+    with st.expander("Liquidity Settings", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            portfolio_value = st.number_input("Portfolio value (million CNY)", min_value=1.0, value=500.0, step=50.0) * 1e6
+        with col2:
+            participation = st.slider("Max share of daily value traded (%)", 5, 50, int(PARTICIPATION_RATE * 100)) / 100
+            max_days = st.slider("Flag positions needing more than (days)", 1, 20, 3)
+        with col3:
+            window = st.slider("Averaging window (days)", 5, 120, LIQUIDITY_WINDOW)
+            confidence = st.slider("LVaR confidence (%)", 90, 99, 95) / 100
+    
+    if cov_matrix is None:
+        cov_matrix = returns_data.cov() * 252
+    
+    with profile_stage("liquidity_analytics"):
+        snapshot = liquidity_snapshot(stocks, get_trading_calendar(stocks), list(stocks.keys()), window)
+    
+    st.dataframe(snapshot.style.format({
+        'ADV (CNY)': "{:,.0f}", 'Amihud': "{:.4f}", 'Spread': "{:.2%}", 'Spread Vol': "{:.2%}",
+        'Turnover': "{:.2%}", 'Amplitude': "{:.2%}"
+    }), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    for column, (label, weights) in zip((col1, col2), [('Max Sharpe', max_sharpe_weights), ('Min Volatility', min_vol_weights)]):
+        with column:
+            st.write(f"**{label} Portfolio**")
+            positions = position_liquidity(weights, snapshot, portfolio_value, participation, max_days)
+            st.dataframe(positions.style.format({
+                'Weight': "{:.2%}", 'Position (CNY)': "{:,.0f}", 'Share of ADV': "{:.2%}",
+                'Days to Liquidate': "{:.2f}", 'Exit Cost': "{:,.0f}"
+            }), use_container_width=True)
+            
+            lvar = liquidity_adjusted_var(weights, cov_matrix, snapshot, portfolio_value, confidence)
+            st.metric(f"1-Day LVaR {confidence:.0%}", f"¥{lvar['LVaR']:,.0f}",
+                      delta=f"¥{lvar['Liquidity Cost']:,.0f} liquidity cost", delta_color="off")
+            
+            illiquid = positions.index[positions['Illiquid'] & (positions['Weight'] > 1e-4)]
+            if len(illiquid):
+                st.warning(f"Cannot be exited within {max_days} days at {participation:.0%} participation: {', '.join(illiquid)}")
+            else:
+                st.success(f"Every position can be exited within {max_days} days.")
+    
+    st.info("""
+    **Liquidity Measures**:
+    - **ADV**: Average daily value traded (成交额) over the window
+    - **Amihud**: Average absolute return per 100 million CNY traded; higher means more price impact
+    - **Spread**: Corwin-Schultz bid-ask spread estimate from daily highs and lows
+    - **Days to Liquidate**: Position value divided by the allowed share of ADV
+    - **LVaR**: One-day parametric VaR plus half the spread (mean + 3 standard deviations) paid to exit every position
+    """)
+
+def render_resampled_frontier(returns_data, max_sharpe_weights):
+    st.subheader("Resampled Max Sharpe Portfolio (Bootstrap)")
+    st.write("The max Sharpe weights come from one noisy estimate of expected returns. "
+             "Block-resampling the return history and re-optimizing each sample shows how stable they are.")
+    
+    with st.expander("Bootstrap Settings", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            n_resamples = st.slider("Resamples", 100, 2000, 300, step=100)
+            block_length = st.slider("Block length (days)", 1, 60, 20)
+        with col2:
+            confidence = st.slider("Confidence level (%)", 80, 99, 90) / 100
+            seed = st.number_input("Random seed", min_value=0, value=DEFAULT_SEED, step=1)
+        with col3:
+            n_workers = st.slider("Worker processes", 1, 8, 1)
+    
+    params = (tuple(returns_data.columns), len(returns_data), n_resamples, block_length, confidence, int(seed))
+    cached = st.session_state.get('bootstrap_results')
+    
+    if st.button("Run Bootstrap"):
+        with st.spinner(f"Re-optimizing {n_resamples} resampled histories..."), profile_stage("bootstrap_resampling"):
+            results = bootstrap_max_sharpe(returns_data, n_resamples=n_resamples, block_length=block_length,
+                                           seed=int(seed), n_workers=n_workers, confidence=confidence)
+        st.session_state.bootstrap_results = {'params': params, 'results': results}
+        cached = st.session_state.bootstrap_results
+    
+    if cached is None or cached['params'] != params:
+        st.info("Press **Run Bootstrap** to estimate confidence intervals for the current settings.")
+        return
+    
+    results = cached['results']
+    intervals = results['weight_intervals']
+    
+    fig_bands = go.Figure()
+    fig_bands.add_trace(go.Bar(
+        x=intervals.index, y=intervals['Michaud Average'], name='Michaud Average',
+        marker_color='lightblue'
+    ))
+    fig_bands.add_trace(go.Scatter(
+        x=intervals.index, y=intervals['Median'], mode='markers', name='Median',
+        marker=dict(size=9, color='navy'),
+        error_y=dict(type='data', symmetric=False,
+                     array=intervals['Upper'] - intervals['Median'],
+                     arrayminus=intervals['Median'] - intervals['Lower'])
+    ))
+    fig_bands.add_trace(go.Scatter(
+        x=intervals.index, y=max_sharpe_weights, mode='markers', name='Point Estimate',
+        marker=dict(size=11, color='gold', symbol='star')
+    ))
+    fig_bands.update_layout(
+        title=f"Max Sharpe Weights with {results['confidence']:.0%} Bootstrap Intervals",
+        xaxis_title="Stock",
+        yaxis_title="Weight",
+        yaxis_tickformat='.0%',
+        height=400
+    )
+    st.plotly_chart(fig_bands, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write("**Weight Intervals**")
+        st.dataframe(intervals.style.format("{:.2%}"), use_container_width=True)
+    with col2:
+        st.write("**Performance Intervals**")
+        st.dataframe(results['stat_intervals'].style.format({
+            'Lower': "{:.2f}", 'Median': "{:.2f}", 'Upper': "{:.2f}"
+        }), use_container_width=True)
+    
+    st.info("""
+    **Reading the Bootstrap**:
+    - **Wide weight intervals**: The optimizer's choice is driven by estimation noise
+    - **Michaud Average**: Mean of the resampled max Sharpe weights, usually more diversified and more stable
+    """)
+
+def allocation_pie(weights, names, title):
+    return px.pie(values=weights, names=names, title=title)
+
+@profiled()
+def render_portfolio_selection(stocks, results_df, weight_list, max_sharpe_idx, min_vol_idx, cov_matrix=None):
     
     if results_df is None or weight_list is None:
         st.error("Portfolio optimization results not available. Please run optimization first.")
@@ -25,11 +221,8 @@ def render_portfolio_selection(stocks, results_df, weight_list, max_sharpe_idx,
     with col1:
         st.write("**Maximum Sharpe Ratio Portfolio Analysis**")
         
-        fig_pie_max = px.pie(
-            values=max_sharpe_weights,
-            names=list(stocks.keys()),
-            title='Max Sharpe Ratio Portfolio Allocation'
-        )
+        fig_pie_max = cached_plotly("allocation_pie", allocation_pie, max_sharpe_weights, list(stocks.keys()),
+                                    'Max Sharpe Ratio Portfolio Allocation')
         st.plotly_chart(fig_pie_max, use_container_width=True)
         
         st.write(f"- **Diversification Level**: {max_sharpe_diversification:.2%}")
@@ -48,11 +241,8 @@ def render_portfolio_selection(stocks, results_df, weight_list, max_sharpe_idx,
     with col2:
         st.write("**Minimum Volatility Portfolio Analysis**")
         
-        fig_pie_min = px.pie(
-            values=min_vol_weights,
-            names=list(stocks.keys()),
-            title='Minimum Volatility Portfolio Allocation'
-        )
+        fig_pie_min = cached_plotly("allocation_pie", allocation_pie, min_vol_weights, list(stocks.keys()),
+                                    'Minimum Volatility Portfolio Allocation')
         st.plotly_chart(fig_pie_min, use_container_width=True)
         
         st.write(f"- **Diversification Level**: {min_vol_diversification:.2%}")
@@ -89,12 +279,14 @@ def render_portfolio_selection(stocks, results_df, weight_list, max_sharpe_idx,
     comparison_df = pd.DataFrame(comparison_data)
     st.dataframe(comparison_df, use_container_width=True)
     
-    st.subheader("Portfolio Recommendation Based on Correlation Analysis")
+    returns_data = get_returns_matrix(stocks)
+    corr_matrix = compute_correlation_matrix(returns_data)
     
-    returns_data = pd.DataFrame()
-    for code, df in stocks.items():
-        returns_data[code] = df['Returns']
-    corr_matrix = returns_data.corr()
+    render_risk_based_allocations(stocks, returns_data, corr_matrix, max_sharpe_weights, min_vol_weights, cov_matrix)
+    render_liquidity_check(stocks, returns_data, max_sharpe_weights, min_vol_weights, cov_matrix)
+    render_resampled_frontier(returns_data, max_sharpe_weights)
+    
+    st.subheader("Portfolio Recommendation Based on Correlation Analysis")
     
     strong_positive_pairs = []
     strong_negative_pairs = []
@@ -3,17 +3,62 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+from utils.profiling import profiled, profile_stage
+from utils.data_loader import get_returns_matrix, get_realized_volatility
+from utils.metrics import performance_metrics, rolling_metrics, ROLLING_METRICS
+from utils.kernels import cumulative_product
+from utils.minute_store import REALIZED_ESTIMATORS, RESAMPLE_RULES
 
+def render_intraday_volatility(returns_data):
+    st.subheader("Intraday Realized Volatility")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sampling = st.selectbox("Sampling frequency:", [rule for rule in RESAMPLE_RULES if rule != 'daily'], index=1)
+    with col2:
+        estimator = st.selectbox("Estimator:", REALIZED_ESTIMATORS)
+    with col3:
+        smoothing = st.slider("Smoothing (sessions)", 1, 60, 20)
+    
+    with profile_stage("realized_volatility"):
+        realized = get_realized_volatility(list(returns_data.columns), sampling)
+    if not realized:
+        st.info("No minute bars in the intraday store yet. Run akshare.py with PULL_MINUTE_BARS = True to collect them.")
+        return
+    
+    # daily estimates annualized with 252 sessions; they exclude the overnight gap, so they
+    # sit below close-to-close volatility
+    annualized = pd.DataFrame({code: frame[estimator] for code, frame in realized.items()}) * np.sqrt(252)
+    smoothed = annualized.rolling(smoothing, min_periods=1).mean()
+    fig_realized = go.Figure()
+    for column in smoothed.columns:
+        fig_realized.add_trace(go.Scatter(x=smoothed.index, y=smoothed[column], name=column, mode='lines'))
+    fig_realized.update_layout(
+        title=f"{estimator} from {sampling} bars ({smoothing}-session average, annualized)",
+        xaxis_title="Date",
+        yaxis_title="Annualized Volatility",
+        yaxis_tickformat='.0%',
+        height=400
+    )
+    st.plotly_chart(fig_realized, use_container_width=True)
+    
+    close_to_close = returns_data.std() * np.sqrt(252)
+    summary = pd.DataFrame({
+        'Sessions': annualized.notna().sum(),
+        f'Mean {estimator}': annualized.mean(),
+        'Close-to-Close Vol (full history)': close_to_close.reindex(annualized.columns),
+    })
+    st.dataframe(summary.style.format({f'Mean {estimator}': "{:.2%}", 'Close-to-Close Vol (full history)': "{:.2%}"}),
+                 use_container_width=True)
+
+@profiled()
 def render_returns_analysis(stocks):
     st.header("3. Returns Analysis")
     st.write("This section analyzes daily returns and their distribution.")
     
-    returns_data = pd.DataFrame()
-    for code, df in stocks.items():
-        returns_data[code] = df['Returns']
+    returns_data = get_returns_matrix(stocks)
     
     st.subheader("Cumulative Returns Over Time")
-    cumulative_returns = (1 + returns_data).cumprod()   #Calculate cumulative returns
+    cumulative_returns = cumulative_product(1 + returns_data)   #Calculate cumulative returns
     
     fig_returns = go.Figure()
     for column in cumulative_returns.columns:
@@ -30,27 +75,13 @@ def render_returns_analysis(stocks):
         yaxis_title="Cumulative Returns",
         height=400
     )
-    st.plotly_chart(fig_returns, use_container_width=True)
+    with profile_stage("plotly:cumulative_returns", kind="render"):
+        st.plotly_chart(fig_returns, use_container_width=True)
     
     st.subheader("Individual Stock Performance Metrics")
     
-    performance_data = []      #Calculation Metrics
-    for code in stocks.keys():
-        returns = returns_data[code].dropna()
-        total_return = cumulative_returns[code].iloc[-1] - 1
-        annual_return = returns.mean() * 252
-        annual_volatility = returns.std() * np.sqrt(252)
-        sharpe_ratio = annual_return / annual_volatility if annual_volatility != 0 else 0
-        
-        performance_data.append({
-            'Stock': code,
-            'Total Return': total_return,
-            'Annual Return': annual_return,
-            'Annual Volatility': annual_volatility,
-            'Sharpe Ratio': sharpe_ratio
-        })
-    
-    performance_df = pd.DataFrame(performance_data)
+    with profile_stage("performance_metrics"):
+        performance_df = performance_metrics(returns_data)
     st.dataframe(performance_df, use_container_width=True)
     st.info("""
     **Performance Metrics**:
@@ -58,31 +89,33 @@ def render_returns_analysis(stocks):
     - **Annualized Return**: Average rate of return per year
     - **Annualized Volatility**: Degree of price fluctuation
     - **Sharpe Ratio**: Risk-adjusted return measure
+    - **Sortino Ratio**: Return per unit of downside deviation
+    - **Max Drawdown / Days**: Deepest peak-to-trough loss and the longest time spent below a previous peak
+    - **Calmar Ratio**: Compound annual growth divided by the maximum drawdown
+    - **Beta**: Sensitivity to the equal-weight average of all loaded stocks (benchmark proxy)
     """)
     
     st.subheader("Risk-Return Scatter Plot")
     st.write("Compare absolute performance of 6 stocks (return vs. risk)")
     
-    fig_scatter = go.Figure()
-    
-    for _, row in performance_df.iterrows():
-        fig_scatter.add_trace(go.Scatter(
-            x=[row['Annual Volatility']],
-            y=[row['Annual Return']],
-            mode='markers+text',
-            name=row['Stock'],
-            text=row['Stock'],
-            textposition="middle center",
-            marker=dict(
-                size=15,
-                color='blue',
-                opacity=0.7
-            ),
-            hovertemplate=f"<b>{row['Stock']}</b><br>" +
-                         f"Annual Return: {row['Annual Return']:.2%}<br>" +
-                         f"Annual Volatility: {row['Annual Volatility']:.2%}<br>" +
-                         f"Sharpe Ratio: {row['Sharpe Ratio']:.2f}<extra></extra>"
-        ))
+    # one trace for the whole universe; per-stock values travel in customdata
+    fig_scatter = go.Figure(go.Scatter(
+        x=performance_df['Annual Volatility'],
+        y=performance_df['Annual Return'],
+        mode='markers+text' if len(performance_df) <= 50 else 'markers',
+        text=performance_df['Stock'],
+        textposition="middle center",
+        customdata=performance_df[['Sharpe Ratio']].to_numpy(),
+        marker=dict(
+            size=15,
+            color='blue',
+            opacity=0.7
+        ),
+        hovertemplate="<b>%{text}</b><br>" +
+                      "Annual Return: %{y:.2%}<br>" +
+                      "Annual Volatility: %{x:.2%}<br>" +
+                      "Sharpe Ratio: %{customdata[0]:.2f}<extra></extra>"
+    ))
 
     fig_scatter.update_layout(
         title="Risk-Return Profile of Stocks",
@@ -103,10 +136,39 @@ def render_returns_analysis(stocks):
     
     st.plotly_chart(fig_scatter, use_container_width=True)
     
+    st.subheader("Rolling Metrics")
+    col1, col2 = st.columns(2)
+    with col1:
+        rolling_metric = st.selectbox("Metric:", ROLLING_METRICS)
+    with col2:
+        window = st.slider("Rolling window (trading days)", 20, 252, 63)
+    
+    with profile_stage("rolling_metrics"):
+        rolling_df = rolling_metrics(returns_data, window, metrics=(rolling_metric,))[rolling_metric]
+    
+    fig_rolling = go.Figure()
+    for column in rolling_df.columns:
+        fig_rolling.add_trace(go.Scatter(
+            x=rolling_df.index,
+            y=rolling_df[column],
+            name=column,
+            mode='lines'
+        ))
+    
+    fig_rolling.update_layout(
+        title=f"Rolling {rolling_metric}" + ("" if rolling_metric == 'Drawdown' else f" ({window}-day window)"),
+        xaxis_title="Date",
+        yaxis_title=rolling_metric,
+        height=400
+    )
+    st.plotly_chart(fig_rolling, use_container_width=True)
+    
     st.info("""
     **Interpretation Guide**:
     - **Top-Left**: High return, low risk (ideal)
     - **Top-Right**: High return, high risk (aggressive)  
     - **Bottom-Left**: Low return, low risk (conservative)
     - **Bottom-Right**: Low return, high risk (poor)
-    """)
\ No newline at end of file
+    """)
+    
+    render_intraday_volatility(returns_data)
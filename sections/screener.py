@@ -0,0 +1,130 @@
+import threading
+import time
+import streamlit as st
+import pandas as pd
+import numpy as np
+from utils.profiling import profiled, profile_stage, cache_probe, mark_cache_miss
+from utils.data_loader import get_returns_matrix, get_trading_calendar
+from utils.liquidity import liquidity_snapshot
+from utils.screener import (build_screening_index, refresh_screening_index, correlation_to_portfolio, screen,
+                            screening_benchmark, SCREEN_COLUMNS, REBUILD_FRACTION)
+
+PERCENT_COLUMNS = ['Annual Return', 'Annual Volatility', 'Max Drawdown']
+
+@st.cache_resource(show_spinner=False)
+def screening_index_store():
+    # one slot shared across sessions; the lock makes check-and-refresh atomic, and a refresh
+    # swaps in a new index so sessions still reading the previous one are unaffected
+    mark_cache_miss("screening_index")
+    return {'index': None, 'lock': threading.Lock()}
+
+def get_screening_index(stocks):
+    returns_data = get_returns_matrix(stocks)
+    with cache_probe("screening_index"):
+        store = screening_index_store()
+    with store['lock']:
+        index = store['index']
+        stale = index is None or list(returns_data.columns) != index['codes'] or returns_data.index[-1] > index['dates'][-1]
+        if not stale:
+            return index, 0
+        
+        with profile_stage("screening_index"):
+            liquidity = liquidity_snapshot(stocks, get_trading_calendar(stocks), list(returns_data.columns))
+            if index is None:
+                index, new_sessions = build_screening_index(returns_data, liquidity), len(returns_data)
+            else:
+                index, new_sessions = refresh_screening_index(index, returns_data, liquidity)
+        store['index'] = index
+    return index, new_sessions
+
+def reference_portfolios(codes):
+    portfolios = {"Equal Weight": pd.Series(1 / len(codes), index=codes)}
+    results = st.session_state.get('portfolio_results')
+    if results is not None:
+        optimized_codes = results.get('codes', codes)
+        portfolios["Max Sharpe"] = pd.Series(results['weight_list'][results['max_sharpe_idx']], index=optimized_codes)
+        portfolios["Min Volatility"] = pd.Series(results['weight_list'][results['min_vol_idx']], index=optimized_codes)
+    return portfolios
+
+def render_filters(frame):
+    filters = {}
+    selected = st.multiselect("Filter on:", list(frame.columns),
+                              default=['Annual Volatility', 'Sharpe Ratio', 'Portfolio Correlation'])
+    for column in selected:
+        values = frame[column].replace([np.inf, -np.inf], np.nan).dropna()
+        if values.empty:
+            continue
+        low, high = float(np.floor(values.min() * 100) / 100), float(np.ceil(values.max() * 100) / 100)
+        if low == high:
+            continue
+        chosen = st.slider(column, low, high, (low, high), key=f"screen_{column}")
+        filters[column] = (chosen[0] if chosen[0] > low else None, chosen[1] if chosen[1] < high else None)
+    return filters
+
+@profiled()
+def render_screener(stocks):
+    st.header("10. Stock Screener")
+    st.write("Filters and ranks every loaded stock on precomputed return, risk, GARCH, liquidity and correlation statistics.")
+    
+    index, new_sessions = get_screening_index(stocks)
+    st.caption(f"Index: {len(index['codes']):,} stocks, {len(index['dates']):,} sessions through "
+               f"{index['dates'][-1]:%Y-%m-%d}" + (f"; {new_sessions:,} sessions added this run" if new_sessions else "")
+               + f". GARCH targets from the first {index['target_sessions']:,} sessions; rebuilt after "
+               f"{int(REBUILD_FRACTION * index['target_sessions']):,} more")
+    
+    portfolios = reference_portfolios(list(stocks.keys()))
+    reference = st.selectbox("Correlation reference portfolio:", list(portfolios.keys()), index=len(portfolios) - 2 if len(portfolios) > 1 else 0)
+    extra = {'Portfolio Correlation': correlation_to_portfolio(index, portfolios[reference])}
+    
+    with st.expander("Filters", expanded=True):
+        filters = render_filters(pd.DataFrame(dict(index['columns'], **extra)))
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sort_by = st.selectbox("Rank by:", SCREEN_COLUMNS[:-1] + ['Portfolio Correlation'], index=2)
+        with col2:
+            top_k = st.number_input("Top k", min_value=1, max_value=max(1, len(index['codes'])), value=min(20, len(index['codes'])))
+        with col3:
+            ascending = st.checkbox("Lowest first", value=sort_by in ('Annual Volatility', 'Amihud', 'Avg Correlation', 'Portfolio Correlation'))
+    
+    start = time.perf_counter()
+    results, matches = screen(index, filters, sort_by, int(top_k), ascending, extra)
+    elapsed = (time.perf_counter() - start) * 1000
+    st.caption(f"{matches:,} of {len(index['codes']):,} stocks pass the filters; query took {elapsed:.2f} ms")
+    
+    formats = {column: "{:.2%}" for column in PERCENT_COLUMNS}
+    formats.update({'Sharpe Ratio': "{:.2f}", 'Sortino Ratio': "{:.2f}", 'GARCH Persistence': "{:.3f}",
+                    'ADV (CNY)': "¥{:,.0f}", 'Amihud': "{:.4f}", 'Avg Correlation': "{:.2f}",
+                    'Portfolio Correlation': "{:.2f}", 'Sessions': "{:,.0f}"})
+    st.dataframe(results.style.format(formats, na_rep="-"), use_container_width=True)
+    
+    screened = st.session_state.get('screened_codes')
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Use these stocks in Portfolio Optimization", disabled=len(results) < 2):
+            st.session_state.screened_codes = list(results.index)
+            st.session_state.pop('portfolio_results', None)
+            screened = st.session_state.screened_codes
+    with col2:
+        if screened and st.button("Clear screened universe"):
+            st.session_state.pop('screened_codes', None)
+            st.session_state.pop('portfolio_results', None)
+            screened = None
+    if screened:
+        st.success(f"Portfolio Optimization and Selection will use {len(screened)} screened stocks: {', '.join(screened)}")
+    
+    with st.expander("Scale Check", expanded=False):
+        st.write("Builds an index over a synthetic market-wide universe and times refreshes and queries.")
+        n_tickers = st.select_slider("Synthetic tickers", [500, 1000, 3000, 5000], value=3000)
+        if st.button("Run scale check"):
+            with st.spinner("Building synthetic index..."), profile_stage("screening_benchmark"):
+                summary = screening_benchmark(n_tickers)
+            st.dataframe(pd.DataFrame([summary]), use_container_width=True, hide_index=True)
+    
+    st.info("""
+    **Screening Statistics**:
+    - **Returns, Volatility, Sharpe, Sortino, Max Drawdown**: Same definitions as the Returns Analysis table, kept as running sums
+    - **GARCH Persistence**: Alpha + Beta of the best-fitting point on a GARCH(1,1) grid with variance targeting; the variance target and mean are fixed when the index is built and refreshed sessions run through the same filter, so the index is rebuilt once enough sessions have been added to move them (see the caption above)
+    - **ADV / Amihud**: 20-session average value traded and price impact per 100M CNY
+    - **Avg Correlation**: Mean correlation with every other loaded stock
+    - **Portfolio Correlation**: Correlation with the reference portfolio's daily returns
+    """)
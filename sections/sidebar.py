@@ -1,4 +1,10 @@
 import streamlit as st
+from utils.profiling import (set_profiling_enabled, profiling_enabled, run_records,
+                             cache_stats, trace_lines, export_trace)
+from utils.kernels import kernel_backend
+from utils.compact_store import is_compact, stocks_nbytes, compact_error_report
+from utils.data_loader import load_stock_data
+from utils.figure_cache import figure_cache_stats, clear_figure_cache
 
 def render_sidebar():
     with st.sidebar:
@@ -37,5 +43,56 @@ def render_sidebar():
             index=0
         )
         
+        st.markdown("---")
+        set_profiling_enabled(st.checkbox("Show performance panel", value=False))
+        st.checkbox("Compact memory mode", value=False, key='compact_memory',
+                    help="Keep prices and returns as float32 with int32 day offsets and only the columns in use")
+    
+    return selected_module
+
+def render_performance_panel(stocks=None):
+    if not profiling_enabled():
+        return
     
-    return selected_module
\ No newline at end of file
+    with st.sidebar:
+        st.subheader("Performance")
+        records = run_records().sort_values('start_ts', kind='stable')
+        
+        if records.empty:
+            st.write("No stages recorded in this run.")
+        else:
+            timings = records[['name', 'kind', 'wall_s', 'cpu_s', 'peak_mem_bytes']].copy()
+            timings['name'] = ['  ' * depth + name for depth, name in zip(records['depth'], records['name'])]
+            timings['peak_mem_bytes'] = timings['peak_mem_bytes'] / 1024**2
+            timings.columns = ['Stage', 'Kind', 'Wall (s)', 'CPU (s)', 'Peak Mem (MB)']
+            st.dataframe(timings.style.format({'Wall (s)': "{:.3f}", 'CPU (s)': "{:.3f}", 'Peak Mem (MB)': "{:.1f}"}),
+                         use_container_width=True, hide_index=True)
+        
+        cache_df = cache_stats()
+        if not cache_df.empty:
+            st.write("**Cache hits / misses**")
+            st.dataframe(cache_df.style.format({'Hit Rate': "{:.0%}"}), use_container_width=True, hide_index=True)
+        
+        figures = figure_cache_stats()
+        st.caption(f"Figure cache: {figures['Entries']} charts, {figures['Size (MB)']:.1f} / {figures['Budget (MB)']:.0f} MB, "
+                   f"{figures['Hit Rate']:.0%} hit rate, {figures['Evictions']} evicted")
+        if st.button("Clear figure cache"):
+            clear_figure_cache()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download trace", trace_lines(), file_name="profiling_trace.jsonl",
+                               mime="application/json")
+        with col2:
+            if st.button("Append to log"):
+                st.caption(f"Appended to {export_trace()}")
+        
+        st.caption(f"Recursion kernels: {kernel_backend()}")
+        
+        if stocks is not None:
+            mode = "compact float32" if is_compact(stocks) else "float64"
+            st.caption(f"Price store: {stocks_nbytes(stocks) / 1024**2:.2f} MB ({mode})")
+            if is_compact(stocks) and st.button("Check compact-mode error bounds"):
+                report = compact_error_report(load_stock_data(False), stocks)
+                st.dataframe(report.style.format({'Max Abs Error': "{:.1e}", 'Max Rel Error': "{:.1e}", 'Bound': "{:.1e}"}),
+                             use_container_width=True, hide_index=True)
@@ -0,0 +1,125 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from utils.profiling import profiled, profile_stage
+from utils.data_loader import get_returns_matrix
+from utils.metrics import beta_to, equal_weight_benchmark
+from utils.optimizer import board_groups
+from utils.stress import (HISTORICAL_SCENARIOS, historical_scenario, hypothetical_scenario, scenario_matrix,
+                          apply_scenarios, window_drawdowns, loss_distribution, worst_names)
+
+def render_scenario_inputs(returns_data):
+    codes = list(returns_data.columns)
+    scenarios = []
+    
+    for name, (start, end) in HISTORICAL_SCENARIOS.items():
+        try:
+            scenarios.append(historical_scenario(name, returns_data, start, end))
+        except ValueError:
+            st.warning(f"{name} ({start} to {end}) is outside the loaded history.")
+    
+    with st.expander("Custom Historical Window", expanded=False):
+        use_window = st.checkbox("Add a custom window from the price history")
+        first, last = returns_data.index[0].date(), returns_data.index[-1].date()
+        col1, col2 = st.columns(2)
+        with col1:
+            start = st.date_input("Start", value=min(last, max(first, pd.Timestamp('2024-01-02').date())), min_value=first, max_value=last)
+        with col2:
+            end = st.date_input("End", value=min(last, max(first, pd.Timestamp('2024-02-05').date())), min_value=first, max_value=last)
+        if use_window:
+            try:
+                scenarios.append(historical_scenario(f"Window {start} to {end}", returns_data, start, end))
+            except ValueError as e:
+                st.warning(str(e))
+    
+    with st.expander("Hypothetical Shock", expanded=True):
+        market_shock = st.slider("Market move (%), scaled by each stock's beta", -40, 20, -15) / 100
+        board_shocks = {}
+        boards = board_groups(codes)
+        columns = st.columns(max(1, len(boards)))
+        for column, board in zip(columns, boards):
+            with column:
+                board_shocks[board] = st.slider(f"Extra {board} move (%)", -30, 30, 0, key=f"stress_board_{board}") / 100
+        betas = pd.Series(beta_to(returns_data.to_numpy(dtype=float),
+                                  equal_weight_benchmark(returns_data).to_numpy()), index=codes)
+        scenarios.append(hypothetical_scenario("Hypothetical Shock", codes, market_shock, betas, board_shocks))
+    
+    return scenarios
+
+@profiled()
+def render_stress_testing(stocks, results_df, weight_list, max_sharpe_idx, min_vol_idx):
+    st.header("7. Stress Testing")
+    st.write("Replays historical sell-offs and a user-defined shock on every portfolio from the optimization step.")
+    
+    if results_df is None or weight_list is None:
+        st.error("Portfolio optimization results not available. Please run optimization first.")
+        return
+    
+    returns_data = get_returns_matrix(stocks)
+    scenarios = render_scenario_inputs(returns_data)
+    if not scenarios:
+        return
+    
+    weights = np.vstack(weight_list)
+    with profile_stage("stress_scenarios"):
+        shocks = scenario_matrix(scenarios)
+        pnl = apply_scenarios(weights, shocks)
+        drawdowns = pd.DataFrame({scenario['name']: window_drawdowns(weights, scenario) for scenario in scenarios})
+    
+    st.subheader("Selected Portfolios")
+    named = {'Max Sharpe': max_sharpe_idx, 'Min Volatility': min_vol_idx}
+    summary_data = []
+    for scenario in scenarios:
+        name = scenario['name']
+        row = {
+            'Scenario': name,
+            'Window': f"{scenario['start']:%Y-%m-%d} to {scenario['end']:%Y-%m-%d}" if scenario['kind'] == 'historical' else '-',
+        }
+        for label, idx in named.items():
+            row[f'{label} P&L'] = f"{pnl.loc[idx, name]:.2%}"
+            row[f'{label} Max Drawdown'] = f"{drawdowns.loc[idx, name]:.2%}"
+        summary_data.append(row)
+    st.dataframe(pd.DataFrame(summary_data), use_container_width=True)
+    
+    proxied = sorted({code for scenario in scenarios for code in scenario['proxied']})
+    if proxied:
+        st.caption(f"Not yet listed in some windows, so the median stock move was used: {', '.join(proxied)}")
+    
+    st.subheader(f"Loss Distribution Across {len(weights):,} Candidate Portfolios")
+    fig_losses = go.Figure()
+    for name in pnl.columns:
+        fig_losses.add_trace(go.Box(y=pnl[name], name=name, boxpoints=False, marker_color='lightblue', showlegend=False))
+    for label, idx, color, symbol in [('Max Sharpe', max_sharpe_idx, 'gold', 'star'), ('Min Volatility', min_vol_idx, 'red', 'x')]:
+        fig_losses.add_trace(go.Scatter(
+            x=list(pnl.columns), y=pnl.loc[idx].to_numpy(), mode='markers', name=label,
+            marker=dict(size=12, color=color, symbol=symbol)
+        ))
+    fig_losses.update_layout(
+        title="Scenario P&L by Portfolio",
+        yaxis_title="Portfolio Return",
+        yaxis_tickformat='.0%',
+        height=450
+    )
+    st.plotly_chart(fig_losses, use_container_width=True)
+    
+    distribution = loss_distribution(pnl)
+    st.dataframe(distribution.style.format("{:.2%}"), use_container_width=True)
+    
+    st.subheader("Worst-Case Names")
+    scenario_name = st.selectbox("Scenario:", list(pnl.columns))
+    col1, col2 = st.columns(2)
+    for column, (label, idx) in zip((col1, col2), named.items()):
+        with column:
+            st.write(f"**{label}**")
+            st.dataframe(worst_names(weights[idx], shocks[scenario_name]).style.format({
+                'Weight': "{:.2%}", 'Stock Move': "{:.2%}", 'P&L Contribution': "{:.2%}"
+            }), use_container_width=True)
+    
+    st.info("""
+    **Reading the Stress Test**:
+    - **P&L**: Buy-and-hold return of the portfolio over the scenario window (or the instantaneous shock)
+    - **Max Drawdown**: Deepest fall inside the window, which can be worse than the end-to-end P&L
+    - **Hypothetical Shock**: Market move times each stock's beta to the equal-weight universe, plus board-level moves
+    - **Worst-Case Names**: Holdings that contribute the largest losses in the chosen scenario
+    """)
@@ -0,0 +1,90 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.allocators import (ALLOCATORS, hierarchical_risk_parity_weights, equal_risk_contribution_weights,
+                              risk_contributions)
+from utils.factor_model import fit_factor_model
+
+ALLOCATION_BUDGET_S = 5.0    # "2,000+ tickers in a few seconds", for all three allocators together
+
+
+def factor_correlation(n, seed=0):
+    rng = np.random.default_rng(seed)
+    loadings = np.hstack([rng.uniform(0.2, 0.7, (n, 1)), rng.standard_normal((n, 3)) * 0.2])
+    cov = loadings @ loadings.T + np.diag(rng.uniform(0.2, 0.6, n))
+    scale = np.sqrt(np.diag(cov))
+    codes = [f"{k:06d}" for k in range(n)]
+    corr = pd.DataFrame(cov / np.outer(scale, scale), index=codes, columns=codes)
+    return corr, pd.Series(rng.uniform(0.2, 0.6, n), index=codes)
+
+
+def covariance(corr, vols):
+    return corr * np.outer(vols, vols)
+
+
+@pytest.mark.parametrize("name", list(ALLOCATORS))
+def test_weights_are_long_only_and_fully_invested(name):
+    corr, vols = factor_correlation(60)
+    weights = ALLOCATORS[name](corr, vols)
+    assert list(weights.index) == list(corr.columns)
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights >= 0).all()
+
+
+def test_erc_contributions_are_equal():
+    corr, vols = factor_correlation(60)
+    weights = equal_risk_contribution_weights(corr, vols)
+    contributions = risk_contributions(weights, covariance(corr, vols))
+    np.testing.assert_allclose(contributions, 1 / 60, rtol=1e-6)
+
+
+def test_risk_budgets_are_met():
+    corr, vols = factor_correlation(5)
+    budgets = np.array([0.4, 0.3, 0.1, 0.1, 0.1])
+    weights = equal_risk_contribution_weights(corr, vols, budgets=budgets)
+    np.testing.assert_allclose(risk_contributions(weights, covariance(corr, vols)), budgets, rtol=1e-6)
+
+
+def test_hrp_matches_hand_worked_example():
+    # two uncorrelated pairs; within a pair the correlation is 0.9
+    codes = ['A', 'B', 'C', 'D']
+    corr = pd.DataFrame([[1.0, 0.9, 0.0, 0.0],
+                         [0.9, 1.0, 0.0, 0.0],
+                         [0.0, 0.0, 1.0, 0.9],
+                         [0.0, 0.0, 0.9, 1.0]], index=codes, columns=codes)
+    vols = pd.Series([0.1, 0.2, 0.3, 0.3], index=codes)
+
+    # top split: inverse-variance weights inside each pair give the cluster variances
+    # A/B: w = (0.8, 0.2) -> 0.08^2 + 0.04^2 + 2 * 0.9 * 0.08 * 0.04 = 0.01376
+    # C/D: w = (0.5, 0.5) -> 0.15^2 + 0.15^2 + 2 * 0.9 * 0.15 * 0.15 = 0.0855
+    ab, cd = 0.01376, 0.0855
+    ab_share = 1 - ab / (ab + cd)
+    # second split inside each pair uses the single-stock variances
+    a_share = 1 - 0.01 / (0.01 + 0.04)
+    expected = [ab_share * a_share, ab_share * (1 - a_share), (1 - ab_share) / 2, (1 - ab_share) / 2]
+
+    weights = hierarchical_risk_parity_weights(corr, vols)
+    np.testing.assert_allclose(weights[codes], expected, rtol=1e-12)
+
+
+def test_contributions_follow_the_covariance_model():
+    rng = np.random.default_rng(3)
+    returns = pd.DataFrame(rng.standard_normal((400, 8)) * 0.02, columns=list('ABCDEFGH'))
+    model = fit_factor_model(returns, n_factors=2)
+    weights = pd.Series(rng.dirichlet(np.ones(8)), index=returns.columns)
+    contributions = risk_contributions(weights, model)
+    dense = risk_contributions(weights, model.to_dense())
+    np.testing.assert_allclose(contributions, dense, rtol=1e-10)
+    assert contributions.sum() == pytest.approx(1.0)
+
+
+def test_allocators_scale_to_two_thousand_tickers():
+    corr, vols = factor_correlation(2000)
+    start = time.perf_counter()
+    for allocator in ALLOCATORS.values():
+        weights = allocator(corr, vols)
+        assert weights.sum() == pytest.approx(1.0)
+    assert time.perf_counter() - start < ALLOCATION_BUDGET_S
@@ -0,0 +1,67 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.bulk_evaluation import evaluate_portfolio_file
+
+CODES = ['000063', '002475', '600588', '688111']
+
+
+@pytest.fixture(scope='module')
+def returns_data():
+    rng = np.random.default_rng(11)
+    values = rng.standard_normal((400, len(CODES))) * 0.02 + 0.0004
+    values[:150, 3] = np.nan     # late listing
+    values[200:210, 1] = np.nan  # suspension
+    return pd.DataFrame(values, index=pd.bdate_range('2022-01-03', periods=400), columns=CODES)
+
+
+@pytest.fixture(scope='module')
+def weight_frame():
+    rng = np.random.default_rng(12)
+    weights = rng.dirichlet(np.ones(len(CODES)), size=57)
+    weights[::3, 3] = 0.0        # every third portfolio skips the late lister
+    weights /= weights.sum(axis=1, keepdims=True)
+    frame = pd.DataFrame(weights, columns=CODES)
+    frame.insert(0, 'portfolio', [f"P{k:03d}" for k in range(len(frame))])
+    frame['999999'] = 0.0        # a ticker outside the universe
+    frame.loc[5, '999999'] = 0.1
+    return frame
+
+
+def evaluate(returns_data, source, **kwargs):
+    return evaluate_portfolio_file(source, returns_data.mean() * 252, returns_data.cov() * 252,
+                                   returns_data, **kwargs)
+
+
+def test_chunked_csv_matches_single_pass(returns_data, weight_frame):
+    payload = weight_frame.to_csv(index=False).encode('utf-8')
+    single = evaluate(returns_data, payload, chunk_rows=10_000)
+    for chunk_rows in [1, 8, 20]:
+        pd.testing.assert_frame_equal(evaluate(returns_data, payload, chunk_rows=chunk_rows), single)
+    assert list(single['Portfolio']) == list(weight_frame['portfolio'])
+    assert single.loc[5, 'Unmapped Weight'] == pytest.approx(0.1)
+
+
+def test_chunked_parquet_matches_csv(returns_data, weight_frame):
+    pytest.importorskip("pyarrow")
+    buffer = io.BytesIO()
+    weight_frame.to_parquet(buffer, index=False)
+    from_csv = evaluate(returns_data, weight_frame.to_csv(index=False).encode('utf-8'))
+    from_parquet = evaluate(returns_data, buffer.getvalue(), file_format='parquet', chunk_rows=9)
+    pd.testing.assert_frame_equal(from_parquet, from_csv)
+
+
+def test_historical_var_uses_complete_sessions_only(returns_data, weight_frame):
+    results = evaluate(returns_data, weight_frame.to_csv(index=False).encode('utf-8'))
+    for k, row in weight_frame.iterrows():
+        w = row[CODES].astype(float)
+        held = w[w != 0].index
+        sessions = returns_data[held].dropna()
+        expected = -(sessions @ w[held]).quantile(0.05)
+        assert results.loc[k, 'VaR Sessions'] == len(sessions)
+        assert results.loc[k, 'Historical VaR 95%'] == pytest.approx(expected, rel=1e-10)
+    # skipping the late lister keeps its pre-listing sessions
+    assert results.loc[0, 'VaR Sessions'] > results.loc[1, 'VaR Sessions']
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.compact_store import compact_stocks, compact_error_report, is_compact, stocks_nbytes, FLOAT32_RELATIVE_ERROR
+
+
+@pytest.fixture
+def stocks():
+    rng = np.random.default_rng(21)
+    frames = {}
+    for code, start, periods in [('000063', '2023-01-03', 300), ('600588', '2023-03-01', 250), ('688111', '2023-06-01', 180)]:
+        dates = pd.bdate_range(start, periods=periods)
+        close = np.round(20 * np.cumprod(1 + rng.standard_normal(periods) * 0.02), 2)
+        frames[code] = pd.DataFrame({
+            '日期': dates.strftime('%Y-%m-%d'),
+            '股票代码': code,
+            '收盘': close,
+            '最高': np.round(close * 1.01, 2),
+            '最低': np.round(close * 0.99, 2),
+            '成交额': rng.uniform(1e7, 1e10, periods),
+            '成交量': rng.integers(1e5, 1e7, periods),
+            'Returns': pd.Series(close).pct_change().to_numpy(),
+        }, index=pd.DatetimeIndex(dates, name='Date'))
+    return frames
+
+
+def test_round_trip_within_float32_bound(stocks):
+    compact = compact_stocks(stocks)
+    for code, df in stocks.items():
+        restored = compact[code]
+        assert restored.index.equals(df.index)
+        for column in compact.columns:
+            exact = df[column].to_numpy(dtype=float)
+            narrowed = restored[column].to_numpy(dtype=float)
+            np.testing.assert_array_equal(np.isnan(narrowed), np.isnan(exact))
+            valid = ~np.isnan(exact)
+            assert np.all(np.abs(narrowed[valid] - exact[valid]) <= FLOAT32_RELATIVE_ERROR * np.abs(exact[valid]))
+        # prices quoted to the fen round back to the quote
+        np.testing.assert_array_equal(np.round(restored['收盘'].to_numpy(dtype=float), 2), df['收盘'].to_numpy())
+    assert compact_error_report(stocks, compact)['Pass'].all()
+
+
+def test_unused_columns_are_dropped(stocks):
+    compact = compact_stocks(stocks)
+    assert set(compact.columns) == {'收盘', '最高', '最低', '成交额', 'Returns'}
+    assert compact.block.dtype == np.float32
+    assert stocks_nbytes(compact) < stocks_nbytes(stocks)
+
+
+def test_mapping_behavior(stocks):
+    compact = compact_stocks(stocks)
+    assert is_compact(compact) and not is_compact(stocks)
+    assert len(compact) == len(stocks)
+    assert list(compact) == list(stocks)
+    assert '600588' in compact and '300750' not in compact
+    assert dict(compact.items()).keys() == stocks.keys()
+    assert len(compact.get('600588')) == 250
+    assert compact.get('300750') is None
+    with pytest.raises(KeyError):
+        compact['300750']
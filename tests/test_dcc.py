@@ -0,0 +1,120 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import dcc as dcc_module
+from utils.dcc import _filter_q, fit_dcc, forecast_covariance, forecast_correlation
+
+
+def unit_volatility_results(z, dates=None):
+    # fit_dcc only reads resid / conditional_volatility from each univariate fit
+    dates = pd.bdate_range('2020-01-01', periods=len(z)) if dates is None else dates
+    return {f"S{k}": SimpleNamespace(resid=pd.Series(z[:, k], index=dates),
+                                     conditional_volatility=pd.Series(1.0, index=dates))
+            for k in range(z.shape[1])}
+
+
+def simulate_dcc(n_obs, n, a, b, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.2, 0.6, (n, 1))
+    qbar = base @ base.T
+    np.fill_diagonal(qbar, 1.0)
+    q, z = qbar.copy(), np.empty((n_obs, n))
+    for t in range(n_obs):
+        d = np.sqrt(np.diag(q))
+        z[t] = np.linalg.cholesky(q / np.outer(d, d)) @ rng.standard_normal(n)
+        q = (1 - a - b) * qbar + a * np.outer(z[t], z[t]) + b * q
+    return z
+
+
+def loop_correlations(z, a, b):
+    # R_0 .. R_T from Q_0 = Qbar, plus the one-step-ahead R_{T+1}
+    n_obs = len(z)
+    qbar = z.T @ z / n_obs
+    q, correlations = qbar.copy(), []
+    for t in range(n_obs + 1):
+        if t > 0:
+            q = (1 - a - b) * qbar + a * np.outer(z[t - 1], z[t - 1]) + b * q
+        d = np.sqrt(np.diag(q))
+        correlations.append(q / np.outer(d, d))
+    return np.array(correlations[:-1]), correlations[-1]
+
+
+def test_filter_matches_plain_loop():
+    rng = np.random.default_rng(1)
+    products = rng.standard_normal((40, 6))**2
+    qbar, initial = rng.uniform(0.5, 1.5, 6), rng.uniform(0.5, 1.5, 6)
+    a, b = 0.07, 0.88
+    filtered, _ = _filter_q(products, qbar, a, b, initial)
+    expected, q = [], initial
+    for row in products:
+        q = (1 - a - b) * qbar + a * row + b * q
+        expected.append(q)
+    np.testing.assert_allclose(filtered, np.array(expected), rtol=1e-12)
+
+
+def test_stored_history_matches_plain_loop(monkeypatch):
+    # a small block size makes the recursion cross several block boundaries
+    monkeypatch.setattr(dcc_module, 'STORE_BLOCK', 7)
+    z = simulate_dcc(120, 4, 0.05, 0.9, seed=2)
+    fit = fit_dcc(unit_volatility_results(z))
+    expected, r_next = loop_correlations(z, fit['a'], fit['b'])
+    upper = np.triu_indices(4, k=1)
+    np.testing.assert_allclose(fit['history'], expected[:, upper[0], upper[1]], atol=1e-6)
+    np.testing.assert_allclose(forecast_correlation(fit, 1), r_next, atol=1e-10)
+
+
+def test_composite_likelihood_recovers_parameters():
+    z = simulate_dcc(3000, 4, 0.06, 0.9, seed=3)
+    fit = fit_dcc(unit_volatility_results(z))
+    assert fit['a'] == pytest.approx(0.06, abs=0.025)
+    assert fit['b'] == pytest.approx(0.9, abs=0.05)
+
+
+@pytest.fixture(scope='module')
+def garch_fit():
+    arch = pytest.importorskip("arch")
+    z = simulate_dcc(1500, 3, 0.05, 0.9, seed=4)
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range('2018-01-01', periods=len(z))
+    results = {}
+    for k in range(z.shape[1]):
+        # GARCH(1,1) returns driven by the correlated shocks, in percent
+        variance, values = 1.0, np.empty(len(z))
+        for t in range(len(z)):
+            values[t] = np.sqrt(variance) * z[t, k]
+            variance = 0.05 + 0.08 * values[t]**2 + 0.88 * variance
+        series = pd.Series(values * rng.uniform(0.8, 1.2), index=dates)
+        results[f"S{k}"] = arch.arch_model(series, mean='Constant', vol='GARCH', p=1, q=1).fit(disp='off')
+    return results, fit_dcc(results)
+
+
+@pytest.mark.parametrize("average", [True, False])
+def test_forecast_covariance_is_symmetric_psd(garch_fit, average):
+    results, fit = garch_fit
+    for horizon in [1, 10, 60]:
+        cov = forecast_covariance(fit, results, horizon, average=average).to_numpy()
+        np.testing.assert_allclose(cov, cov.T, atol=1e-14)
+        assert np.linalg.eigvalsh(cov).min() > -1e-12
+
+
+def test_forecast_converges_to_unconditional_covariance(garch_fit):
+    results, fit = garch_fit
+    unconditional_var = np.array([
+        result.params['omega'] / (1 - result.params['alpha[1]'] - result.params['beta[1]'])
+        for result in results.values()
+    ]) / 100**2
+    vols = np.sqrt(unconditional_var)
+    r_bar = np.diag(1 / np.sqrt(np.diag(fit['qbar']))) @ fit['qbar'] @ np.diag(1 / np.sqrt(np.diag(fit['qbar'])))
+    unconditional = r_bar * np.outer(vols, vols) * 252
+
+    far = forecast_covariance(fit, results, 3000, average=False).to_numpy()
+    np.testing.assert_allclose(far, unconditional, rtol=1e-6)
+
+    # the average over 1..h approaches the same limit, but only like 1 / h
+    gaps = [np.abs(forecast_covariance(fit, results, h).to_numpy() / unconditional - 1).max()
+            for h in [10, 100, 1000]]
+    assert gaps[0] > gaps[1] > gaps[2]
+    assert gaps[2] < 0.02
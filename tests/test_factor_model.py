@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.factor_model import fit_factor_model
+
+
+def returns_with_late_listing(n_sessions=1000, n_stocks=40, listed_from=400, seed=5):
+    rng = np.random.default_rng(seed)
+    market = rng.standard_normal(n_sessions) * 0.012
+    betas = rng.uniform(0.6, 1.4, n_stocks)
+    values = market[:, None] * betas + rng.standard_normal((n_sessions, n_stocks)) * 0.01
+    returns = pd.DataFrame(values, columns=[f"S{k}" for k in range(n_stocks)])
+    returns.iloc[:listed_from, 0] = np.nan
+    return returns
+
+
+def test_diagonal_matches_sample_variance_for_late_listing():
+    returns = returns_with_late_listing()
+    model = fit_factor_model(returns, n_factors=2)
+    np.testing.assert_allclose(model.diagonal(), returns.var().to_numpy() * 252, rtol=1e-9)
+
+
+def test_late_listing_keeps_its_common_share():
+    # the late lister has the same factor structure, so its share of common variance
+    # should match what it shows when fitted over its own sessions only
+    returns = returns_with_late_listing()
+    full = fit_factor_model(returns, n_factors=1)
+    listed = fit_factor_model(returns.dropna(), n_factors=1)
+    share = lambda model: 1 - model.specific_variances[0] / model.diagonal()[0]
+    assert abs(share(full) - share(listed)) < 0.03
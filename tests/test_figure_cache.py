@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import plotly.tools
+import pytest
+
+from sections.stock_charts import CANDLESTICK_BARS, LONGEST_MA, candlestick_figure
+from utils import figure_cache
+from utils.figure_cache import cached_plotly, clear_figure_cache, figure_cache_stats, set_figure_cache_budget
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_figure_cache()
+    yield
+    set_figure_cache_budget(64)
+    clear_figure_cache()
+
+
+def line_figure(frame):
+    return go.Figure(go.Scatter(x=frame.index, y=frame['y']))
+
+
+def counting(build):
+    calls = []
+    def wrapped(*inputs):
+        calls.append(inputs)
+        return build(*inputs)
+    return wrapped, calls
+
+
+def test_hit_returns_the_stored_payload_without_rebuilding():
+    frame = pd.DataFrame({'y': np.arange(100.0)})
+    build, calls = counting(line_figure)
+    first = cached_plotly("line", build, frame)
+    second = cached_plotly("line", build, frame.copy())
+    assert second.payload is first.payload
+    assert len(calls) == 1
+    assert figure_cache_stats()['Hits'] == 1
+
+
+def test_hit_does_no_building_or_serialization(monkeypatch):
+    frame = pd.DataFrame({'y': np.arange(100.0)})
+    cached_plotly("line", line_figure, frame)
+    serialized = []
+    monkeypatch.setattr(figure_cache.pio, 'to_json', lambda *args, **kwargs: serialized.append(args))
+    build, calls = counting(line_figure)
+    cached_plotly("line", build, frame)
+    assert not calls
+    assert not serialized
+
+
+def test_served_spec_matches_the_built_figure():
+    # the path st.plotly_chart takes from its argument to the spec it sends
+    frame = pd.DataFrame({'y': np.arange(100.0)})
+    served = cached_plotly("line", line_figure, frame)
+    spec = pio.to_json(plotly.tools.return_figure_from_figure_or_data(served, validate_figure=True), validate=False)
+    assert json.loads(spec) == json.loads(pio.to_json(line_figure(frame), validate=False))
+
+
+def test_changed_input_is_a_miss():
+    frame = pd.DataFrame({'y': np.arange(100.0)})
+    build, calls = counting(line_figure)
+    cached_plotly("line", build, frame)
+    cached_plotly("line", build, frame.assign(y=frame['y'] + 1))
+    assert len(calls) == 2
+    assert figure_cache_stats()['Misses'] == 2
+
+
+def test_budget_evicts_least_recently_used():
+    frames = [pd.DataFrame({'y': np.full(50_000, float(k))}) for k in range(3)]
+    set_figure_cache_budget(1.0)
+    for frame in frames:
+        cached_plotly("line", line_figure, frame)
+    stats = figure_cache_stats()
+    assert stats['Size (MB)'] <= 1.0
+    assert stats['Evictions'] >= 1
+    build, calls = counting(line_figure)
+    cached_plotly("line", build, frames[-1])
+    assert not calls
+
+
+def test_clear_resets_entries_and_counters():
+    frame = pd.DataFrame({'y': np.arange(10.0)})
+    cached_plotly("line", line_figure, frame)
+    cached_plotly("line", line_figure, frame)
+    clear_figure_cache()
+    stats = figure_cache_stats()
+    assert (stats['Entries'], stats['Hits'], stats['Misses'], stats['Evictions']) == (0, 0, 0, 0)
+    assert stats['Size (MB)'] == 0
+
+
+def test_figure_is_charged_its_serialized_size():
+    frame = pd.DataFrame({'y': np.arange(1000.0)})
+    figure = cached_plotly("line", line_figure, frame)
+    assert figure_cache_stats()['Size (MB)'] * 1024**2 == len(figure.payload.encode())
+
+
+def test_candlestick_from_recent_slice_matches_full_history():
+    rng = np.random.default_rng(3)
+    close = 10 + rng.standard_normal(600).cumsum() * 0.1
+    history = pd.DataFrame({'open': close, 'high': close + 0.2, 'low': close - 0.2, 'close': close},
+                           index=pd.bdate_range('2022-01-03', periods=600))
+    full = candlestick_figure(history, "000001")
+    recent = candlestick_figure(history.tail(CANDLESTICK_BARS + LONGEST_MA - 1), "000001")
+    for full_trace, recent_trace in zip(full.data, recent.data):
+        np.testing.assert_array_equal(full_trace.x, recent_trace.x)
+        for field in ('y', 'open', 'high', 'low', 'close'):
+            if field in full_trace:
+                np.testing.assert_allclose(full_trace[field], recent_trace[field], rtol=1e-9)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("arch")
+
+from arch import arch_model
+
+from utils import garch_search
+from utils.garch_search import search_ticker, search_garch_specs, VOLATILITY_SPECS, DISTRIBUTIONS, FULL_ITERATIONS
+
+
+def simulated_returns(n=1500, df=4, seed=2):
+    # GARCH(1,1) with fat-tailed shocks, in percent like the scaled returns the app passes
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_t(df, n) / np.sqrt(df / (df - 2))
+    variance, values = 1.0, np.empty(n)
+    for t in range(n):
+        values[t] = 0.05 + np.sqrt(variance) * shocks[t]
+        variance = 0.05 + 0.08 * (values[t] - 0.05)**2 + 0.9 * variance
+    return pd.Series(values, name='SIM')
+
+
+@pytest.fixture(scope='module')
+def returns():
+    return simulated_returns()
+
+
+def full_fit_scores(returns, criterion):
+    scores = {}
+    for vol_name, vol_kwargs in VOLATILITY_SPECS.items():
+        for dist_name, dist in DISTRIBUTIONS.items():
+            model = arch_model(returns, mean='Constant', dist=dist, **vol_kwargs)
+            result = garch_search._fit(model, FULL_ITERATIONS)
+            scores[(vol_name, dist_name)] = result.bic if criterion == 'bic' else result.aic
+    return scores
+
+
+@pytest.mark.parametrize("criterion", ['aic', 'bic'])
+def test_search_picks_the_best_spec_of_the_grid(returns, criterion, monkeypatch):
+    monkeypatch.setattr(garch_search, 'PRUNE_MARGIN', np.inf)
+    result, summary = search_ticker(returns, criterion)
+    scores = full_fit_scores(returns, criterion)
+    best = min(scores.values())
+    chosen = result.bic if criterion == 'bic' else result.aic
+    assert chosen == pytest.approx(best, abs=0.5)
+    ranked = [row[criterion.upper()] for row in summary['ranking']]
+    assert ranked == sorted(ranked)
+    assert len(ranked) == len(scores)
+    assert summary['pruned'] == 0
+
+
+def test_dominated_specs_are_pruned_before_the_full_fit(returns, monkeypatch):
+    full_fits = []
+    fit = garch_search._fit
+    def counting_fit(model, maxiter, starting_values=None):
+        if maxiter == FULL_ITERATIONS:
+            full_fits.append(type(model.distribution).__name__)
+        return fit(model, maxiter, starting_values)
+    monkeypatch.setattr(garch_search, '_fit', counting_fit)
+
+    result, summary = search_ticker(returns)
+    # t(4) shocks leave every normal specification far behind the fat-tailed ones
+    assert summary['pruned'] >= 3
+    assert 'Normal' not in full_fits
+    assert len(full_fits) == summary['fully_fitted'] == summary['candidates'] - summary['pruned']
+    pruned = [row for row in summary['ranking'] if row['Stage'] == 'pruned']
+    assert {row['Distribution'] for row in pruned} == {'Normal'}
+    assert result.aic == min(row['AIC'] for row in summary['ranking'] if row['Stage'] == 'full')
+
+
+def test_failed_fit_does_not_abort_the_ticker(returns, monkeypatch):
+    fit = garch_search._fit
+    def failing_egarch(model, maxiter, starting_values=None):
+        if type(model.volatility).__name__ == 'EGARCH':
+            raise RuntimeError("did not converge")
+        return fit(model, maxiter, starting_values)
+    monkeypatch.setattr(garch_search, '_fit', failing_egarch)
+
+    result, summary = search_ticker(returns)
+    assert summary['failed'] == len(DISTRIBUTIONS)
+    assert summary['candidates'] == len(VOLATILITY_SPECS) * len(DISTRIBUTIONS) - len(DISTRIBUTIONS)
+    assert type(result.model.volatility).__name__ == 'GARCH'
+
+
+def test_search_reports_errors_per_ticker(returns):
+    results, summaries, errors = search_garch_specs({'SIM': returns, 'FLAT': pd.Series(np.zeros(300))})
+    assert 'SIM' in results and 'SIM' in summaries
+    assert 'FLAT' in errors
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.kernels import (garch_variance, variance_backcast, ewma_covariance, running_drawdown,
+                           moving_average, cumulative_product)
+
+TOLERANCE = 1e-9
+
+
+@pytest.fixture(params=['numpy', 'numba'])
+def backend(request):
+    if request.param == 'numba':
+        pytest.importorskip("numba")
+    return request.param
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    values = rng.standard_t(5, (1500, 12)) * 0.02
+    values[rng.random(values.shape) < 0.02] = np.nan
+    return values
+
+
+def assert_matches(result, expected):
+    result, expected = np.asarray(result, dtype=float), np.asarray(expected, dtype=float)
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+    scale = max(1.0, np.nanmax(np.abs(expected)))
+    assert np.nanmax(np.abs(result - expected)) <= TOLERANCE * scale
+
+
+# ---- loop references ----
+
+def loop_garch_variance(eps, omega, alpha, gamma, beta, backcast):
+    sigma2 = [omega + (alpha + 0.5 * gamma + beta) * backcast]
+    for t in range(1, len(eps)):
+        shock = eps[t - 1]**2
+        sigma2.append(omega + (alpha + gamma * (eps[t - 1] < 0)) * shock + beta * sigma2[-1])
+    return np.array(sigma2)
+
+
+def loop_ewma_covariance(values, lam, initial):
+    cov = initial.copy()
+    for row in np.nan_to_num(values):
+        cov = lam * cov + (1 - lam) * np.outer(row, row)
+    return cov
+
+
+def loop_drawdown_duration(values):
+    duration = np.zeros(values.shape, dtype=np.int64)
+    for j in range(values.shape[1]):
+        wealth, peak, last_peak = 1.0, 0.0, 0
+        for t, value in enumerate(values[:, j]):
+            wealth *= 1.0 + (0.0 if np.isnan(value) else value)
+            if wealth >= peak:
+                peak, last_peak = wealth, t
+            duration[t, j] = t - last_peak
+    return duration
+
+
+# ---- kernels against references ----
+
+@pytest.mark.parametrize("gamma", [0.0, 0.08])
+def test_garch_variance_matches_loop(returns, backend, gamma):
+    eps = np.nan_to_num(returns[:, 0]) * 100
+    backcast = variance_backcast(eps)
+    result = garch_variance(eps, 0.05, 0.06, 0.88, gamma, backend=backend)
+    assert_matches(result, loop_garch_variance(eps, 0.05, 0.06, gamma, 0.88, backcast))
+
+
+@pytest.mark.parametrize("o", [0, 1])
+def test_garch_variance_matches_arch(backend, o):
+    arch = pytest.importorskip("arch")
+    rng = np.random.default_rng(1)
+    y = rng.standard_t(6, 1500) * 1.5
+    result = arch.arch_model(y, vol='GARCH', p=1, o=o, q=1).fit(disp='off')
+    params = result.params
+    # arch backcasts from the demeaned data the fit started from
+    variance = garch_variance(result.resid, params['omega'], params['alpha[1]'], params['beta[1]'],
+                              params.get('gamma[1]', 0.0), backcast=variance_backcast(y - y.mean()),
+                              backend=backend)
+    assert_matches(variance, result.conditional_volatility**2)
+
+
+def test_ewma_covariance_matches_loop(returns, backend):
+    initial = np.eye(returns.shape[1]) * 4e-4
+    assert_matches(ewma_covariance(returns, 0.94, initial, backend=backend),
+                   loop_ewma_covariance(returns, 0.94, initial))
+
+
+def test_running_drawdown_matches_pandas(returns, backend):
+    frame = pd.DataFrame(returns)
+    wealth = (1 + frame.fillna(0)).cumprod()
+    drawdown, duration = running_drawdown(frame, backend=backend)
+    assert isinstance(drawdown, pd.DataFrame)
+    assert_matches(drawdown, wealth / wealth.cummax() - 1)
+    np.testing.assert_array_equal(duration.to_numpy(), loop_drawdown_duration(returns))
+
+
+@pytest.mark.parametrize("window", [1, 5, 20])
+def test_moving_average_matches_rolling_mean(returns, backend, window):
+    frame = pd.DataFrame(returns)
+    assert_matches(moving_average(frame, window, backend=backend), frame.rolling(window).mean())
+
+
+def test_moving_average_keeps_series(backend):
+    series = pd.Series(np.arange(10.0), index=pd.date_range('2024-01-01', periods=10), name='close')
+    result = moving_average(series, 3, backend=backend)
+    assert isinstance(result, pd.Series) and result.name == 'close'
+    assert result.index.equals(series.index)
+    assert_matches(result, series.rolling(3).mean())
+
+
+def test_cumulative_product_matches_pandas(returns, backend):
+    frame = 1 + pd.DataFrame(returns)
+    assert_matches(cumulative_product(frame, backend=backend), frame.cumprod())
+
+
+def test_backends_agree(returns):
+    pytest.importorskip("numba")
+    assert_matches(moving_average(returns, 20, backend='numba'), moving_average(returns, 20, backend='numpy'))
+    assert_matches(running_drawdown(returns, backend='numba')[0], running_drawdown(returns, backend='numpy')[0])
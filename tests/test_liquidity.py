@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.liquidity import (corwin_schultz_spread, rolling_liquidity, liquidity_panels, liquidity_snapshot,
+                             liquidity_adjusted_var, AMIHUD_SCALE)
+from utils.trading_calendar import build_trading_calendar
+
+
+def test_corwin_schultz_matches_hand_worked_values():
+    high = pd.Series([10.5, 10.45, 10.6])
+    low = pd.Series([10.0, 10.05, 10.3])
+    spread = corwin_schultz_spread(high, low)
+
+    # days 1-2: beta = ln(10.5/10)^2 + ln(10.45/10.05)^2 = 0.0039038, gamma = ln(10.5/10)^2 = 0.0023805
+    # alpha = (sqrt(2 beta) - sqrt(beta)) / (3 - 2 sqrt 2) - sqrt(gamma / (3 - 2 sqrt 2)) = 0.0330506
+    # S = 2 (e^alpha - 1) / (1 + e^alpha) = 0.0330476
+    assert spread.iloc[0] == pytest.approx(0.0330476, abs=1e-7)
+    # days 2-3 give a negative alpha, which is floored at zero
+    assert spread.iloc[1] == 0.0
+    assert np.isnan(spread.iloc[2])
+
+
+def one_stock(returns, value_traded):
+    dates = pd.bdate_range('2024-01-02', periods=len(returns))
+    price = 10 * np.cumprod(1 + np.nan_to_num(returns))
+    frame = pd.DataFrame({
+        'Returns': returns,
+        '成交额': value_traded,
+        '换手率': 1.0,
+        '振幅': 2.0,
+        '最高': price * 1.01,
+        '最低': price * 0.99,
+    }, index=dates)
+    return {'600588': frame}
+
+
+def test_amihud_matches_hand_worked_values():
+    returns = [np.nan, 0.02, -0.01, 0.03]
+    value_traded = [1e8, 2e8, 5e7, 3e8]
+    stocks = one_stock(returns, value_traded)
+    panels = liquidity_panels(stocks, build_trading_calendar(stocks))
+    amihud = rolling_liquidity(panels, window=2)['amihud']['600588']
+    # |r| / value traded per 100 million CNY: 0.02 / 2, 0.01 / 0.5, 0.03 / 3
+    daily = np.array([0.02 / 2e8, 0.01 / 5e7, 0.03 / 3e8]) * AMIHUD_SCALE
+    assert amihud.iloc[1] == pytest.approx(daily[0])
+    assert amihud.iloc[2] == pytest.approx((daily[0] + daily[1]) / 2)
+    assert amihud.iloc[3] == pytest.approx((daily[1] + daily[2]) / 2)
+
+
+def test_lvar_is_at_least_var():
+    rng = np.random.default_rng(13)
+    stocks = {}
+    for code in ['000063', '600588', '688111']:
+        stocks.update({code: one_stock(rng.standard_normal(60) * 0.02, rng.uniform(1e7, 1e9, 60))['600588']})
+    calendar = build_trading_calendar(stocks)
+    snapshot = liquidity_snapshot(stocks, calendar)
+    returns = pd.DataFrame({code: df['Returns'] for code, df in stocks.items()})
+    weights = np.array([0.5, 0.3, 0.2])
+    result = liquidity_adjusted_var(weights, returns.cov() * 252, snapshot, 1e7)
+    assert result['Liquidity Cost'] >= 0
+    assert result['LVaR'] >= result['VaR'] > 0
+    assert result['LVaR'] == pytest.approx(result['VaR'] + result['Liquidity Cost'])
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.metrics import performance_metrics, rolling_metrics, equal_weight_benchmark
+
+TOLERANCE = 1e-12
+WINDOW = 63
+
+
+@pytest.fixture(scope='module')
+def returns_data():
+    rng = np.random.default_rng(6)
+    dates = pd.bdate_range('2019-01-02', periods=900)
+    values = rng.standard_t(5, (len(dates), 5)) * 0.02 + 0.0005
+    values[rng.random(values.shape) < 0.03] = np.nan    # scattered suspensions
+    values[:200, 3] = np.nan                            # late listing
+    values[500:530, 1] = np.nan                         # long halt
+    return pd.DataFrame(values, index=dates, columns=['000063', '002475', '600588', '688111', '002555'])
+
+
+@pytest.fixture(scope='module')
+def benchmark(returns_data):
+    rng = np.random.default_rng(7)
+    values = returns_data.mean(axis=1) + rng.standard_normal(len(returns_data)) * 0.002
+    values.iloc[[10, 300, 301]] = np.nan
+    return values
+
+
+def test_volatility_and_return_match_pandas(returns_data):
+    metrics = performance_metrics(returns_data).set_index('Stock')
+    np.testing.assert_allclose(metrics['Annual Volatility'], returns_data.std() * np.sqrt(252), rtol=TOLERANCE)
+    np.testing.assert_allclose(metrics['Annual Return'], returns_data.mean() * 252, rtol=TOLERANCE)
+    downside = np.sqrt((returns_data.clip(upper=0)**2).mean() * 252)
+    np.testing.assert_allclose(metrics['Sortino Ratio'], returns_data.mean() * 252 / downside, rtol=TOLERANCE)
+
+
+def test_beta_is_pairwise_complete(returns_data, benchmark):
+    metrics = performance_metrics(returns_data, benchmark).set_index('Stock')
+    for code in returns_data.columns:
+        stock = returns_data[code]
+        both = stock.notna() & benchmark.notna()
+        expected = stock.cov(benchmark) / benchmark[both].var()
+        assert metrics.loc[code, 'Beta'] == pytest.approx(expected, rel=TOLERANCE)
+
+
+def test_drawdown_matches_wealth_path(returns_data):
+    metrics = performance_metrics(returns_data).set_index('Stock')
+    wealth = (1 + returns_data.fillna(0)).cumprod()
+    np.testing.assert_allclose(metrics['Max Drawdown'], (wealth / wealth.cummax() - 1).min(), rtol=TOLERANCE)
+    np.testing.assert_allclose(metrics['Total Return'], wealth.iloc[-1] - 1, rtol=TOLERANCE)
+
+
+def test_rolling_volatility_and_sharpe_match_pandas(returns_data):
+    rolling = rolling_metrics(returns_data, WINDOW)
+    expected_vol = returns_data.rolling(WINDOW).std() * np.sqrt(252)
+    pd.testing.assert_frame_equal(rolling['Volatility'], expected_vol, rtol=1e-9, check_freq=False)
+    expected_sharpe = returns_data.rolling(WINDOW).mean() * 252 / expected_vol
+    pd.testing.assert_frame_equal(rolling['Sharpe Ratio'], expected_sharpe, rtol=1e-9, check_freq=False)
+
+
+def test_rolling_beta_matches_pandas(returns_data):
+    benchmark = equal_weight_benchmark(returns_data)
+    rolling = rolling_metrics(returns_data, WINDOW, benchmark=benchmark, metrics=('Beta',))
+    expected = pd.DataFrame({
+        code: returns_data[code].rolling(WINDOW).cov(benchmark) / benchmark.rolling(WINDOW).var()
+        for code in returns_data.columns
+    })
+    pd.testing.assert_frame_equal(rolling['Beta'], expected, rtol=1e-9, check_freq=False)
+
+
+def test_rolling_windows_with_gaps_are_empty(returns_data):
+    volatility = rolling_metrics(returns_data, WINDOW, metrics=('Volatility',))['Volatility']
+    pd.testing.assert_frame_equal(volatility.isna(), returns_data.rolling(WINDOW).std().isna(), check_freq=False)
+    assert volatility['688111'].iloc[:200 + WINDOW - 1].isna().all()
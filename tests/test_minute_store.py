@@ -0,0 +1,154 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.minute_store import (append_bars, query_bars, realized_volatility, stored_rows, open_columns,
+                                _bucket_labels, COLUMNS)
+
+
+def session_minutes(day):
+    # A-share bar end stamps: the 09:30 auction print, 09:31-11:30 and 13:01-15:00
+    morning = pd.date_range(f"{day} 09:30", f"{day} 11:30", freq='1min')
+    afternoon = pd.date_range(f"{day} 13:01", f"{day} 15:00", freq='1min')
+    return morning.append(afternoon)
+
+
+def minute_bars(days, seed=0):
+    rng = np.random.default_rng(seed)
+    stamps = pd.DatetimeIndex([]).append([session_minutes(day) for day in days])
+    close = 20 * np.exp(np.cumsum(rng.standard_normal(len(stamps)) * 0.001))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.standard_normal(len(stamps))) * 0.01
+    return pd.DataFrame({
+        '时间': stamps.strftime('%Y-%m-%d %H:%M:%S'),
+        '开盘': open_,
+        '收盘': close,
+        '最高': np.maximum(open_, close) + spread,
+        '最低': np.minimum(open_, close) - spread,
+        '成交量': rng.integers(100, 1000, len(stamps)).astype(float),
+        '成交额': rng.uniform(1e5, 1e6, len(stamps)),
+    })
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / 'minute_store')
+
+
+@pytest.fixture(scope='module')
+def bars():
+    return minute_bars(['2024-03-04', '2024-03-05', '2024-03-06'])
+
+
+def labels(stamps, rule):
+    values = pd.DatetimeIndex(stamps).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    return [str(pd.Timestamp(value).time())[:5] for value in _bucket_labels(values, rule)]
+
+
+# ---- ingestion ----
+
+def test_reappending_an_overlapping_range_is_a_noop(root, bars):
+    first = bars.iloc[:300]
+    assert append_bars('600588', first, root) == 300
+    assert append_bars('600588', first, root) == 0
+    assert append_bars('600588', bars.iloc[200:400], root) == 100
+    assert stored_rows('600588', root) == 400
+    stored = open_columns('600588', root)['close']
+    np.testing.assert_array_equal(stored, bars['收盘'].iloc[:400].to_numpy())
+
+
+def test_partial_write_is_truncated_on_next_append(root, bars):
+    append_bars('600588', bars.iloc[:200], root)
+    # a crash after some column files were extended but before meta.json was committed
+    directory = os.path.join(root, '600588')
+    for column in ['timestamp', 'open', 'close']:
+        with open(os.path.join(directory, f'{column}.bin'), 'ab') as file:
+            file.write(b'\xff' * 8 * 37 + b'\x01\x02\x03')
+    assert stored_rows('600588', root) == 200
+
+    append_bars('600588', bars.iloc[200:300], root)
+    for column, dtype in COLUMNS.items():
+        assert os.path.getsize(os.path.join(directory, f'{column}.bin')) == 300 * np.dtype(dtype).itemsize
+    stored = open_columns('600588', root)
+    np.testing.assert_array_equal(stored['close'], bars['收盘'].iloc[:300].to_numpy())
+    assert np.all(np.diff(stored['timestamp']) > 0)
+
+
+# ---- resampling ----
+
+def test_bucket_labels_around_auction_and_lunch():
+    stamps = ['2024-03-04 09:30', '2024-03-04 09:31', '2024-03-04 09:35', '2024-03-04 09:36',
+              '2024-03-04 11:29', '2024-03-04 11:30', '2024-03-04 13:01', '2024-03-04 13:05',
+              '2024-03-04 13:06', '2024-03-04 15:00']
+    assert labels(stamps, '1min') == ['09:31', '09:31', '09:35', '09:36', '11:29', '11:30',
+                                      '13:01', '13:05', '13:06', '15:00']
+    assert labels(stamps, '5min') == ['09:35', '09:35', '09:35', '09:40', '11:30', '11:30',
+                                      '13:05', '13:05', '13:10', '15:00']
+    assert labels(stamps, '30min') == ['10:00', '10:00', '10:00', '10:00', '11:30', '11:30',
+                                       '13:30', '13:30', '13:30', '15:00']
+    # hourly bars end at 10:30, 11:30, 14:00 and 15:00; none is labelled inside the lunch break
+    assert labels(stamps, '60min') == ['10:30', '10:30', '10:30', '10:30', '11:30', '11:30',
+                                       '14:00', '14:00', '14:00', '15:00']
+
+
+def test_resampled_session_has_the_expected_bars(root, bars):
+    append_bars('600588', bars, root)
+    five = query_bars('600588', '2024-03-04', '2024-03-04 23:59', rule='5min', root=root)
+    assert len(five) == 48
+    first = five.iloc[0]
+    raw = bars.iloc[:6]   # the 09:30 auction print plus 09:31-09:35
+    assert first['open'] == raw['开盘'].iloc[0]
+    assert first['close'] == raw['收盘'].iloc[-1]
+    assert first['high'] == raw['最高'].max()
+    assert first['volume'] == raw['成交量'].sum()
+    hourly = query_bars('600588', '2024-03-04', '2024-03-04 23:59', rule='60min', root=root)
+    assert [str(stamp.time())[:5] for stamp in hourly.index] == ['10:30', '11:30', '14:00', '15:00']
+
+
+@pytest.mark.parametrize("rule", ['1min', '5min', '15min', '60min', 'daily'])
+def test_chunked_query_matches_single_pass(root, bars, rule):
+    append_bars('600588', bars, root)
+    whole = query_bars('600588', rule=rule, root=root)
+    for chunk_rows in [7, 61, 250]:
+        pd.testing.assert_frame_equal(query_bars('600588', rule=rule, root=root, chunk_rows=chunk_rows), whole)
+    ranged = query_bars('600588', '2024-03-05 10:00', '2024-03-06 11:00', rule=rule, root=root, chunk_rows=13)
+    pd.testing.assert_frame_equal(
+        ranged, query_bars('600588', '2024-03-05 10:00', '2024-03-06 11:00', rule=rule, root=root))
+
+
+# ---- realized volatility ----
+
+def test_estimators_match_hand_computed_values(root):
+    # one session of four 1-minute bars
+    frame = pd.DataFrame({
+        '时间': ['2024-03-04 09:31', '2024-03-04 09:32', '2024-03-04 09:33', '2024-03-04 09:34'],
+        '开盘': [10.0, 10.1, 10.0, 10.2],
+        '收盘': [10.1, 10.0, 10.2, 10.3],
+        '最高': [10.2, 10.15, 10.25, 10.4],
+        '最低': [9.9, 9.95, 10.0, 10.15],
+        '成交量': [1.0] * 4,
+        '成交额': [1.0] * 4,
+    })
+    append_bars('000063', frame, root)
+    result = realized_volatility('000063', sampling='1min', root=root).iloc[0]
+
+    returns = np.log([10.0 / 10.1, 10.2 / 10.0, 10.3 / 10.2])
+    assert result['Realized Vol'] == pytest.approx(np.sqrt(np.sum(returns**2)))
+    bipower = np.pi / 2 * (abs(returns[0]) * abs(returns[1]) + abs(returns[1]) * abs(returns[2]))
+    assert result['Bipower Vol'] == pytest.approx(np.sqrt(bipower))
+    log_range, log_body = np.log(10.4 / 9.9), np.log(10.3 / 10.0)
+    assert result['Parkinson Vol'] == pytest.approx(np.sqrt(log_range**2 / (4 * np.log(2))))
+    garman_klass = 0.5 * log_range**2 - (2 * np.log(2) - 1) * log_body**2
+    assert result['Garman-Klass Vol'] == pytest.approx(np.sqrt(garman_klass))
+    assert result['Bars'] == 4
+
+
+def test_overnight_returns_are_excluded(root, bars):
+    append_bars('600588', bars, root)
+    together = realized_volatility('600588', sampling='5min', root=root)
+    append_bars('000001', bars[bars['时间'] < '2024-03-05'], root)
+    alone = realized_volatility('000001', sampling='5min', root=root)
+    assert together.iloc[0]['Realized Vol'] == pytest.approx(alone.iloc[0]['Realized Vol'])
+    assert len(together) == 3
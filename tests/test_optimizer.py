@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import optimizer
+from utils.optimizer import constrained_frontier, board_groups, FEASIBILITY_TOLERANCE
+
+CODES = ['688111', '688981', '300750', '600588', '600519', '000063', '002475', '002555']
+
+
+@pytest.fixture(scope='module')
+def moments():
+    rng = np.random.default_rng(8)
+    factor = rng.standard_normal((750, 1)) * 0.012
+    returns = factor * rng.uniform(0.6, 1.4, len(CODES)) + rng.standard_normal((750, len(CODES))) * 0.015
+    returns += rng.uniform(-0.0002, 0.0012, len(CODES))
+    frame = pd.DataFrame(returns, columns=CODES)
+    return frame.mean() * 252, frame.cov() * 252
+
+
+def assert_feasible(weight_list, lower=0.0, upper=1.0):
+    for w in weight_list:
+        assert w.sum() == pytest.approx(1.0, abs=FEASIBILITY_TOLERANCE)
+        assert np.all(w >= lower - FEASIBILITY_TOLERANCE)
+        assert np.all(w <= upper + FEASIBILITY_TOLERANCE)
+
+
+def test_frontier_respects_max_weight(moments):
+    mean_returns, cov_matrix = moments
+    results_df, weight_list, failed = constrained_frontier(mean_returns, cov_matrix, n_points=15, max_weight=0.2)
+    assert not failed
+    assert len(weight_list) == len(results_df) >= 15
+    assert_feasible(weight_list, upper=0.2)
+    assert results_df['Return'].is_monotonic_increasing
+
+
+def test_frontier_respects_board_caps(moments):
+    mean_returns, cov_matrix = moments
+    groups = board_groups(CODES)
+    caps = {'STAR Market': (groups['STAR Market'], 0.15), 'ChiNext': (groups['ChiNext'], 0.1)}
+    _, weight_list, _ = constrained_frontier(mean_returns, cov_matrix, n_points=12, group_caps=caps)
+    assert_feasible(weight_list)
+    for members, cap in caps.values():
+        columns = [CODES.index(code) for code in members]
+        for w in weight_list:
+            assert w[columns].sum() <= cap + FEASIBILITY_TOLERANCE
+
+
+def test_frontier_respects_turnover_limit(moments):
+    mean_returns, cov_matrix = moments
+    current = np.full(len(CODES), 1 / len(CODES))
+    _, weight_list, _ = constrained_frontier(mean_returns, cov_matrix, n_points=12,
+                                             current_weights=current, max_turnover=0.25)
+    assert_feasible(weight_list)
+    for w in weight_list:
+        assert 0.5 * np.abs(w - current).sum() <= 0.25 + 2 * FEASIBILITY_TOLERANCE
+
+
+def test_infeasible_bounds_raise(moments):
+    mean_returns, cov_matrix = moments
+    with pytest.raises(ValueError, match="cannot sum to 100%"):
+        constrained_frontier(mean_returns, cov_matrix, max_weight=0.1)
+    with pytest.raises(ValueError, match="cannot sum to 100%"):
+        constrained_frontier(mean_returns, cov_matrix, min_weight=0.2)
+
+
+def test_infeasible_constraints_raise(moments):
+    mean_returns, cov_matrix = moments
+    # every board capped at 10% cannot hold a fully invested portfolio
+    caps = {board: (members, 0.1) for board, members in board_groups(CODES).items()}
+    with pytest.raises(ValueError, match="infeasible"):
+        constrained_frontier(mean_returns, cov_matrix, group_caps=caps)
+
+
+def test_failed_targets_are_reported(moments, monkeypatch):
+    mean_returns, cov_matrix = moments
+    mu = mean_returns.to_numpy()
+    minimize = optimizer.minimize
+
+    def failing_above(threshold):
+        def wrapped(fun, x0, *args, constraints=(), **kwargs):
+            result = minimize(fun, x0, *args, constraints=constraints, **kwargs)
+            target_constraints = [c for c in constraints if c['type'] == 'eq'][1:]
+            if target_constraints:
+                target = mu @ x0[:len(mu)] - target_constraints[0]['fun'](x0)
+                if target > threshold:
+                    result.success = False
+            return result
+        return wrapped
+
+    threshold = np.quantile(mu, 0.75)
+    monkeypatch.setattr(optimizer, 'minimize', failing_above(threshold))
+    results_df, weight_list, failed = constrained_frontier(mean_returns, cov_matrix, n_points=20)
+    assert failed
+    assert all(target > threshold for target in failed)
+    assert len(weight_list) == len(results_df)
+    assert_feasible(weight_list)
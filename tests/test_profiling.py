@@ -0,0 +1,48 @@
+import tracemalloc
+
+import pytest
+
+from utils import profiling
+from utils.profiling import profile_stage, set_profiling_enabled, start_profiling_run
+
+
+@pytest.fixture(autouse=True)
+def profiling_off(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV_VAR, raising=False)
+    set_profiling_enabled(False)
+    profiling._tracing_sessions.clear()
+    yield
+    set_profiling_enabled(False)
+    profiling._tracing_sessions.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_abandoned_session_stops_tracing_on_next_rerun():
+    set_profiling_enabled(True)
+    with profile_stage("load"):
+        pass
+    assert tracemalloc.is_tracing()
+
+    # another session's tab was closed with profiling on: it never turns it off itself
+    set_profiling_enabled(False)
+    profiling._tracing_sessions['closed-tab'] = 0.0
+    tracemalloc.start()
+    start_profiling_run()
+    assert 'closed-tab' not in profiling._tracing_sessions
+    assert not tracemalloc.is_tracing()
+
+
+def test_active_session_keeps_tracing_through_reruns():
+    set_profiling_enabled(True)
+    with profile_stage("load"):
+        pass
+    start_profiling_run()
+    assert tracemalloc.is_tracing()
+
+
+def test_environment_enabled_session_is_registered(monkeypatch):
+    monkeypatch.setenv(profiling.PROFILE_ENV_VAR, "1")
+    state = profiling._new_state("env-session")
+    assert state['enabled']
+    assert 'env-session' in profiling._tracing_sessions
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.kernels import ewma_covariance, garch_variance, variance_backcast
+from utils.replay import (frame_feed, start_replay, replay, synthetic_feed, take_warmup, _rolling_std,
+                          EWMA_LAMBDA, ROLLING_WINDOW)
+
+N_OBS, N_ASSETS, WARMUP = 400, 8, 60
+
+
+def assert_matches(result, expected):
+    result, expected = np.asarray(result, dtype=float), np.asarray(expected, dtype=float)
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+    assert np.nanmax(np.abs(result - expected)) <= 1e-9 * max(1.0, np.nanmax(np.abs(expected)))
+
+
+@pytest.fixture(scope='module')
+def replayed():
+    # streamed state after every bar, next to the full-history returns it should reproduce
+    rng = np.random.default_rng(0)
+    returns = rng.standard_t(5, (N_OBS, N_ASSETS)) * 0.01
+    returns[rng.random(returns.shape) < 0.03] = np.nan
+    prices = pd.DataFrame(100 * np.cumprod(1 + np.nan_to_num(returns), axis=0))
+    prices = prices.where(~np.isnan(returns))
+    prices.iloc[0] = 100.0
+    weights = np.full(N_ASSETS, 1 / N_ASSETS)
+
+    state = start_replay(prices.iloc[:WARMUP], weights, window=ROLLING_WINDOW)
+    streamed_vol = []
+    for _ in replay(frame_feed(prices.iloc[WARMUP:]), state):
+        streamed_vol.append(_rolling_std(state['rolling'], state['min_periods']))
+
+    full = prices.ffill().pct_change(fill_method=None).where(prices.notna()).iloc[1:]
+    return state, weights, full, np.array(streamed_vol)
+
+
+def test_rolling_volatility_matches_full_recompute(replayed):
+    state, _, full, streamed_vol = replayed
+    expected = full.rolling(ROLLING_WINDOW, min_periods=state['min_periods']).std().to_numpy()[WARMUP - 1:]
+    assert_matches(streamed_vol, expected)
+
+
+def test_ewma_covariance_matches_full_recompute(replayed):
+    state, _, full, _ = replayed
+    x = full.to_numpy()
+    warm = np.nan_to_num(x[:WARMUP - 1])
+    assert_matches(state['cov'], ewma_covariance(x, EWMA_LAMBDA, warm.T @ warm / len(warm)))
+
+
+def test_garch_variance_matches_full_filter(replayed):
+    state, _, full, _ = replayed
+    x = full.to_numpy()
+    observed = ~np.isnan(x)
+    garch = state['garch']
+    expected = np.empty(N_ASSETS)
+    for j in range(N_ASSETS):
+        eps = x[observed[:, j], j]
+        warm_eps = x[:WARMUP - 1][observed[:WARMUP - 1, j], j]
+        sigma2 = garch_variance(eps, garch['omega'][j], garch['alpha'], garch['beta'], garch['gamma'],
+                                backcast=variance_backcast(warm_eps))
+        # the state holds the one-step-ahead variance after the last bar
+        expected[j] = (garch['omega'][j] + (garch['alpha'] + garch['gamma'] * (eps[-1] < 0)) * eps[-1]**2
+                       + garch['beta'] * sigma2[-1])
+    assert_matches(garch['variance'], expected)
+
+
+def test_portfolio_value_matches_buy_and_hold(replayed):
+    state, weights, full, _ = replayed
+    stream = np.nan_to_num(full.to_numpy()[WARMUP - 1:])
+    expected = weights * state['initial_value'] @ np.prod(1 + stream, axis=0)
+    assert state['value'] == pytest.approx(expected, rel=1e-9)
+
+
+def test_synthetic_feed_is_reproducible():
+    codes = ['A', 'B', 'C']
+    first = take_warmup(synthetic_feed(codes, 50, seed=7), 50)
+    second = take_warmup(synthetic_feed(codes, 50, seed=7), 50)
+    pd.testing.assert_frame_equal(first, second)
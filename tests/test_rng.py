@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.rng import generator, seed_sequence, chunk_streams, chunk_sizes
+from utils.optimizer import random_portfolios
+from utils.resampling import bootstrap_max_sharpe
+
+
+@pytest.fixture(scope='module')
+def returns_data():
+    rng = np.random.default_rng(4)
+    values = rng.standard_normal((300, 4)) * 0.02 + 0.0004
+    return pd.DataFrame(values, columns=['A', 'B', 'C', 'D'])
+
+
+def test_random_portfolios_do_not_depend_on_worker_count(returns_data):
+    mean_returns = returns_data.mean() * 252
+    cov_matrix = returns_data.cov() * 252
+    single = random_portfolios(mean_returns, cov_matrix, n_portfolios=5000, chunk_size=700, n_workers=1)
+    parallel = random_portfolios(mean_returns, cov_matrix, n_portfolios=5000, chunk_size=700, n_workers=2)
+    for a, b in zip(single, parallel):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_bootstrap_does_not_depend_on_worker_count(returns_data):
+    single = bootstrap_max_sharpe(returns_data, n_resamples=40, chunk_size=15, n_workers=1)
+    parallel = bootstrap_max_sharpe(returns_data, n_resamples=40, chunk_size=15, n_workers=2)
+    pd.testing.assert_frame_equal(single['weights'], parallel['weights'], check_exact=True)
+    pd.testing.assert_frame_equal(single['stats'], parallel['stats'], check_exact=True)
+
+
+def test_chunk_streams_are_fixed_by_chunking():
+    streams = chunk_streams(7, 1050, 200, stream='random_portfolios')
+    assert [size for _, size in streams] == chunk_sizes(1050, 200) == [200] * 5 + [50]
+    again = chunk_streams(7, 1050, 200, stream='random_portfolios')
+    for (a, _), (b, _) in zip(streams, again):
+        assert a.generate_state(4).tolist() == b.generate_state(4).tolist()
+    # chunks draw from distinct children
+    states = {tuple(sequence.generate_state(4)) for sequence, _ in streams}
+    assert len(states) == len(streams)
+
+
+def test_seed_sequence_is_stable_across_calls():
+    a = seed_sequence(42, 'forecast_surface', '600588')
+    b = seed_sequence(42, 'forecast_surface', '600588')
+    assert a.spawn_key == b.spawn_key
+    assert a.generate_state(8).tolist() == b.generate_state(8).tolist()
+
+
+@pytest.mark.parametrize("left, right", [
+    (('factor_model',), ('replay_feed',)),
+    (('forecast_surface', '600588'), ('forecast_surface', '000063')),
+    (('random_portfolios',), ('bootstrap_max_sharpe',)),
+])
+def test_different_streams_give_independent_draws(left, right):
+    a = generator(42, *left).standard_normal(20000)
+    b = generator(42, *right).standard_normal(20000)
+    assert not np.array_equal(a, b)
+    # uncorrelated to within a few standard errors of 1 / sqrt(n)
+    assert abs(np.corrcoef(a, b)[0, 1]) < 4 / np.sqrt(len(a))
+    assert abs(np.corrcoef(a[1:], b[:-1])[0, 1]) < 4 / np.sqrt(len(a))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from utils.screener import build_screening_index, refresh_screening_index, synthetic_returns, REBUILD_FRACTION
+
+RUNNING_COLUMNS = ['Annual Return', 'Annual Volatility', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown', 'Sessions']
+
+
+@pytest.fixture(scope='module')
+def returns_data():
+    return synthetic_returns(n_tickers=300, n_sessions=400, seed=11)
+
+
+def test_refresh_matches_rebuild_on_running_statistics(returns_data):
+    build = int(len(returns_data) / (1 + REBUILD_FRACTION)) + 1
+    index = build_screening_index(returns_data.iloc[:build])
+    refreshed, added = refresh_screening_index(index, returns_data)
+    rebuilt = build_screening_index(returns_data)
+    assert added == len(returns_data) - build
+    assert refreshed['target_sessions'] == build
+    for column in RUNNING_COLUMNS:
+        np.testing.assert_allclose(refreshed['columns'][column], rebuilt['columns'][column], rtol=1e-9, equal_nan=True)
+
+
+def test_refresh_rebuilds_once_targets_are_stale(returns_data):
+    index = build_screening_index(returns_data.iloc[:350])
+    refreshed, added = refresh_screening_index(index, returns_data)
+    rebuilt = build_screening_index(returns_data)
+    assert added == 50
+    assert refreshed['target_sessions'] == len(returns_data)
+    np.testing.assert_array_equal(refreshed['columns']['GARCH Persistence'], rebuilt['columns']['GARCH Persistence'])
+
+
+def test_refresh_leaves_previous_index_untouched(returns_data):
+    index = build_screening_index(returns_data.iloc[:390])
+    before = {name: values.copy() for name, values in index['columns'].items()}
+    loglik = index['garch']['loglik'].copy()
+    refreshed, _ = refresh_screening_index(index, returns_data)
+    assert refreshed is not index
+    assert len(index['dates']) == 390
+    np.testing.assert_array_equal(index['garch']['loglik'], loglik)
+    for name, values in before.items():
+        np.testing.assert_array_equal(index['columns'][name], values)
+
+
+def direct_average_correlation(returns_data):
+    values = returns_data.to_numpy()
+    observed = ~np.isnan(values)
+    z = np.where(observed, (values - np.nanmean(values, axis=0)) / np.nanstd(values, axis=0, ddof=1), 0.0)
+    return (z.T @ z.sum(axis=1) - (z * z).sum(axis=0)) / (observed.sum(axis=0) - 1) / (values.shape[1] - 1)
+
+
+def test_refresh_matches_rebuild_on_average_correlation(returns_data):
+    index = build_screening_index(returns_data.iloc[:370])
+    refreshed, _ = refresh_screening_index(index, returns_data.iloc[:385])
+    refreshed, _ = refresh_screening_index(refreshed, returns_data)
+    rebuilt = build_screening_index(returns_data)
+    assert refreshed['target_sessions'] == 370
+    # the refresh only appends rows; the build cross-products are shared, not recomputed
+    assert refreshed['cross'] is index['cross']
+    assert len(refreshed['appended']['x']) == len(returns_data) - 370
+    np.testing.assert_allclose(refreshed['columns']['Avg Correlation'], rebuilt['columns']['Avg Correlation'],
+                               rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(rebuilt['columns']['Avg Correlation'], direct_average_correlation(returns_data),
+                               rtol=1e-9, atol=1e-12)
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from utils.trading_calendar import build_trading_calendar, align_column, align_series
+
+
+def stocks():
+    sessions = pd.bdate_range('2024-01-02', periods=10)
+    early = pd.DataFrame({'收盘': np.arange(10.0)}, index=sessions)
+    # lists on the fourth session and is suspended on the seventh
+    late_sessions = sessions[3:].delete(3)
+    late = pd.DataFrame({'收盘': 100 + np.arange(len(late_sessions), dtype=float)}, index=late_sessions)
+    return {'000063': early, '688111': late}
+
+
+def test_align_series_places_values_by_session():
+    data = stocks()
+    calendar = build_trading_calendar(data)
+    late_index = data['688111'].index
+    series = {'000063': pd.Series(np.arange(10.0) / 10, index=data['000063'].index),
+              '688111': pd.Series(np.arange(len(late_index), dtype=float), index=late_index)}
+    aligned = align_series(calendar, series)
+
+    assert aligned.index.equals(calendar['dates'])
+    np.testing.assert_array_equal(aligned['000063'], np.arange(10.0) / 10)
+    late = aligned['688111']
+    assert late.iloc[:3].isna().all() and np.isnan(late.iloc[6])
+    np.testing.assert_array_equal(late.dropna().to_numpy(), series['688111'].to_numpy())
+    assert list(late.dropna().index) == list(late_index)
+
+
+def test_align_series_matches_align_column_for_a_price_column():
+    data = stocks()
+    calendar = build_trading_calendar(data)
+    aligned = align_series(calendar, {code: df['收盘'] for code, df in data.items()})
+    pd.testing.assert_frame_equal(aligned, align_column(data, calendar, '收盘'))
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+
+from utils.optimizer import covariance_operator
+
+# All allocators take the correlation matrix plus per-stock volatilities, so the
+# covariance is never inverted and memory stays at a single N x N matrix.
+
+def _as_arrays(corr_matrix, volatilities):
+    codes = list(corr_matrix.columns)
+    corr = np.asarray(corr_matrix, dtype=float)
+    vols = np.asarray(pd.Series(volatilities).reindex(codes), dtype=float)
+    corr = np.nan_to_num(corr, nan=0.0)
+    np.fill_diagonal(corr, 1.0)
+    return codes, corr, vols
+
+def inverse_volatility_weights(corr_matrix, volatilities):
+    codes, _, vols = _as_arrays(corr_matrix, volatilities)
+    inv = 1.0 / vols
+    return pd.Series(inv / inv.sum(), index=codes)
+
+def correlation_distance(corr):
+    return np.sqrt(np.clip(0.5 * (1.0 - corr), 0.0, 1.0))
+
+def quasi_diagonal_order(corr):
+    # single linkage on the correlation distance is an O(N^2) minimum spanning tree
+    distance = correlation_distance(corr)
+    np.fill_diagonal(distance, 0.0)
+    links = linkage(squareform(distance, checks=False), method='single')
+    return leaves_list(links)
+
+def hierarchical_risk_parity_weights(corr_matrix, volatilities):
+    codes, corr, vols = _as_arrays(corr_matrix, volatilities)
+    n = len(codes)
+    if n == 1:
+        return pd.Series([1.0], index=codes)
+
+    order = quasi_diagonal_order(corr)
+    corr = corr[np.ix_(order, order)]
+    vols = vols[order]
+    inv_var = 1.0 / vols**2
+
+    def cluster_variance(start, stop):
+        w = inv_var[start:stop] / inv_var[start:stop].sum()
+        scaled = w * vols[start:stop]
+        return scaled @ corr[start:stop, start:stop] @ scaled
+
+    # recursive bisection over contiguous ranges of the quasi-diagonal order
+    weights = np.ones(n)
+    clusters = [(0, n)]
+    while clusters:
+        next_clusters = []
+        for start, stop in clusters:
+            if stop - start < 2:
+                continue
+            mid = (start + stop) // 2
+            left_var = cluster_variance(start, mid)
+            right_var = cluster_variance(mid, stop)
+            alpha = 1.0 - left_var / (left_var + right_var)
+            weights[start:mid] *= alpha
+            weights[mid:stop] *= 1.0 - alpha
+            next_clusters.extend([(start, mid), (mid, stop)])
+        clusters = next_clusters
+
+    result = np.empty(n)
+    result[order] = weights
+    return pd.Series(result / result.sum(), index=codes)
+
+def equal_risk_contribution_weights(corr_matrix, volatilities, budgets=None, tol=1e-8, max_sweeps=200):
+    codes, corr, vols = _as_arrays(corr_matrix, volatilities)
+    n = len(codes)
+    b = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=float) / np.sum(budgets)
+
+    # cyclical coordinate descent on the correlation matrix (Griveau-Billion et al.),
+    # solving for y = w * vol so each sweep is O(N^2) with one running product corr @ y
+    y = b / np.sqrt(b.sum())
+    corr_y = corr @ y
+    for _ in range(max_sweeps):
+        for i in range(n):
+            c = corr_y[i] - y[i]
+            new_y = (-c + np.sqrt(c * c + 4.0 * b[i])) / 2.0
+            corr_y += corr[:, i] * (new_y - y[i])
+            y[i] = new_y
+        contributions = y * corr_y
+        if np.max(np.abs(contributions / contributions.sum() - b)) < tol:
+            break
+
+    weights = y / vols
+    return pd.Series(weights / weights.sum(), index=codes)
+
+def risk_contributions(weights, cov_matrix):
+    # each stock's share of portfolio variance, w_i (Sigma w)_i / w' Sigma w, under the same
+    # covariance model (sample, DCC forecast or factor model) the portfolio is reported with
+    codes = list(cov_matrix.columns)
+    w = np.asarray(pd.Series(weights).reindex(codes), dtype=float)
+    sigma_w = covariance_operator(cov_matrix).dot(w)
+    return pd.Series(w * sigma_w / (w @ sigma_w), index=codes)
+
+ALLOCATORS = {
+    'Hierarchical Risk Parity': hierarchical_risk_parity_weights,
+    'Equal Risk Contribution': equal_risk_contribution_weights,
+    'Inverse Volatility': inverse_volatility_weights,
+}
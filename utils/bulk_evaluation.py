@@ -0,0 +1,116 @@
+import io
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from utils.optimizer import covariance_operator
+
+CHUNK_ROWS = 2000
+ID_COLUMNS = ('portfolio', 'portfolio_id', 'id', 'name', 'client')
+
+def _read_chunks(source, file_format, chunk_rows):
+    if file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Reading Parquet files requires pyarrow (pip install pyarrow)")
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+
+def iter_weight_chunks(source, codes, file_format='csv', chunk_rows=CHUNK_ROWS):
+    # yields (portfolio ids, P x N weights aligned to `codes`, weight on unknown tickers)
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    offset = 0
+    for chunk in _read_chunks(source, file_format, chunk_rows):
+        chunk.columns = [str(column).strip() for column in chunk.columns]
+        id_column = next((c for c in chunk.columns if c.lower() in ID_COLUMNS), None)
+        if id_column is None and chunk.columns[0] not in codes and not pd.api.types.is_numeric_dtype(chunk[chunk.columns[0]]):
+            id_column = chunk.columns[0]
+
+        if id_column is not None:
+            ids = chunk.pop(id_column).astype(str).to_numpy()
+        else:
+            ids = np.arange(offset, offset + len(chunk)).astype(str)
+        offset += len(chunk)
+
+        numeric = chunk.apply(pd.to_numeric, errors='coerce').fillna(0.0)
+        unknown = [c for c in numeric.columns if c not in codes]
+        weights = numeric.reindex(columns=codes, fill_value=0.0).to_numpy(dtype=float)
+        yield ids, weights, numeric[unknown].sum(axis=1).to_numpy()
+
+def evaluate_weights(weights, mean_returns, cov_matrix, returns_history=None, confidence=0.95,
+                     risk_free_rate=0.0, periods_per_year=252):
+    # every portfolio in the P x N block at once; VaR is one-day, as a positive loss
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = covariance_operator(cov_matrix)
+    gross = weights.sum(axis=1)
+
+    expected_return = weights @ mu
+    sigma_w = cov.dot(weights.T).T
+    variance = np.einsum('ij,ij->i', weights, sigma_w)
+    volatility = np.sqrt(np.maximum(variance, 0.0))
+
+    daily_mean = expected_return / periods_per_year
+    daily_vol = volatility / np.sqrt(periods_per_year)
+    z = norm.ppf(confidence)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = (expected_return - risk_free_rate) / volatility
+        contributions = weights * sigma_w / variance[:, None]
+
+    results = {
+        'Gross Weight': gross,
+        'Expected Return': expected_return,
+        'Volatility': volatility,
+        'Sharpe Ratio': sharpe,
+        f'Parametric VaR {confidence:.0%}': z * daily_vol - daily_mean,
+    }
+    if returns_history is not None:
+        # each portfolio uses only the sessions where every stock it holds traded, so
+        # pre-listing and suspended sessions are not counted as 0% returns
+        observed = ~np.isnan(returns_history)
+        portfolio_returns = weights @ np.where(observed, returns_history, 0.0).T
+        held = (weights != 0).astype(float)
+        complete = (held @ (~observed).astype(float).T) == 0
+        portfolio_returns[~complete] = np.nan
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)   # portfolios with no complete session
+            results[f'Historical VaR {confidence:.0%}'] = -np.nanquantile(portfolio_returns, 1 - confidence, axis=1)
+        results['VaR Sessions'] = complete.sum(axis=1)
+    return results, contributions
+
+def evaluate_portfolio_file(source, mean_returns, cov_matrix, returns_data=None, file_format='csv',
+                            chunk_rows=CHUNK_ROWS, confidence=0.95, include_contributions=False):
+    # weights are streamed chunk by chunk; only the per-portfolio results are kept
+    codes = list(mean_returns.index)
+    history = None
+    if returns_data is not None:
+        history = returns_data[codes].to_numpy(dtype=float)
+
+    frames = []
+    for ids, weights, unknown_weight in iter_weight_chunks(source, codes, file_format, chunk_rows):
+        results, contributions = evaluate_weights(weights, mean_returns, cov_matrix, history, confidence)
+        top = np.argmax(np.nan_to_num(np.abs(contributions)), axis=1)
+        frame = pd.DataFrame({'Portfolio': ids, **results})
+        frame['Unmapped Weight'] = unknown_weight
+        frame['Top Risk Contributor'] = np.array(codes)[top]
+        frame['Top Risk Share'] = contributions[np.arange(len(top)), top]
+        if include_contributions:
+            frame = pd.concat([frame, pd.DataFrame(contributions, columns=[f'RC {code}' for code in codes])], axis=1)
+        frames.append(frame)
+
+    if not frames:
+        raise ValueError("The file contains no portfolios")
+    return pd.concat(frames, ignore_index=True)
+
+def weight_template(codes, example_weights=None):
+    template = pd.DataFrame(columns=['portfolio'] + list(codes))
+    if example_weights is not None:
+        template.loc[0] = ['example'] + list(np.round(example_weights, 6))
+    return template.to_csv(index=False).encode('utf-8')
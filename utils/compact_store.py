@@ -0,0 +1,133 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from utils.trading_calendar import build_trading_calendar, returns_matrix
+
+# Opt-in compact representation of the loaded price history. Every ticker's rows live in
+# one float32 block (rows grouped by integer ticker id, located through an offsets array),
+# dates are int32 day offsets from the earliest session, and only the columns some section
+# reads are kept: 日期 duplicates the index, 股票代码 repeats the key, and 成交量/涨跌额
+# are unused.
+#
+# Error bounds against the float64 load (round-to-nearest float32, 24-bit significand):
+# - every stored value x is within 2**-24 * |x| (about 6e-8 relative) of the float64 value
+# - prices: below 2**-24 * 2,000 = 1.2e-4 CNY for any A-share price under 2,000 CNY, so
+#   prices quoted to the fen round back to the exact quote
+# - Returns: below 6e-9 absolute even on a 10% limit day; they are computed from float64
+#   closes before narrowing, so rounding does not compound through pct_change
+# - 成交额: up to about 600 CNY on a 10 billion CNY session
+# Everything downstream aligns through align_column, which widens back to float64, so
+# annualized means, volatilities and covariances agree to better than 1e-7 of their largest
+# entry (see compact_error_report).
+
+FLOAT32_RELATIVE_ERROR = 2.0**-24
+
+COMPACT_COLUMNS = [
+    '开盘', '收盘', '最高', '最低', '成交额', '换手率', '振幅', '涨跌幅', 'Returns',
+    'open', 'high', 'low', 'close', 'Open', 'High', 'Low', 'Close',
+]
+
+
+class CompactStocks(Mapping):
+    # read-only {code: DataFrame} over the shared float32 block; a frame is built on access
+    # from a view of its rows, so only its DatetimeIndex is materialized per call
+
+    def __init__(self, codes, epoch, days, block, columns, offsets):
+        self.codes = list(codes)
+        self.epoch = np.datetime64(epoch, 'D')
+        self.days = days
+        self.block = block
+        self.columns = list(columns)
+        self.offsets = offsets
+        self._position = {code: k for k, code in enumerate(self.codes)}
+
+    def __getitem__(self, code):
+        k = self._position[code]
+        start, stop = self.offsets[k], self.offsets[k + 1]
+        dates = (self.epoch + self.days[start:stop].astype('timedelta64[D]')).astype('datetime64[ns]')
+        return pd.DataFrame(self.block[start:stop], index=pd.DatetimeIndex(dates, name='Date'),
+                            columns=self.columns, copy=False)
+
+    def __iter__(self):
+        return iter(self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.block.nbytes + self.days.nbytes + self.offsets.nbytes
+
+
+def compact_stocks(stocks, columns=COMPACT_COLUMNS):
+    codes = list(stocks.keys())
+    kept = [column for column in columns if any(column in df.columns for df in stocks.values())]
+    lengths = np.array([len(stocks[code]) for code in codes], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    starts = [stocks[code].index.min() for code in codes if len(stocks[code])]
+    epoch = (min(starts) if starts else pd.Timestamp('1970-01-01')).to_datetime64().astype('datetime64[D]')
+    days = np.empty(offsets[-1], dtype=np.int32)
+    values = np.full((offsets[-1], len(kept)), np.nan, dtype=np.float32)
+    for k, code in enumerate(codes):
+        df = stocks[code]
+        rows = slice(offsets[k], offsets[k + 1])
+        days[rows] = (df.index.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]') - epoch).astype(np.int32)
+        for j, column in enumerate(kept):
+            if column in df.columns:
+                values[rows, j] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float32)
+    return CompactStocks(codes, epoch, days, values, kept, offsets)
+
+
+def is_compact(stocks):
+    return isinstance(stocks, CompactStocks)
+
+
+def stocks_nbytes(stocks):
+    if is_compact(stocks):
+        return stocks.nbytes
+    return int(sum(df.memory_usage(index=True, deep=True).sum() for df in stocks.values()))
+
+
+def compact_error_report(stocks, compact):
+    # every kept column, then the annualized statistics the optimizer consumes
+    rows = []
+    for column in compact.columns:
+        exact, narrowed = [], []
+        for code in compact:
+            if column in stocks[code].columns:
+                exact.append(pd.to_numeric(stocks[code][column], errors='coerce').to_numpy(dtype=float))
+                narrowed.append(compact[code][column].to_numpy(dtype=float))
+        exact, narrowed = np.concatenate(exact), np.concatenate(narrowed)
+        valid = np.isfinite(exact) & (exact != 0)
+        error = np.abs(narrowed - exact)
+        relative = np.max(error[valid] / np.abs(exact[valid])) if valid.any() else 0.0
+        rows.append({
+            'Quantity': column,
+            'Max Abs Error': float(np.nanmax(error)) if len(error) else 0.0,
+            'Max Rel Error': float(relative),
+            'Bound': FLOAT32_RELATIVE_ERROR,
+            'Pass': bool(relative <= FLOAT32_RELATIVE_ERROR),
+        })
+
+    exact_returns = returns_matrix(stocks, build_trading_calendar(stocks))
+    narrowed_returns = returns_matrix(compact, build_trading_calendar(compact))
+    derived = {
+        'Annual Mean Return': (exact_returns.mean() * 252, narrowed_returns.mean() * 252),
+        'Annual Volatility': (exact_returns.std() * np.sqrt(252), narrowed_returns.std() * np.sqrt(252)),
+        'Annual Covariance': (exact_returns.cov() * 252, narrowed_returns.cov() * 252),
+    }
+    for name, (exact, narrowed) in derived.items():
+        exact, narrowed = np.asarray(exact, dtype=float), np.asarray(narrowed, dtype=float)
+        error = np.abs(narrowed - exact)
+        scale = np.nanmax(np.abs(exact))
+        rows.append({
+            'Quantity': name,
+            'Max Abs Error': float(np.nanmax(error)),
+            'Max Rel Error': float(np.nanmax(error) / scale) if scale else 0.0,
+            'Bound': 1e-6,
+            'Pass': bool(np.nanmax(error) <= 1e-6 * scale),
+        })
+    return pd.DataFrame(rows)
@@ -1,8 +1,14 @@
 import pandas as pd
 import streamlit as st
+from utils.profiling import profile_stage, mark_cache_miss, cache_probe
+from utils.trading_calendar import build_trading_calendar, returns_matrix
+from utils.compact_store import compact_stocks, is_compact
+from utils.minute_store import realized_volatility, stored_rows, store_version
 
 @st.cache_data
-def load_stock_data():
+def load_stock_data(compact=False):
+    # compact=True keeps one float32 block instead of per-ticker float64/object frames
+    mark_cache_miss("load_stock_data")
     stock_paths = {
         '002555': r"D:\final_project\data\002555sanqiyule.csv",
         '002624': r"D:\final_project\data\002624_wanmeishijie.csv", 
@@ -15,7 +21,8 @@ def load_stock_data():
     stocks = {}
     for code, path in stock_paths.items():
         try:
-            df = pd.read_csv(path)
+            with profile_stage(f"read_csv:{code}"):
+                df = pd.read_csv(path)
             
             if '日期' in df.columns:
                 df['Date'] = pd.to_datetime(df['日期'])
@@ -41,4 +48,41 @@ def load_stock_data():
         except Exception as e:
             st.error(f"Error loading {code}: {e}")
     
-    return stocks
\ No newline at end of file
+    if compact:
+        with profile_stage("compact_stocks"):
+            return compact_stocks(stocks)
+    return stocks
+
+@st.cache_resource
+def load_trading_calendar(compact=False):
+    mark_cache_miss("load_trading_calendar")
+    with cache_probe("load_stock_data"):
+        stocks = load_stock_data(compact)
+    return build_trading_calendar(stocks)
+
+def get_trading_calendar(stocks):
+    with cache_probe("load_trading_calendar"):
+        calendar = load_trading_calendar(is_compact(stocks))
+    if not set(stocks).issubset(calendar['column']):
+        calendar = build_trading_calendar(stocks)
+    return calendar
+
+def get_returns_matrix(stocks, suspended='nan', listing_day='nan'):
+    # every section aligns returns on the same master calendar instead of
+    # relying on pandas index alignment of whichever ticker comes first
+    calendar = get_trading_calendar(stocks)
+    returns_data = returns_matrix(stocks, calendar, list(stocks.keys()), suspended, listing_day)
+    return returns_data.dropna(how='all')
+
+@st.cache_data(show_spinner=False)
+def load_realized_volatility(codes, sampling, version):
+    # version holds the committed row counts, so an append to the store is a cache miss
+    mark_cache_miss("load_realized_volatility")
+    return {code: realized_volatility(code, sampling) for code in codes}
+
+def get_realized_volatility(codes, sampling='5min'):
+    codes = tuple(code for code in codes if stored_rows(code) > 0)
+    if not codes:
+        return {}
+    with cache_probe("load_realized_volatility"):
+        return load_realized_volatility(codes, sampling, store_version(codes))
@@ -0,0 +1,172 @@
+import tempfile
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.signal import lfilter
+
+from utils.garch_search import forecast_variance_path
+
+MAX_FULL_PAIRS = 200      # above this, estimate on contiguous pairs only (composite likelihood)
+STORE_BLOCK = 250         # dates processed per block when writing the correlation history
+
+def standardized_residuals(garch_results):
+    # reuse the univariate fits: z_t = resid_t / sigma_t, aligned on common dates
+    residuals = pd.DataFrame({
+        stock: result.resid / result.conditional_volatility
+        for stock, result in garch_results.items()
+    })
+    return residuals.dropna()
+
+def _pair_index(n):
+    if n * (n - 1) // 2 <= MAX_FULL_PAIRS:
+        return np.triu_indices(n, k=1)
+    first = np.arange(n - 1)
+    return first, first + 1
+
+def _filter_q(products, qbar, a, b, initial):
+    # Q_t = (1 - a - b) Qbar + a z_{t-1} z_{t-1}' + b Q_{t-1}, run for every element at once
+    drive = (1 - a - b) * qbar + a * products
+    return lfilter([1.0], [1.0, -b], drive, axis=0, zi=(b * initial)[None, :])
+
+def _composite_loglik(params, z, pairs, qbar):
+    a, b = params
+    i, j = pairs
+    # rows of Q_t for t >= 1 are driven by z_{t-1}; Q_0 = Qbar
+    lagged = z[:-1]
+    products = np.hstack([lagged[:, i] * lagged[:, j], lagged[:, i]**2, lagged[:, j]**2])
+    qbar_vec = np.concatenate([qbar[i, j], qbar[i, i], qbar[j, j]])
+    q, _ = _filter_q(products, qbar_vec, a, b, qbar_vec)
+
+    m = len(i)
+    rho = q[:, :m] / np.sqrt(q[:, m:2 * m] * q[:, 2 * m:])
+    rho = np.clip(rho, -0.9999, 0.9999)
+    zi, zj = z[1:, i], z[1:, j]
+    one_minus = 1 - rho**2
+    loglik = -0.5 * (np.log(one_minus) + (zi**2 + zj**2 - 2 * rho * zi * zj) / one_minus - (zi**2 + zj**2))
+    return loglik.sum()
+
+def fit_dcc(garch_results):
+    residuals = standardized_residuals(garch_results)
+    codes = list(residuals.columns)
+    z = residuals.to_numpy(dtype=float)
+    n_obs, n = z.shape
+    if n < 2:
+        raise ValueError("DCC needs at least two fitted stocks")
+    if n_obs < 50:
+        raise ValueError(f"Only {n_obs} common observations across the fitted stocks")
+
+    qbar = z.T @ z / n_obs
+    pairs = _pair_index(n)
+
+    result = minimize(
+        lambda p: -_composite_loglik(p, z, pairs, qbar),
+        x0=np.array([0.02, 0.95]),
+        method='SLSQP',
+        bounds=[(1e-6, 0.5), (1e-6, 0.999)],
+        constraints=[{'type': 'ineq', 'fun': lambda p: 0.999 - p[0] - p[1]}]
+    )
+    a, b = result.x
+
+    # full recursion in blocks of dates: memory stays O(block * N^2) while the
+    # upper triangle of every R_t goes to a float32 memory-mapped store. The store is an
+    # anonymous temporary file owned by the returned dict, so the OS deletes it once the
+    # fit is dropped (or the process exits) and nothing accumulates across reruns
+    store = tempfile.TemporaryFile(prefix="dcc_", suffix=".f32")
+    upper = np.triu_indices(n, k=1)
+    history = np.memmap(store, dtype=np.float32, mode='w+', shape=(n_obs, len(upper[0])))
+
+    tri = np.triu_indices(n)
+    qbar_tri = qbar[tri]
+    diag_cols = np.flatnonzero(tri[0] == tri[1])
+    off_cols = np.flatnonzero(tri[0] != tri[1])
+    q_prev = qbar_tri
+    lagged_prev = None
+    for start in range(0, n_obs, STORE_BLOCK):
+        stop = min(start + STORE_BLOCK, n_obs)
+        block_z = z[start:stop]
+        if lagged_prev is None:
+            # Q_0 = Qbar, the rest of the block is driven by z_{t-1}
+            products = block_z[:-1][:, tri[0]] * block_z[:-1][:, tri[1]]
+            q_rest, _ = _filter_q(products, qbar_tri, a, b, q_prev)
+            q_block = np.vstack([qbar_tri[None, :], q_rest])
+        else:
+            lagged = np.vstack([lagged_prev[None, :], block_z[:-1]])
+            products = lagged[:, tri[0]] * lagged[:, tri[1]]
+            q_block, _ = _filter_q(products, qbar_tri, a, b, q_prev)
+        q_prev = q_block[-1]
+        lagged_prev = block_z[-1]
+
+        diag = q_block[:, diag_cols]
+        scale = np.sqrt(diag[:, upper[0]] * diag[:, upper[1]])
+        history[start:stop] = (q_block[:, off_cols] / scale).astype(np.float32)
+    history.flush()
+
+    # one-step-ahead Q_{T+1} from the last residual
+    q_next_tri = (1 - a - b) * qbar_tri + a * lagged_prev[tri[0]] * lagged_prev[tri[1]] + b * q_prev
+    q_next = np.zeros((n, n))
+    q_next[tri] = q_next_tri
+    q_next = q_next + np.triu(q_next, k=1).T
+
+    return {
+        'codes': codes,
+        'dates': residuals.index,
+        'a': a,
+        'b': b,
+        'qbar': qbar,
+        'q_next': q_next,
+        'loglikelihood': -result.fun,
+        'n_obs': n_obs,
+        'store': store,
+        'history': history,
+    }
+
+def _to_correlation(q):
+    d = np.sqrt(np.diag(q))
+    corr = q / np.outer(d, d)
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+def load_correlation_history(dcc):
+    return dcc['history']
+
+def correlation_pairs(dcc):
+    upper = np.triu_indices(len(dcc['codes']), k=1)
+    return [(dcc['codes'][i], dcc['codes'][j]) for i, j in zip(*upper)]
+
+def average_correlation_series(dcc):
+    history = load_correlation_history(dcc)
+    averages = np.concatenate([
+        history[start:start + STORE_BLOCK].mean(axis=1, dtype=np.float64)
+        for start in range(0, dcc['n_obs'], STORE_BLOCK)
+    ])
+    return pd.Series(averages, index=dcc['dates'])
+
+def _forecast_persistence(dcc, horizon):
+    # Engle-Sheppard approximation: E[R_{T+h}] = Rbar + (a + b)^(h-1) (R_{T+1} - Rbar)
+    return (dcc['a'] + dcc['b']) ** (np.arange(1, horizon + 1) - 1)
+
+def forecast_correlation(dcc, horizon):
+    # expected correlation matrix h steps ahead
+    r_next = _to_correlation(dcc['q_next'])
+    r_bar = _to_correlation(dcc['qbar'])
+    return r_bar + _forecast_persistence(dcc, horizon)[-1] * (r_next - r_bar)
+
+def forecast_covariance(dcc, garch_results, horizon, average=True, periods_per_year=252):
+    # daily covariance h steps ahead (or averaged over 1..h), annualized for the optimizer;
+    # the average is accumulated as sums over h of v_h v_h' weighted by 1 and by the
+    # persistence, so no horizon x N x N array is built
+    codes = dcc['codes']
+    variances = np.column_stack([forecast_variance_path(garch_results[stock], horizon) for stock in codes])
+    vols = np.sqrt(variances)
+    r_next = _to_correlation(dcc['q_next'])
+    r_bar = _to_correlation(dcc['qbar'])
+    persistence = _forecast_persistence(dcc, horizon)
+    if average:
+        outer = vols.T @ vols / horizon
+        decaying = (vols * persistence[:, None]).T @ vols / horizon
+    else:
+        outer = np.outer(vols[-1], vols[-1])
+        decaying = persistence[-1] * outer
+    cov = r_bar * outer + (r_next - r_bar) * decaying
+    return pd.DataFrame(cov * periods_per_year, index=codes, columns=codes)
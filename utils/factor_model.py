@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from utils.rng import generator, DEFAULT_SEED
+
+MIN_SPECIFIC_SHARE = 0.05   # floor on each stock's specific variance, as a share of its total variance
+POWER_ITERATIONS = 3
+OVERSAMPLE = 10
+
+# Statistical factor model: Sigma = B diag(f) B' + diag(s), stored as the N x k loadings,
+# k factor variances and N specific variances. The dense N x N matrix is never formed,
+# so every portfolio quantity below costs O(N * k).
+
+class FactorCovariance:
+    # lets `w @ model` reach __rmatmul__ instead of numpy treating the model as an array
+    __array_ufunc__ = None
+
+    def __init__(self, codes, loadings, factor_variances, specific_variances, explained_variance=None):
+        self.codes = list(codes)
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.factor_variances = np.asarray(factor_variances, dtype=float)
+        self.specific_variances = np.asarray(specific_variances, dtype=float)
+        self.explained_variance = explained_variance
+
+    @property
+    def index(self):
+        return pd.Index(self.codes)
+
+    columns = index
+
+    @property
+    def shape(self):
+        n = len(self.codes)
+        return (n, n)
+
+    @property
+    def n_factors(self):
+        return self.loadings.shape[1]
+
+    def dot(self, weights):
+        # Sigma @ w for a vector, or Sigma @ W column by column for an N x m matrix
+        w = np.asarray(weights, dtype=float)
+        exposures = self.loadings.T @ w
+        scale = self.factor_variances[:, None] if w.ndim == 2 else self.factor_variances
+        specific = self.specific_variances[:, None] if w.ndim == 2 else self.specific_variances
+        return self.loadings @ (scale * exposures) + specific * w
+
+    def __matmul__(self, weights):
+        return self.dot(weights)
+
+    def __rmatmul__(self, weights):
+        # Sigma is symmetric, so w' Sigma = (Sigma w)'
+        return self.dot(np.asarray(weights, dtype=float).T).T
+
+    def diagonal(self):
+        return (self.loadings**2) @ self.factor_variances + self.specific_variances
+
+    def to_dense(self):
+        dense = (self.loadings * self.factor_variances) @ self.loadings.T
+        dense[np.diag_indices_from(dense)] += self.specific_variances
+        return pd.DataFrame(dense, index=self.codes, columns=self.codes)
+
+def _top_singular_vectors(x, k, seed=DEFAULT_SEED):
+    # randomized range finder with a few power iterations: O(T * N * k) instead of a full SVD
+    rng = generator(seed, 'factor_model')
+    n_obs, n = x.shape
+    size = min(k + OVERSAMPLE, n_obs, n)
+    basis, _ = np.linalg.qr(x @ rng.standard_normal((n, size)))
+    for _ in range(POWER_ITERATIONS):
+        basis, _ = np.linalg.qr(x.T @ basis)
+        basis, _ = np.linalg.qr(x @ basis)
+    _, singular_values, vt = np.linalg.svd(basis.T @ x, full_matrices=False)
+    return singular_values[:k], vt[:k].T
+
+def fit_factor_model(returns_data, n_factors=3, periods_per_year=252, seed=DEFAULT_SEED):
+    codes = list(returns_data.columns)
+    values = returns_data.to_numpy(dtype=float)
+    mask = ~np.isnan(values)
+    counts = mask.sum(axis=0)
+    n_factors = max(1, min(n_factors, len(codes) - 1, len(values) - 1))
+
+    # demean each stock over its own sessions; missing sessions contribute nothing
+    means = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    x = np.where(mask, values - means, 0.0)
+    total_variances = (x**2).sum(axis=0) / np.maximum(counts - 1, 1)
+
+    singular_values, loadings = _top_singular_vectors(x, n_factors, seed)
+    factor_variances = singular_values**2 / max(len(values) - 1, 1)
+
+    # the zero-filled panel understates a late lister's loadings twice: its covariance with
+    # each factor spans only its own sessions, and the factor variance spans all T of them.
+    # Rescale to the regression over the stock's own sessions, so common and total variance
+    # share the counts - 1 denominator; full-history stocks are left unchanged
+    scores = (x @ loadings) / np.maximum(singular_values, np.finfo(float).tiny)
+    covered = np.clip(mask.T.astype(float) @ scores**2, np.finfo(float).tiny, 1.0)
+    loadings = loadings * np.sqrt(max(len(values) - 1, 1) / (np.maximum(counts - 1, 1)[:, None] * covered))
+
+    # whatever the factors leave unexplained is specific risk, kept strictly positive
+    common = (loadings**2) @ factor_variances
+    specific_variances = np.maximum(total_variances - common, MIN_SPECIFIC_SHARE * total_variances)
+
+    return FactorCovariance(
+        codes,
+        loadings,
+        factor_variances * periods_per_year,
+        specific_variances * periods_per_year,
+        explained_variance=common.sum() / total_variances.sum()
+    )
+
+def portfolio_variance(model, weights):
+    w = np.asarray(weights, dtype=float)
+    return float(w @ model.dot(w))
+
+def factor_exposures(model, weights):
+    return pd.Series(model.loadings.T @ np.asarray(weights, dtype=float),
+                     index=[f"Factor {i + 1}" for i in range(model.n_factors)])
+
+def marginal_risk_contributions(model, weights):
+    # d sigma / d w_i = (Sigma w)_i / sigma
+    w = np.asarray(weights, dtype=float)
+    sigma_w = model.dot(w)
+    return pd.Series(sigma_w / np.sqrt(w @ sigma_w), index=model.codes)
+
+def factor_risk_contributions(model, weights):
+    # each stock's share of portfolio variance: w_i (Sigma w)_i / sigma^2
+    w = np.asarray(weights, dtype=float)
+    sigma_w = model.dot(w)
+    return pd.Series(w * sigma_w / (w @ sigma_w), index=model.codes)
@@ -0,0 +1,162 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from utils.profiling import record_cache_access
+
+FIGURE_CACHE_ENV_VAR = "PORTFOLIO_FIGURE_CACHE_MB"
+DEFAULT_FIGURE_CACHE_MB = 64
+PYPLOT_DPI = 200                # st.pyplot's savefig default, so cached images look the same
+
+# Process-wide LRU of serialized figures: Plotly figures as their JSON spec, matplotlib
+# figures as PNG bytes. Keys are the chart name plus a fingerprint of everything the builder
+# receives (data and view parameters), so a rerun with unchanged inputs skips building,
+# validating, serializing and rasterizing. Each entry is serialized once on a miss and charged
+# the size of those same bytes. Callers pass only the slice of data a builder actually draws,
+# so a hit hashes no more than that. Entries are evicted least recently used first once the
+# total exceeds the byte budget; an entry larger than the whole budget is served but not kept.
+
+_cache = {
+    'entries': OrderedDict(),
+    'nbytes': 0,
+    'max_bytes': int(float(os.environ.get(FIGURE_CACHE_ENV_VAR, DEFAULT_FIGURE_CACHE_MB)) * 1024**2),
+    'hits': 0,
+    'misses': 0,
+    'evictions': 0,
+}
+_lock = threading.Lock()
+
+def _feed(digest, part):
+    if isinstance(part, pd.DataFrame):
+        digest.update(repr((part.shape, list(part.columns), [str(t) for t in part.dtypes])).encode())
+        digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    elif isinstance(part, pd.Series):
+        digest.update(repr((part.shape, part.name, str(part.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+    elif isinstance(part, pd.Index):
+        digest.update(repr((part.shape, part.name, str(part.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(part).to_numpy().tobytes())
+    elif isinstance(part, np.ndarray):
+        digest.update(repr((part.shape, str(part.dtype))).encode())
+        digest.update(np.ascontiguousarray(part).tobytes())
+    elif isinstance(part, (list, tuple)):
+        digest.update(f"{type(part).__name__}[{len(part)}]".encode())
+        for item in part:
+            _feed(digest, item)
+    elif isinstance(part, dict):
+        digest.update(f"dict[{len(part)}]".encode())
+        for name in sorted(part, key=repr):
+            _feed(digest, name)
+            _feed(digest, part[name])
+    else:
+        digest.update(repr(part).encode())
+    digest.update(b'|')
+
+def fingerprint(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        _feed(digest, part)
+    return digest.hexdigest()
+
+def _lookup(name, key):
+    with _lock:
+        entry = _cache['entries'].get(key)
+        if entry is None:
+            _cache['misses'] += 1
+        else:
+            _cache['entries'].move_to_end(key)
+            _cache['hits'] += 1
+    record_cache_access(f"figure:{name}", entry is not None)
+    return None if entry is None else entry[0]
+
+def _evict():
+    # caller holds the lock
+    while _cache['nbytes'] > _cache['max_bytes']:
+        _, (_, size) = _cache['entries'].popitem(last=False)
+        _cache['nbytes'] -= size
+        _cache['evictions'] += 1
+
+def _store(key, payload, size):
+    with _lock:
+        if size > _cache['max_bytes']:
+            return
+        previous = _cache['entries'].pop(key, None)
+        if previous is not None:
+            _cache['nbytes'] -= previous[1]
+        _cache['entries'][key] = (payload, size)
+        _cache['nbytes'] += size
+        _evict()
+
+class SerializedFigure(go.Figure):
+    # an empty Figure carrying a stored JSON spec: st.plotly_chart reads it through to_dict,
+    # so the spec reaches the browser without being rebuilt or validated again. Only for
+    # rendering; its data and layout attributes are empty.
+    def __init__(self, payload):
+        super().__init__()
+        self._payload = payload
+
+    @property
+    def payload(self):
+        return self._payload
+
+    def to_dict(self):
+        return json.loads(self._payload)
+
+    def to_plotly_json(self):
+        return self.to_dict()
+
+def cached_plotly(name, build, *inputs):
+    # build(*inputs) -> go.Figure, called and serialized only on a miss
+    key = (name, 'plotly', fingerprint(*inputs))
+    payload = _lookup(name, key)
+    if payload is None:
+        payload = pio.to_json(build(*inputs), validate=False)
+        _store(key, payload, len(payload.encode()))
+    return SerializedFigure(payload)
+
+def cached_image(name, build, *inputs, dpi=PYPLOT_DPI):
+    # build(*inputs) -> matplotlib Figure, rasterized once to PNG and closed
+    key = (name, 'png', dpi, fingerprint(*inputs))
+    payload = _lookup(name, key)
+    if payload is not None:
+        return payload
+    figure = build(*inputs)
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', bbox_inches='tight', dpi=dpi)
+    plt.close(figure)
+    payload = buffer.getvalue()
+    _store(key, payload, len(payload))
+    return payload
+
+def set_figure_cache_budget(megabytes):
+    with _lock:
+        _cache['max_bytes'] = int(megabytes * 1024**2)
+        _evict()
+
+def clear_figure_cache():
+    with _lock:
+        _cache['entries'].clear()
+        _cache['nbytes'] = 0
+        _cache['hits'] = _cache['misses'] = _cache['evictions'] = 0
+
+def figure_cache_stats():
+    with _lock:
+        total = _cache['hits'] + _cache['misses']
+        return {
+            'Entries': len(_cache['entries']),
+            'Size (MB)': _cache['nbytes'] / 1024**2,
+            'Budget (MB)': _cache['max_bytes'] / 1024**2,
+            'Hits': _cache['hits'],
+            'Misses': _cache['misses'],
+            'Hit Rate': _cache['hits'] / total if total else 0.0,
+            'Evictions': _cache['evictions'],
+        }
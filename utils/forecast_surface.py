@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from arch.univariate import Normal, StudentsT, SkewStudent
+
+from utils.garch_search import forecast_variance_path
+from utils.rng import generator, DEFAULT_SEED
+
+MAX_HORIZON = 252                  # one trading year
+BAND_PERCENTILES = (5, 50, 95)
+HISTOGRAM_BINS = 160               # log-volatility bins per (horizon, stock) for the bands
+HISTOGRAM_SPAN = 6.0               # bins cover sigma_{T+1} / span to sigma_{T+1} * span
+MAX_CHUNK_BYTES = 64 * 1024**2     # simulated shocks held in memory at once
+
+DISTRIBUTION_CLASSES = {
+    'Normal': Normal,
+    'StudentsT': StudentsT,
+    'SkewStudent': SkewStudent,
+}
+
+def extract_forecast_inputs(garch_results):
+    # plain numbers only, so the table can key st.cache_data
+    rows = []
+    for stock, result in garch_results.items():
+        params = result.params
+        distribution = result.model.distribution
+        volatility = result.model.volatility
+        dist_params = params.iloc[len(params) - distribution.num_params:].to_numpy() if distribution.num_params else []
+        rows.append({
+            'Stock': stock,
+            'model': 'EGARCH' if type(volatility).__name__ == 'EGARCH' else 'GARCH',
+            'omega': params.get('omega', 0.0),
+            'alpha': params.get('alpha[1]', 0.0),
+            'gamma': params.get('gamma[1]', 0.0),
+            'beta': params.get('beta[1]', 0.0),
+            'distribution': type(distribution).__name__,
+            'dist_param_1': dist_params[0] if len(dist_params) > 0 else np.nan,
+            'dist_param_2': dist_params[1] if len(dist_params) > 1 else np.nan,
+            'sigma2_next': forecast_variance_path(result, 1)[0] * 100**2,
+        })
+    return pd.DataFrame(rows).set_index('Stock')
+
+def analytic_term_structure(inputs, max_horizon=MAX_HORIZON):
+    # sigma2_{T+h} = long-run + phi^(h-1) * (sigma2_{T+1} - long-run), all stocks and horizons at once
+    phi = (inputs['alpha'] + 0.5 * inputs['gamma'] + inputs['beta']).to_numpy()
+    sigma2_next = inputs['sigma2_next'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        long_run = np.where(phi < 1, inputs['omega'].to_numpy() / (1 - phi), sigma2_next)
+    decay = phi[None, :] ** np.arange(max_horizon)[:, None]
+    variance = long_run + decay * (sigma2_next - long_run)
+    # EGARCH has no closed form beyond one step; those columns are filled from the simulation
+    variance[:, (inputs['model'] == 'EGARCH').to_numpy()] = np.nan
+    return variance / 100**2
+
+def _draw_shocks(inputs, n_sims, max_horizon, generators):
+    # each stock reads its own stream in simulation order, so the draws do not depend on the chunk size
+    shocks = np.empty((n_sims, max_horizon, len(inputs)))
+    for k, ((_, row), rng) in enumerate(zip(inputs.iterrows(), generators)):
+        distribution = DISTRIBUTION_CLASSES[row['distribution']]()
+        dist_params = [p for p in (row['dist_param_1'], row['dist_param_2']) if not np.isnan(p)]
+        shocks[:, :, k] = distribution.ppf(rng.random((n_sims, max_horizon)), np.array(dist_params) if dist_params else None)
+    return shocks
+
+def simulate_term_structure(inputs, max_horizon=MAX_HORIZON, n_sims=2000, seed=DEFAULT_SEED,
+                            percentiles=BAND_PERCENTILES):
+    n = len(inputs)
+    omega, alpha, gamma, beta = (inputs[c].to_numpy() for c in ('omega', 'alpha', 'gamma', 'beta'))
+    is_egarch = (inputs['model'] == 'EGARCH').to_numpy()
+    sigma2_next = inputs['sigma2_next'].to_numpy()
+
+    # bands come from fixed log-volatility histograms, so memory does not grow with n_sims
+    sigma_next = np.sqrt(sigma2_next)
+    log_low = np.log(sigma_next / HISTOGRAM_SPAN)
+    log_high = np.log(sigma_next * HISTOGRAM_SPAN)
+    bin_width = (log_high - log_low) / HISTOGRAM_BINS
+    counts = np.zeros((max_horizon, n, HISTOGRAM_BINS), dtype=np.int32)
+    variance_sum = np.zeros((max_horizon, n))
+
+    chunk = max(1, min(n_sims, MAX_CHUNK_BYTES // (8 * 4 * max_horizon * max(n, 1))))
+    generators = [generator(seed, 'forecast_surface', stock) for stock in inputs.index]
+    flat_offsets = (np.arange(max_horizon)[:, None] * n + np.arange(n)[None, :]) * HISTOGRAM_BINS
+
+    for start in range(0, n_sims, chunk):
+        size = min(chunk, n_sims - start)
+        shocks = _draw_shocks(inputs, size, max_horizon, generators)
+        sigma2 = np.tile(sigma2_next, (size, 1))
+        paths = np.empty((size, max_horizon, n))
+        for h in range(max_horizon):
+            paths[:, h] = sigma2
+            z = shocks[:, h]
+            eps2 = sigma2 * z**2
+            garch_next = omega + (alpha + gamma * (z < 0)) * eps2 + beta * sigma2
+            egarch_next = np.exp(omega + alpha * (np.abs(z) - np.sqrt(2 / np.pi)) + gamma * z
+                                 + beta * np.log(sigma2))
+            sigma2 = np.where(is_egarch, egarch_next, garch_next)
+
+        variance_sum += paths.sum(axis=0)
+        bins = np.floor((0.5 * np.log(paths) - log_low) / bin_width).astype(np.int64)
+        np.clip(bins, 0, HISTOGRAM_BINS - 1, out=bins)
+        counts.reshape(-1)[:] += np.bincount((bins + flat_offsets[None, :, :]).ravel(),
+                                             minlength=counts.size).astype(np.int32)
+
+    # percentiles by linear interpolation inside the histogram bin
+    cumulative = np.cumsum(counts, axis=2) / n_sims
+    bands = {}
+    for p in percentiles:
+        q = p / 100.0
+        idx = np.argmax(cumulative >= q, axis=2)
+        upper = np.take_along_axis(cumulative, idx[:, :, None], axis=2)[:, :, 0]
+        lower = np.where(idx > 0, np.take_along_axis(cumulative, np.maximum(idx - 1, 0)[:, :, None], axis=2)[:, :, 0], 0.0)
+        fraction = np.clip((q - lower) / np.maximum(upper - lower, 1e-12), 0.0, 1.0)
+        bands[p] = np.exp(log_low + (idx + fraction) * bin_width) / 100
+        # the one-step-ahead variance is known exactly
+        bands[p][0] = sigma_next / 100
+    return variance_sum / n_sims / 100**2, bands
+
+def build_forecast_surface(inputs, max_horizon=MAX_HORIZON, n_sims=2000, seed=DEFAULT_SEED):
+    analytic = analytic_term_structure(inputs, max_horizon)
+    simulated_mean, bands = simulate_term_structure(inputs, max_horizon, n_sims, seed)
+    variance = np.where(np.isnan(analytic), simulated_mean, analytic)
+    return {
+        'codes': list(inputs.index),
+        'volatility': np.sqrt(variance),
+        'bands': bands,
+        'max_horizon': max_horizon,
+        'n_sims': n_sims,
+    }
+
+def surface_frame(surface, horizon):
+    # long table for the first `horizon` days, sliced from the precomputed arrays
+    codes = surface['codes']
+    days = np.arange(1, horizon + 1)
+    frame = pd.DataFrame({
+        'Stock': np.repeat(codes, horizon),
+        'Day': np.tile(days, len(codes)),
+        'Forecasted Volatility': surface['volatility'][:horizon].T.ravel(),
+    })
+    for p, band in surface['bands'].items():
+        frame[f'P{p}'] = band[:horizon].T.ravel()
+    return frame
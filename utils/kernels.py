@@ -0,0 +1,215 @@
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Sequential recursions used across the app. Each kernel has a NumPy reference
+# implementation; when numba is installed a compiled loop is used instead.
+# Set PORTFOLIO_KERNELS=numpy to force the reference path.
+
+KERNEL_ENV_VAR = "PORTFOLIO_KERNELS"
+BACKCAST_WINDOW = 75       # arch's variance backcast: 0.94-weighted mean of the first 75 squared residuals
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+def kernel_backend():
+    if NUMBA_AVAILABLE and os.environ.get(KERNEL_ENV_VAR, "").lower() != "numpy":
+        return 'numba'
+    return 'numpy'
+
+
+def _use_numba(backend):
+    return (backend or kernel_backend()) == 'numba' and NUMBA_AVAILABLE
+
+
+def variance_backcast(eps):
+    tau = min(BACKCAST_WINDOW, len(eps))
+    weights = 0.94 ** np.arange(tau)
+    return float((eps[:tau]**2) @ (weights / weights.sum()))
+
+
+# ---- NumPy reference implementations ----
+
+def _garch_variance_numpy(eps, omega, alpha, gamma, beta, backcast):
+    # sigma2_t - beta * sigma2_{t-1} = omega + (alpha + gamma * 1[eps_{t-1} < 0]) * eps_{t-1}^2
+    drive = np.empty(len(eps))
+    drive[0] = omega + (alpha + 0.5 * gamma + beta) * backcast
+    lagged = eps[:-1]
+    drive[1:] = omega + (alpha + gamma * (lagged < 0)) * lagged**2
+    return lfilter([1.0], [1.0, -beta], drive)
+
+
+def _ewma_covariance_numpy(values, lam, initial):
+    # S_T = lam^T S_0 + (1 - lam) * sum_t lam^(T-1-t) r_t r_t', as one weighted product
+    x = np.nan_to_num(values)
+    weights = (1 - lam) * lam ** np.arange(len(x) - 1, -1, -1)
+    return (x * weights[:, None]).T @ x + lam ** len(x) * initial
+
+
+def _drawdown_numpy(values):
+    wealth = np.cumprod(1.0 + np.nan_to_num(values), axis=0)
+    drawdown = wealth / np.maximum.accumulate(wealth, axis=0) - 1.0
+    steps = np.arange(len(values))[:, None]
+    last_peak = np.maximum.accumulate(np.where(drawdown >= 0, steps, 0), axis=0)
+    return drawdown, steps - last_peak
+
+
+def _moving_average_numpy(values, window):
+    # matches DataFrame.rolling(window).mean(): NaN until `window` valid values fill the window
+    mask = ~np.isnan(values)
+    cumulative = np.cumsum(np.where(mask, values, 0.0), axis=0)
+    counts = np.cumsum(mask, axis=0)
+    sums = cumulative.copy()
+    n = counts.astype(float)
+    sums[window:] -= cumulative[:-window]
+    n[window:] -= counts[:-window]
+    result = np.full(values.shape, np.nan)
+    full = n >= window
+    result[full] = sums[full] / n[full]
+    return result
+
+
+def _nancumprod_numpy(values):
+    # DataFrame.cumprod(): NaN entries stay NaN and are skipped by the running product
+    mask = np.isnan(values)
+    result = np.cumprod(np.where(mask, 1.0, values), axis=0)
+    result[mask] = np.nan
+    return result
+
+
+# ---- compiled kernels ----
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _garch_variance_numba(eps, omega, alpha, gamma, beta, backcast):
+        sigma2 = np.empty(len(eps))
+        sigma2[0] = omega + (alpha + 0.5 * gamma + beta) * backcast
+        for t in range(1, len(eps)):
+            shock = eps[t - 1] * eps[t - 1]
+            asymmetric = gamma * shock if eps[t - 1] < 0 else 0.0
+            sigma2[t] = omega + alpha * shock + asymmetric + beta * sigma2[t - 1]
+        return sigma2
+
+    @njit(cache=True)
+    def _ewma_covariance_numba(values, lam, initial):
+        n_obs, n = values.shape
+        cov = initial.copy()
+        for t in range(n_obs):
+            for i in range(n):
+                xi = values[t, i] if not np.isnan(values[t, i]) else 0.0
+                for j in range(n):
+                    xj = values[t, j] if not np.isnan(values[t, j]) else 0.0
+                    cov[i, j] = lam * cov[i, j] + (1 - lam) * xi * xj
+        return cov
+
+    @njit(cache=True)
+    def _drawdown_numba(values):
+        n_obs, n = values.shape
+        drawdown = np.empty((n_obs, n))
+        duration = np.empty((n_obs, n), dtype=np.int64)
+        for j in range(n):
+            wealth, peak, last_peak = 1.0, 0.0, 0
+            for t in range(n_obs):
+                if not np.isnan(values[t, j]):
+                    wealth *= 1.0 + values[t, j]
+                if wealth >= peak:
+                    peak = wealth
+                    last_peak = t
+                drawdown[t, j] = wealth / peak - 1.0
+                duration[t, j] = t - last_peak
+        return drawdown, duration
+
+    @njit(cache=True)
+    def _moving_average_numba(values, window):
+        n_obs, n = values.shape
+        result = np.full((n_obs, n), np.nan)
+        for j in range(n):
+            total, count = 0.0, 0
+            for t in range(n_obs):
+                if not np.isnan(values[t, j]):
+                    total += values[t, j]
+                    count += 1
+                if t >= window and not np.isnan(values[t - window, j]):
+                    total -= values[t - window, j]
+                    count -= 1
+                if count >= window:
+                    result[t, j] = total / count
+        return result
+
+    @njit(cache=True)
+    def _nancumprod_numba(values):
+        n_obs, n = values.shape
+        result = np.empty((n_obs, n))
+        for j in range(n):
+            product = 1.0
+            for t in range(n_obs):
+                if np.isnan(values[t, j]):
+                    result[t, j] = np.nan
+                else:
+                    product *= values[t, j]
+                    result[t, j] = product
+        return result
+
+
+# ---- public API ----
+
+def _as_2d(values):
+    array = np.asarray(values, dtype=float)
+    return (array[:, None], True) if array.ndim == 1 else (array, False)
+
+
+def _wrap(result, like, squeeze):
+    if squeeze:
+        result = result[:, 0]
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(result, index=like.index, columns=like.columns)
+    if isinstance(like, pd.Series):
+        return pd.Series(result, index=like.index, name=like.name)
+    return result
+
+
+def garch_variance(eps, omega, alpha, beta, gamma=0.0, backcast=None, backend=None):
+    # GARCH(1,1) / GJR-GARCH(1,1) conditional variance, started from arch's backcast
+    x = np.ascontiguousarray(eps, dtype=float)
+    backcast = variance_backcast(x) if backcast is None else backcast
+    kernel = _garch_variance_numba if _use_numba(backend) else _garch_variance_numpy
+    return _wrap(kernel(x, float(omega), float(alpha), float(gamma), float(beta), float(backcast)), eps, False)
+
+
+def ewma_covariance(values, lam=0.94, initial=None, backend=None):
+    x = np.ascontiguousarray(values, dtype=float)
+    if initial is None:
+        filled = np.nan_to_num(x)
+        initial = filled.T @ filled / max(len(filled), 1)
+    kernel = _ewma_covariance_numba if _use_numba(backend) else _ewma_covariance_numpy
+    cov = kernel(x, float(lam), np.ascontiguousarray(initial, dtype=float))
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(cov, index=values.columns, columns=values.columns)
+    return cov
+
+
+def running_drawdown(returns, backend=None):
+    # drawdown from the running peak and sessions since that peak; NaN returns leave wealth unchanged
+    x, squeeze = _as_2d(returns)
+    kernel = _drawdown_numba if _use_numba(backend) else _drawdown_numpy
+    drawdown, duration = kernel(np.ascontiguousarray(x))
+    return _wrap(drawdown, returns, squeeze), _wrap(duration, returns, squeeze)
+
+
+def moving_average(values, window, backend=None):
+    x, squeeze = _as_2d(values)
+    kernel = _moving_average_numba if _use_numba(backend) else _moving_average_numpy
+    return _wrap(kernel(np.ascontiguousarray(x), int(window)), values, squeeze)
+
+
+def cumulative_product(values, backend=None):
+    x, squeeze = _as_2d(values)
+    kernel = _nancumprod_numba if _use_numba(backend) else _nancumprod_numpy
+    return _wrap(kernel(np.ascontiguousarray(x)), values, squeeze)
+
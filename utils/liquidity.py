@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from utils.trading_calendar import align_column, returns_matrix
+
+LIQUIDITY_WINDOW = 20       # trading days for the rolling averages
+PARTICIPATION_RATE = 0.20   # share of daily value traded we can take without moving the price
+SPREAD_MULTIPLIER = 3.0     # Bangia et al.: cost = 0.5 * (mean spread + k * spread volatility)
+AMIHUD_SCALE = 1e8          # report illiquidity per 100 million CNY traded
+
+# All panels are (dates x tickers) on the master trading calendar; suspended sessions
+# are NaN and drop out of the rolling means.
+
+def liquidity_panels(stocks, calendar, codes=None):
+    codes = list(stocks.keys()) if codes is None else codes
+    return {
+        'value_traded': align_column(stocks, calendar, '成交额', codes),
+        'turnover': align_column(stocks, calendar, '换手率', codes) / 100,
+        'amplitude': align_column(stocks, calendar, '振幅', codes) / 100,
+        'high': align_column(stocks, calendar, '最高', codes),
+        'low': align_column(stocks, calendar, '最低', codes),
+        'returns': returns_matrix(stocks, calendar, codes),
+    }
+
+def corwin_schultz_spread(high, low):
+    # two-day high-low spread estimator; negative estimates are set to zero
+    log_range = np.log(high / low)**2
+    beta = log_range + log_range.shift(-1)
+    gamma = np.log(np.maximum(high, high.shift(-1)) / np.minimum(low, low.shift(-1)))**2
+    denominator = 3 - 2 * np.sqrt(2)
+    alpha = (np.sqrt(2 * beta) - np.sqrt(beta)) / denominator - np.sqrt(gamma / denominator)
+    spread = 2 * (np.exp(alpha) - 1) / (1 + np.exp(alpha))
+    return spread.clip(lower=0)
+
+def rolling_liquidity(panels, window=LIQUIDITY_WINDOW):
+    min_periods = max(1, window // 2)
+    value_traded = panels['value_traded'].where(panels['value_traded'] > 0)
+    spread = corwin_schultz_spread(panels['high'], panels['low'])
+    return {
+        'adv': value_traded.rolling(window, min_periods=min_periods).mean(),
+        'amihud': (panels['returns'].abs() / value_traded * AMIHUD_SCALE).rolling(window, min_periods=min_periods).mean(),
+        'spread': spread.rolling(window, min_periods=min_periods).mean(),
+        'spread_vol': spread.rolling(window, min_periods=min_periods).std(),
+        'turnover': panels['turnover'].rolling(window, min_periods=min_periods).mean(),
+        'amplitude': panels['amplitude'].rolling(window, min_periods=min_periods).mean(),
+    }
+
+def liquidity_snapshot(stocks, calendar, codes=None, window=LIQUIDITY_WINDOW):
+    # latest available value of every rolling measure, one row per stock
+    rolling = rolling_liquidity(liquidity_panels(stocks, calendar, codes), window)
+    latest = {name: frame.ffill().iloc[-1] for name, frame in rolling.items()}
+    return pd.DataFrame({
+        'ADV (CNY)': latest['adv'],
+        'Amihud': latest['amihud'],
+        'Spread': latest['spread'],
+        'Spread Vol': latest['spread_vol'],
+        'Turnover': latest['turnover'],
+        'Amplitude': latest['amplitude'],
+    })
+
+def days_to_liquidate(position_values, adv, participation=PARTICIPATION_RATE):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(position_values) / (participation * adv)
+
+def position_liquidity(weights, snapshot, portfolio_value, participation=PARTICIPATION_RATE,
+                       max_days=3.0, spread_multiplier=SPREAD_MULTIPLIER):
+    weights = pd.Series(np.asarray(weights, dtype=float), index=snapshot.index)
+    position_values = weights * portfolio_value
+    days = days_to_liquidate(position_values, snapshot['ADV (CNY)'], participation)
+    cost_rate = 0.5 * (snapshot['Spread'] + spread_multiplier * snapshot['Spread Vol'].fillna(0))
+    return pd.DataFrame({
+        'Weight': weights,
+        'Position (CNY)': position_values,
+        'Share of ADV': position_values / snapshot['ADV (CNY)'],
+        'Days to Liquidate': days,
+        'Exit Cost': np.abs(position_values) * cost_rate,
+        'Illiquid': (days > max_days) | snapshot['ADV (CNY)'].isna(),
+    })
+
+def liquidity_adjusted_var(weights, cov_matrix, snapshot, portfolio_value, confidence=0.95,
+                           periods_per_year=252, spread_multiplier=SPREAD_MULTIPLIER):
+    # one-day parametric VaR plus the exogenous spread cost of unwinding every position
+    w = np.asarray(weights, dtype=float)
+    daily_vol = np.sqrt(w @ cov_matrix.dot(w) / periods_per_year)
+    market_var = norm.ppf(confidence) * daily_vol * portfolio_value
+    cost_rate = 0.5 * (snapshot['Spread'] + spread_multiplier * snapshot['Spread Vol'].fillna(0)).fillna(0).to_numpy()
+    liquidity_cost = float(np.abs(w) @ cost_rate * portfolio_value)
+    return {
+        'VaR': market_var,
+        'Liquidity Cost': liquidity_cost,
+        'LVaR': market_var + liquidity_cost,
+    }
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from utils.kernels import running_drawdown
+
+PERIODS_PER_YEAR = 252
+
+# Every function works on the whole (dates x tickers) returns matrix at once.
+# Missing sessions (NaN) are skipped, matching the pandas reductions they replace.
+
+def equal_weight_benchmark(returns_data):
+    # no index series ships with the data, so the equal-weight universe stands in
+    return returns_data.mean(axis=1)
+
+def _masked(values):
+    mask = ~np.isnan(values)
+    return np.where(mask, values, 0.0), mask.astype(float)
+
+def beta_to(values, benchmark):
+    # pairwise-complete covariance with the benchmark over each ticker's own sessions,
+    # reduced to matrix-vector products
+    x, m = _masked(values)
+    present = ~np.isnan(benchmark)
+    b = np.where(present, benchmark, 0.0)
+    n = present.astype(float) @ m
+    sum_x = present.astype(float) @ x
+    sum_b = b @ m
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (b @ x - sum_x * sum_b / n) / (n - 1)
+        var = ((b * b) @ m - sum_b**2 / n) / (n - 1)
+        return cov / var
+
+def performance_metrics(returns_data, benchmark=None, periods_per_year=PERIODS_PER_YEAR):
+    values = returns_data.to_numpy(dtype=float)
+    x, m = _masked(values)
+    n = m.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = x.sum(axis=0) / n
+        centred = np.where(m > 0, values - mean, 0.0)
+        std = np.sqrt((centred**2).sum(axis=0) / (n - 1))
+        downside = np.sqrt((np.minimum(x, 0.0)**2).sum(axis=0) / n)
+
+        # halted sessions leave wealth unchanged
+        final_wealth = np.prod(1.0 + x, axis=0)
+        drawdown, durations = running_drawdown(values)
+        max_drawdown = drawdown.min(axis=0)
+        total_return = final_wealth - 1.0
+        cagr = final_wealth ** (periods_per_year / n) - 1.0
+
+        annual_return = mean * periods_per_year
+        annual_volatility = std * np.sqrt(periods_per_year)
+        sharpe = np.where(annual_volatility != 0, annual_return / annual_volatility, 0.0)
+        sortino = annual_return / (downside * np.sqrt(periods_per_year))
+        calmar = np.where(max_drawdown < 0, cagr / -max_drawdown, np.nan)
+
+    if benchmark is None:
+        benchmark = equal_weight_benchmark(returns_data)
+    beta = beta_to(values, benchmark.reindex(returns_data.index).to_numpy(dtype=float))
+
+    return pd.DataFrame({
+        'Stock': returns_data.columns,
+        'Total Return': total_return,
+        'Annual Return': annual_return,
+        'Annual Volatility': annual_volatility,
+        'Sharpe Ratio': sharpe,
+        'Sortino Ratio': sortino,
+        'Max Drawdown': max_drawdown,
+        'Max Drawdown Days': durations.max(axis=0),
+        'Calmar Ratio': calmar,
+        'Beta': beta,
+    })
+
+def _window_sums(values, window):
+    # rolling sums from one cumulative sum; rows before the first full window are NaN
+    cumulative = np.cumsum(values, axis=0)
+    sums = np.full(values.shape, np.nan)
+    sums[window - 1] = cumulative[window - 1]
+    sums[window:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+ROLLING_METRICS = ('Volatility', 'Sharpe Ratio', 'Sortino Ratio', 'Beta', 'Drawdown')
+
+def rolling_metrics(returns_data, window=63, benchmark=None, metrics=ROLLING_METRICS,
+                    periods_per_year=PERIODS_PER_YEAR):
+    # only the window sums the requested metrics need are built
+    values = returns_data.to_numpy(dtype=float)
+    x, m = _masked(values)
+    n = _window_sums(m, window)
+    full = n >= window
+    frames = {}
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if {'Volatility', 'Sharpe Ratio', 'Sortino Ratio'} & set(metrics):
+            s1 = _window_sums(x, window)
+            mean = np.where(full, s1 / n, np.nan)
+        if {'Volatility', 'Sharpe Ratio'} & set(metrics):
+            # centre on the full-sample mean first so the sum-of-squares difference stays well conditioned
+            shift = np.nan_to_num(x.sum(axis=0) / np.maximum(m.sum(axis=0), 1))
+            xc = (x - shift) * m
+            c1 = s1 - shift * n
+            c2 = _window_sums(xc**2, window)
+            volatility = np.sqrt(np.maximum(c2 - c1**2 / n, 0.0) / (n - 1) * periods_per_year)
+            frames['Volatility'] = np.where(full, volatility, np.nan)
+            frames['Sharpe Ratio'] = mean * periods_per_year / frames['Volatility']
+        if 'Sortino Ratio' in metrics:
+            down = _window_sums(np.minimum(x, 0.0)**2, window)
+            frames['Sortino Ratio'] = mean * periods_per_year / np.sqrt(down / n * periods_per_year)
+        if 'Beta' in metrics:
+            if benchmark is None:
+                benchmark = equal_weight_benchmark(returns_data)
+            b_values = benchmark.reindex(returns_data.index).to_numpy(dtype=float)
+            b_mask = ~np.isnan(b_values)
+            b_centred = np.where(b_mask, b_values - np.nanmean(b_values), 0.0)
+            m_b = m * b_mask[:, None]
+            xb = x * m_b
+            bc = b_centred[:, None] * m_b
+            nb = _window_sums(m_b, window)
+            sx = _window_sums(xb, window)
+            sb = _window_sums(bc, window)
+            cov = (_window_sums(xb * bc, window) - sx * sb / nb) / (nb - 1)
+            var = (_window_sums(bc**2, window) - sb**2 / nb) / (nb - 1)
+            frames['Beta'] = np.where(full, cov / var, np.nan)
+        if 'Drawdown' in metrics:
+            frames['Drawdown'] = running_drawdown(values)[0]
+
+    return {name: pd.DataFrame(frames[name], index=returns_data.index, columns=returns_data.columns)
+            for name in metrics}
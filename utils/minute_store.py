@@ -0,0 +1,271 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+MINUTE_STORE_ENV_VAR = "PORTFOLIO_MINUTE_STORE"
+DEFAULT_MINUTE_STORE = os.path.join("data", "minute_store")
+CHUNK_ROWS = 1_000_000          # rows aggregated per pass; memory stays bounded however long the history
+SESSION_OPEN = pd.Timedelta(hours=9, minutes=30)
+AFTERNOON_OPEN = pd.Timedelta(hours=13)
+MORNING_MINUTES = 120           # 09:30-11:30; the afternoon session runs 13:00-15:00
+MINUTE_NS = 60 * 10**9
+DAY_NS = 24 * 60 * MINUTE_NS
+
+# One directory per ticker, one flat binary file per column, plus meta.json holding the
+# committed row count. Appends write the column files first and the row count last, so
+# a crash mid-append leaves bytes past the count that the next append truncates.
+# Reads memory-map only the committed rows; a time-range query touches only its pages.
+
+COLUMNS = {
+    'timestamp': np.int64,   # bar end, naive Beijing time, ns since epoch
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+    'amount': np.float64,
+}
+
+# akshare stock_zh_a_hist_min_em column names
+SOURCE_COLUMNS = {
+    '时间': 'timestamp',
+    '开盘': 'open',
+    '最高': 'high',
+    '最低': 'low',
+    '收盘': 'close',
+    '成交量': 'volume',
+    '成交额': 'amount',
+}
+
+RESAMPLE_RULES = {
+    '1min': 1,
+    '5min': 5,
+    '15min': 15,
+    '30min': 30,
+    '60min': 60,
+    'daily': None,
+}
+
+def store_root(root=None):
+    return root or os.environ.get(MINUTE_STORE_ENV_VAR, DEFAULT_MINUTE_STORE)
+
+def _ticker_dir(root, code):
+    return os.path.join(store_root(root), str(code))
+
+def _read_meta(root, code):
+    path = os.path.join(_ticker_dir(root, code), 'meta.json')
+    if not os.path.exists(path):
+        return {'rows': 0, 'first': None, 'last': None}
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def _write_meta(root, code, meta):
+    path = os.path.join(_ticker_dir(root, code), 'meta.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+    os.replace(path + '.tmp', path)
+
+def stored_codes(root=None):
+    root = store_root(root)
+    if not os.path.isdir(root):
+        return []
+    return sorted(code for code in os.listdir(root) if _read_meta(root, code)['rows'] > 0)
+
+def stored_rows(code, root=None):
+    return _read_meta(root, code)['rows']
+
+def store_version(codes, root=None):
+    # changes whenever any of the tickers is appended to; used as a cache key
+    return tuple((code, _read_meta(root, code)['rows']) for code in codes)
+
+def store_summary(root=None):
+    rows = []
+    for code in stored_codes(root):
+        meta = _read_meta(root, code)
+        rows.append({
+            'Stock': code,
+            'Bars': meta['rows'],
+            'First Bar': pd.Timestamp(meta['first']),
+            'Last Bar': pd.Timestamp(meta['last']),
+            'Size (MB)': meta['rows'] * sum(np.dtype(dtype).itemsize for dtype in COLUMNS.values()) / 1024**2,
+        })
+    return pd.DataFrame(rows, columns=['Stock', 'Bars', 'First Bar', 'Last Bar', 'Size (MB)'])
+
+# ---- ingestion ----
+
+def _normalize_bars(bars):
+    bars = bars.rename(columns=SOURCE_COLUMNS)
+    missing = [column for column in COLUMNS if column not in bars.columns]
+    if missing:
+        raise ValueError(f"Minute bars are missing columns: {', '.join(missing)}")
+    timestamps = pd.to_datetime(bars['timestamp']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    order = np.argsort(timestamps, kind='stable')
+    frame = {'timestamp': timestamps[order]}
+    for column in COLUMNS:
+        if column != 'timestamp':
+            frame[column] = bars[column].to_numpy(dtype=float)[order]
+    return frame
+
+def append_bars(code, bars, root=None):
+    # only bars strictly after the last stored one are written, so re-ingesting an
+    # overlapping download is a no-op for the overlap
+    root = store_root(root)
+    directory = _ticker_dir(root, code)
+    os.makedirs(directory, exist_ok=True)
+    meta = _read_meta(root, code)
+    frame = _normalize_bars(bars)
+
+    keep = np.ones(len(frame['timestamp']), dtype=bool)
+    keep[1:] = np.diff(frame['timestamp']) > 0
+    if meta['last'] is not None:
+        keep &= frame['timestamp'] > pd.Timestamp(meta['last']).value
+    if not keep.any():
+        return 0
+
+    for column, dtype in COLUMNS.items():
+        path = os.path.join(directory, f'{column}.bin')
+        committed = meta['rows'] * np.dtype(dtype).itemsize
+        with open(path, 'ab') as file:
+            file.truncate(committed)
+            file.write(np.ascontiguousarray(frame[column][keep], dtype=dtype).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+
+    written = int(keep.sum())
+    timestamps = frame['timestamp'][keep]
+    _write_meta(root, code, {
+        'rows': meta['rows'] + written,
+        'first': meta['first'] or str(pd.Timestamp(timestamps[0])),
+        'last': str(pd.Timestamp(timestamps[-1])),
+    })
+    return written
+
+def ingest_csv(code, path, root=None, chunksize=500_000):
+    # streams the file so a multi-year minute history never sits in one DataFrame
+    written = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        written += append_bars(code, chunk, root)
+    return written
+
+# ---- queries ----
+
+def open_columns(code, root=None, columns=None):
+    root = store_root(root)
+    rows = _read_meta(root, code)['rows']
+    mapped = {}
+    for column in columns or COLUMNS:
+        dtype = COLUMNS[column]
+        if rows == 0:
+            mapped[column] = np.empty(0, dtype=dtype)
+        else:
+            mapped[column] = np.memmap(os.path.join(_ticker_dir(root, code), f'{column}.bin'),
+                                       dtype=dtype, mode='r', shape=(rows,))
+    return mapped
+
+def _bucket_labels(timestamps, rule):
+    if rule == 'daily':
+        return timestamps - timestamps % DAY_NS
+    width = RESAMPLE_RULES[rule] * MINUTE_NS
+    # bars are stamped at their end, so buckets close on the right (09:31..09:35 -> 09:35).
+    # Buckets count trading minutes from the open with the lunch break removed, so hourly
+    # bars end at 10:30, 11:30, 14:00 and 15:00. The 09:30 opening-auction print (and a
+    # 13:00 print, where a feed has one) is folded into the first bucket of its session.
+    days = timestamps - timestamps % DAY_NS
+    time_of_day = timestamps % DAY_NS
+    afternoon = time_of_day >= AFTERNOON_OPEN.value
+    morning_ns = MORNING_MINUTES * MINUTE_NS
+    elapsed = np.where(afternoon,
+                       np.maximum(time_of_day - AFTERNOON_OPEN.value, MINUTE_NS) + morning_ns,
+                       np.maximum(time_of_day - SESSION_OPEN.value, MINUTE_NS))
+    closes = -(-elapsed // width) * width
+    return days + np.where(closes <= morning_ns, SESSION_OPEN.value + closes,
+                           AFTERNOON_OPEN.value + closes - morning_ns)
+
+def _chunk_ranges(timestamps, lo, hi, rule, chunk_rows):
+    # split [lo, hi) into row ranges that never cut a bucket in two
+    start = lo
+    while start < hi:
+        stop = min(start + chunk_rows, hi)
+        if stop < hi:
+            # run on to the end of the bucket the chunk stops in
+            label = _bucket_labels(np.asarray(timestamps[stop - 1:stop]), rule)[0]
+            if rule == 'daily':
+                stop = int(np.searchsorted(timestamps, label + DAY_NS, side='left'))
+            else:
+                stop = int(np.searchsorted(timestamps, label, side='right'))
+            stop = min(stop, hi)
+        yield start, stop
+        start = stop
+
+def _aggregate(columns, start, stop, rule):
+    timestamps = np.asarray(columns['timestamp'][start:stop])
+    labels = _bucket_labels(timestamps, rule)
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+    return {
+        'timestamp': labels[starts],
+        'open': np.asarray(columns['open'][start:stop])[starts],
+        'high': np.maximum.reduceat(np.asarray(columns['high'][start:stop]), starts),
+        'low': np.minimum.reduceat(np.asarray(columns['low'][start:stop]), starts),
+        'close': np.asarray(columns['close'][start:stop])[ends],
+        'volume': np.add.reduceat(np.asarray(columns['volume'][start:stop]), starts),
+        'amount': np.add.reduceat(np.asarray(columns['amount'][start:stop]), starts),
+    }
+
+def query_bars(code, start=None, end=None, rule='5min', root=None, chunk_rows=CHUNK_ROWS):
+    if rule not in RESAMPLE_RULES:
+        raise ValueError(f"Unknown resample rule {rule!r}; choose from {', '.join(RESAMPLE_RULES)}")
+    columns = open_columns(code, root)
+    timestamps = columns['timestamp']
+    lo = 0 if start is None else int(np.searchsorted(timestamps, pd.Timestamp(start).value, side='left'))
+    hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, pd.Timestamp(end).value, side='right'))
+
+    parts = [_aggregate(columns, a, b, rule) for a, b in _chunk_ranges(timestamps, lo, hi, rule, chunk_rows)]
+    if not parts:
+        return pd.DataFrame(columns=[column for column in COLUMNS if column != 'timestamp'],
+                            index=pd.DatetimeIndex([], name='timestamp'))
+    data = {column: np.concatenate([part[column] for part in parts]) for column in COLUMNS}
+    index = pd.DatetimeIndex(data.pop('timestamp').astype('datetime64[ns]'), name='timestamp')
+    return pd.DataFrame(data, index=index)
+
+# ---- realized volatility ----
+
+REALIZED_ESTIMATORS = ['Realized Vol', 'Bipower Vol', 'Parkinson Vol', 'Garman-Klass Vol']
+
+def realized_volatility(code, sampling='5min', start=None, end=None, root=None):
+    # daily (not annualized) volatility per session from intraday bars:
+    # - Realized: sqrt of the sum of squared intraday log returns at the sampling frequency
+    # - Bipower: jump-robust pi/2 * sum |r_t||r_t-1| (Barndorff-Nielsen & Shephard)
+    # - Parkinson / Garman-Klass: range estimators from the session's high, low, open and close
+    # overnight returns are excluded, so these measure the trading session only
+    bars = query_bars(code, start, end, sampling, root)
+    if bars.empty:
+        return pd.DataFrame(columns=REALIZED_ESTIMATORS + ['Bars'])
+    days = bars.index.normalize()
+    log_close = np.log(bars['close'].to_numpy())
+    returns = np.diff(log_close)
+    same_day = days[1:] == days[:-1]
+    intraday = pd.Series(np.where(same_day, returns, np.nan), index=days[1:])
+    adjacent = np.r_[False, same_day[1:] & same_day[:-1]]
+    products = pd.Series(np.where(adjacent, np.abs(returns) * np.abs(np.r_[np.nan, returns[:-1]]), np.nan), index=days[1:])
+
+    daily = query_bars(code, start, end, 'daily', root)
+    log_range = np.log(daily['high'] / daily['low'])
+    log_body = np.log(daily['close'] / daily['open'])
+    result = pd.DataFrame({
+        'Realized Vol': np.sqrt((intraday**2).groupby(level=0).sum(min_count=1)),
+        'Bipower Vol': np.sqrt(np.pi / 2 * products.groupby(level=0).sum(min_count=1)),
+        'Parkinson Vol': np.sqrt(log_range**2 / (4 * np.log(2))),
+        'Garman-Klass Vol': np.sqrt(np.maximum(0.5 * log_range**2 - (2 * np.log(2) - 1) * log_body**2, 0.0)),
+        'Bars': pd.Series(1, index=days).groupby(level=0).sum(),
+    })
+    result.index.name = 'Date'
+    return result
+
+def realized_volatility_panel(codes, estimator='Realized Vol', sampling='5min', root=None):
+    # one column per stored ticker, on the union of their sessions
+    frames = {code: realized_volatility(code, sampling, root=root)[estimator]
+              for code in codes if stored_rows(code, root) > 0}
+    return pd.DataFrame(frames)
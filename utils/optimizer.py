@@ -0,0 +1,233 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize, linprog
+
+from utils.rng import run_chunked, DEFAULT_SEED
+
+BOARD_PREFIXES = [
+    ('688', 'STAR Market'),
+    ('689', 'STAR Market'),
+    ('300', 'ChiNext'),
+    ('301', 'ChiNext'),
+    ('60', 'SSE Main Board'),
+    ('00', 'SZSE Main Board'),
+]
+
+FEASIBILITY_TOLERANCE = 1e-6    # max violation of any bound or constraint accepted from the solver
+
+def board_of(code):
+    for prefix, board in BOARD_PREFIXES:
+        if str(code).startswith(prefix):
+            return board
+    return 'Other'
+
+def board_groups(codes):
+    groups = {}
+    for code in codes:
+        groups.setdefault(board_of(code), []).append(code)
+    return groups
+
+def _constraint_matrices(codes, group_caps, current_weights, max_turnover):
+    # decision vector is [w] or, with a turnover limit, [w, d] where d_i >= |w_i - w0_i|
+    n = len(codes)
+    use_turnover = max_turnover is not None and current_weights is not None
+    size = 2 * n if use_turnover else n
+
+    A_eq = np.zeros((1, size))
+    A_eq[0, :n] = 1.0
+    b_eq = np.array([1.0])
+
+    rows, rhs = [], []
+    for members, cap in (group_caps or {}).values():
+        row = np.zeros(size)
+        row[[codes.index(m) for m in members if m in codes]] = 1.0
+        rows.append(row)
+        rhs.append(cap)
+
+    if use_turnover:
+        w0 = np.asarray(current_weights, dtype=float)
+        eye = np.eye(n)
+        # w - d <= w0 and -w - d <= -w0, plus one-way turnover 0.5 * sum(d) <= limit
+        rows.extend(np.hstack([eye, -eye]))
+        rhs.extend(w0)
+        rows.extend(np.hstack([-eye, -eye]))
+        rhs.extend(-w0)
+        row = np.zeros(size)
+        row[n:] = 0.5
+        rows.append(row)
+        rhs.append(max_turnover)
+
+    A_ub = np.array(rows) if rows else np.zeros((0, size))
+    b_ub = np.array(rhs, dtype=float)
+    return A_eq, b_eq, A_ub, b_ub, size
+
+def _starting_point(n, size, current_weights):
+    x0 = np.zeros(size)
+    if current_weights is not None:
+        x0[:n] = current_weights
+    else:
+        x0[:n] = 1.0 / n
+    return x0
+
+def covariance_operator(cov_matrix):
+    # dense matrices and factor models both expose .dot(w)
+    if isinstance(cov_matrix, pd.DataFrame):
+        return cov_matrix.values
+    return cov_matrix if hasattr(cov_matrix, 'dot') else np.asarray(cov_matrix, dtype=float)
+
+def max_sharpe_weights(mean_returns, cov_matrix, min_weight=0.0, max_weight=1.0, x0=None):
+    # long-only max-Sharpe with simple bounds; used when re-optimizing many samples
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = covariance_operator(cov_matrix)
+    n = len(mu)
+    x0 = np.full(n, 1.0 / n) if x0 is None else x0
+
+    def negative_sharpe(w):
+        variance = w @ cov.dot(w)
+        return -(mu @ w) / np.sqrt(variance)
+
+    def negative_sharpe_grad(w):
+        cov_w = cov.dot(w)
+        variance = w @ cov_w
+        std = np.sqrt(variance)
+        return -(mu * std - (mu @ w) * cov_w / std) / variance
+
+    result = minimize(negative_sharpe, x0, jac=negative_sharpe_grad, method='SLSQP',
+                      bounds=[(min_weight, max_weight)] * n,
+                      constraints=[{'type': 'eq', 'fun': lambda w: w.sum() - 1.0, 'jac': lambda w: np.ones(n)}],
+                      options={'maxiter': 300, 'ftol': 1e-10})
+    weights = np.clip(result.x, 0.0, None)
+    return weights / weights.sum()
+
+def _random_portfolio_chunk(seed_sequence, size, mu, cov):
+    rng = np.random.default_rng(seed_sequence)
+    weights = rng.random((size, len(mu)))
+    weights /= weights.sum(axis=1, keepdims=True)
+    returns = weights @ mu
+    vols = np.sqrt(np.einsum('ij,ij->i', weights, cov.dot(weights.T).T))
+    return weights, returns, vols
+
+def random_portfolios(mean_returns, cov_matrix, n_portfolios=10000, seed=DEFAULT_SEED, chunk_size=2000, n_workers=1):
+    # uniform draws normalized to sum to one, evaluated a chunk at a time
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = covariance_operator(cov_matrix)
+    chunks = run_chunked(_random_portfolio_chunk, seed, n_portfolios, chunk_size, mu, cov,
+                         stream='random_portfolios', n_workers=n_workers)
+    weights = np.vstack([chunk[0] for chunk in chunks])
+    returns = np.concatenate([chunk[1] for chunk in chunks])
+    vols = np.concatenate([chunk[2] for chunk in chunks])
+    return weights, returns, vols
+
+def _clean_weights(w):
+    # SLSQP leaves round-off like -1e-12 at a zero bound; only that is removed, so the weights
+    # stay exactly as feasible as the solver left them (no clipping or renormalizing)
+    return np.where((w < 0) & (w > -FEASIBILITY_TOLERANCE), 0.0, w)
+
+def constrained_frontier(mean_returns, cov_matrix, n_points=40, min_weight=0.0, max_weight=1.0,
+                         group_caps=None, current_weights=None, max_turnover=None):
+    # Long-only frontier under per-asset bounds, board caps ({name: (codes, cap)}) and a one-way
+    # turnover limit against current_weights. The constraint matrices are built once for every
+    # point, but the targets are solved one after another with SLSQP, each warm-started from
+    # its neighbour, rather than as a single stacked QP: with a turnover limit the batch problem
+    # grows as points x 2N variables, while a warm-started point converges in a few iterations.
+    # Returns (results_df, weight_list, failed_targets); failed_targets lists the target returns
+    # for which no feasible portfolio was found.
+    codes = list(mean_returns.index)
+    n = len(codes)
+    mu = np.asarray(mean_returns, dtype=float)
+    cov = covariance_operator(cov_matrix)
+
+    if min_weight * n > 1 + 1e-9 or max_weight * n < 1 - 1e-9:
+        raise ValueError(f"Weight bounds [{min_weight:.0%}, {max_weight:.0%}] cannot sum to 100% across {n} stocks")
+
+    A_eq, b_eq, A_ub, b_ub, size = _constraint_matrices(codes, group_caps, current_weights, max_turnover)
+    bounds = [(min_weight, max_weight)] * n + [(0.0, 2.0)] * (size - n)
+    lower, upper = np.array(bounds).T
+
+    # the feasible return range comes from two linear programs
+    lp_kwargs = dict(A_ub=A_ub if len(b_ub) else None, b_ub=b_ub if len(b_ub) else None,
+                     A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+    c = np.zeros(size)
+    c[:n] = -mu
+    lp_max = linprog(c, **lp_kwargs)
+    if not lp_max.success:
+        raise ValueError("The portfolio constraints are infeasible")
+
+    def variance(x):
+        w = x[:n]
+        return w @ cov.dot(w)
+
+    def variance_grad(x):
+        grad = np.zeros(size)
+        grad[:n] = 2 * cov.dot(x[:n])
+        return grad
+
+    base_constraints = [{'type': 'eq', 'fun': lambda x: A_eq @ x - b_eq, 'jac': lambda x: A_eq}]
+    if len(b_ub):
+        base_constraints.append({'type': 'ineq', 'fun': lambda x: b_ub - A_ub @ x, 'jac': lambda x: -A_ub})
+
+    def feasible(x):
+        return (np.all(x >= lower - FEASIBILITY_TOLERANCE) and np.all(x <= upper + FEASIBILITY_TOLERANCE)
+                and np.all(np.abs(A_eq @ x - b_eq) <= FEASIBILITY_TOLERANCE)
+                and (not len(b_ub) or np.all(A_ub @ x - b_ub <= FEASIBILITY_TOLERANCE)))
+
+    def solve(x0, target=None):
+        constraints = list(base_constraints)
+        if target is not None:
+            constraints.append({'type': 'eq', 'fun': lambda x: mu @ x[:n] - target,
+                                'jac': lambda x: np.concatenate([mu, np.zeros(size - n)])})
+        return minimize(variance, x0, jac=variance_grad, method='SLSQP', bounds=bounds,
+                        constraints=constraints, options={'maxiter': 500, 'ftol': 1e-12})
+
+    min_var = solve(_starting_point(n, size, current_weights))
+    if not (min_var.success and feasible(min_var.x)):
+        raise ValueError(f"Minimum variance optimization failed: {min_var.message}")
+
+    low_return = mu @ min_var.x[:n]
+    high_return = mu @ lp_max.x[:n]
+    targets = np.linspace(low_return, high_return, n_points)
+
+    # trace the frontier from the min-variance end, warm-starting each point from its neighbour;
+    # a target that fails from the warm start is retried from the min-variance portfolio
+    solutions = [min_var.x]
+    failed_targets = []
+    x_prev = min_var.x
+    for target in targets[1:]:
+        result = solve(x_prev, target)
+        if not (result.success and feasible(result.x)):
+            result = solve(min_var.x, target)
+        if result.success and feasible(result.x):
+            solutions.append(result.x)
+            x_prev = result.x
+        else:
+            failed_targets.append(float(target))
+
+    weights = np.array([_clean_weights(x[:n]) for x in solutions])
+
+    # refine the max-Sharpe point starting from the best frontier portfolio
+    returns = weights @ mu
+    vols = np.sqrt(np.einsum('ij,ij->i', weights, cov.dot(weights.T).T))
+    best = int(np.argmax(returns / vols))
+
+    def negative_sharpe(x):
+        w = x[:n]
+        return -(mu @ w) / np.sqrt(w @ cov.dot(w))
+
+    sharpe_constraints = list(base_constraints)
+    refined = minimize(negative_sharpe, solutions[best], method='SLSQP', bounds=bounds,
+                       constraints=sharpe_constraints, options={'maxiter': 500, 'ftol': 1e-12})
+    if refined.success and feasible(refined.x) and -refined.fun > returns[best] / vols[best]:
+        weights = np.vstack([weights, _clean_weights(refined.x[:n])])
+
+    returns = weights @ mu
+    vols = np.sqrt(np.einsum('ij,ij->i', weights, cov.dot(weights.T).T))
+    order = np.argsort(returns, kind='stable')
+    weights = weights[order]
+
+    results_df = pd.DataFrame({
+        'Volatility': vols[order],
+        'Return': returns[order],
+        'Sharpe': returns[order] / vols[order]
+    })
+    weight_list = list(weights)
+    return results_df, weight_list, failed_targets
@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+PROFILE_ENV_VAR = "PORTFOLIO_PROFILE"            # set to 1 to force profiling on
+TRACE_PATH_ENV_VAR = "PORTFOLIO_PROFILE_TRACE"   # where export_trace appends JSON lines
+DEFAULT_TRACE_PATH = "profiling_trace.jsonl"
+SESSION_KEY = "_profiling_state"
+TRACING_SESSION_TTL_S = 600                      # a profiling session idle this long stops holding tracemalloc
+
+# sessions with profiling on -> last time they ran a stage; tracemalloc is process-wide, so it
+# keeps running while any entry is fresh. A closed tab never turns profiling off itself, so
+# entries not seen within the TTL are pruned on every rerun of any session.
+_tracing_sessions = {}
+_tracing_lock = threading.Lock()
+
+
+def _env_enabled():
+    return os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0")
+
+
+def _mark_tracing(session_id):
+    with _tracing_lock:
+        _tracing_sessions[session_id] = time.time()
+
+
+def _release_tracing(session_id=None):
+    # drops session_id (if given) and every stale entry; stops tracing once none are left
+    with _tracing_lock:
+        _tracing_sessions.pop(session_id, None)
+        cutoff = time.time() - TRACING_SESSION_TTL_S
+        for stale in [key for key, seen in _tracing_sessions.items() if seen < cutoff]:
+            del _tracing_sessions[stale]
+        if not _tracing_sessions and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _new_state(session_id=None):
+    state = {
+        'enabled': _env_enabled(),
+        'session_id': session_id or uuid.uuid4().hex[:12],
+        'run_id': 0,
+        'run_started': time.time(),
+        'records': [],
+        'cache': {},
+        'stack': [],
+        'pending_cache': {},
+    }
+    if state['enabled']:
+        _mark_tracing(state['session_id'])
+    return state
+
+
+# used outside a Streamlit script run (scripts, worker processes)
+_fallback_state = _new_state()
+
+
+def _session():
+    # each browser session keeps its own flag, run records and stage stack in its
+    # session_state, so concurrent sessions never reset or interleave each other's traces
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return _fallback_state
+    session_state = ctx.session_state
+    if SESSION_KEY not in session_state:
+        session_state[SESSION_KEY] = _new_state(ctx.session_id)
+    return session_state[SESSION_KEY]
+
+
+def profiling_enabled():
+    return _session()['enabled']
+
+
+def set_profiling_enabled(enabled):
+    state = _session()
+    enabled = bool(enabled) or _env_enabled()
+    if enabled == state['enabled']:
+        return
+    state['enabled'] = enabled
+    if enabled:
+        _mark_tracing(state['session_id'])
+    else:
+        _release_tracing(state['session_id'])
+
+
+def start_profiling_run():
+    # called once per Streamlit rerun so the panel only shows the current run
+    state = _session()
+    state['run_id'] += 1
+    state['run_started'] = time.time()
+    state['records'] = []
+    state['stack'] = []
+    state['pending_cache'] = {}
+    if state['enabled']:
+        _mark_tracing(state['session_id'])
+    _release_tracing()
+
+
+@contextmanager
+def profile_stage(name, kind="stage"):
+    state = _session()
+    if not state['enabled']:
+        yield
+        return
+
+    # tracemalloc is process-wide: a session profiling alongside another one sees the
+    # other's allocations in its peaks, but never its stages
+    _mark_tracing(state['session_id'])
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    stack = state['stack']
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        # keep the parent's peak before resetting it for this stage
+        stack[-1]['max_peak'] = max(stack[-1]['max_peak'], peak)
+    tracemalloc.reset_peak()
+    frame = {'start_mem': current, 'max_peak': current}
+    stack.append(frame)
+
+    start_ts = time.time()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        absolute_peak = max(frame['max_peak'], tracemalloc.get_traced_memory()[1])
+        stack.pop()
+        if stack:
+            stack[-1]['max_peak'] = max(stack[-1]['max_peak'], absolute_peak)
+
+        state['records'].append({
+            'session_id': state['session_id'],
+            'run_id': state['run_id'],
+            'name': name,
+            'kind': kind,
+            'depth': len(stack),
+            'start_ts': start_ts,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'peak_mem_bytes': max(absolute_peak - frame['start_mem'], 0),
+        })
+
+
+def profiled(name=None, kind="section"):
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _session()['enabled']:
+                return func(*args, **kwargs)
+            with profile_stage(stage_name, kind=kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache_access(name, hit):
+    state = _session()
+    if not state['enabled']:
+        return
+    counts = state['cache'].setdefault(name, {'hits': 0, 'misses': 0})
+    counts['hits' if hit else 'misses'] += 1
+
+
+@contextmanager
+def cache_probe(name):
+    # wraps a call to an st.cache_data function; the cached body calls
+    # mark_cache_miss(name), so anything that does not is counted as a hit
+    state = _session()
+    if not state['enabled']:
+        yield
+        return
+    state['pending_cache'][name] = True
+    try:
+        yield
+    finally:
+        hit = state['pending_cache'].pop(name, True)
+        record_cache_access(name, hit)
+
+
+def mark_cache_miss(name):
+    state = _session()
+    if not state['enabled']:
+        return
+    if name in state['pending_cache']:
+        state['pending_cache'][name] = False
+    else:
+        record_cache_access(name, False)
+
+
+def run_records():
+    state = _session()
+    return pd.DataFrame(state['records'], columns=[
+        'session_id', 'run_id', 'name', 'kind', 'depth',
+        'start_ts', 'wall_s', 'cpu_s', 'peak_mem_bytes'
+    ])
+
+
+def cache_stats():
+    state = _session()
+    rows = []
+    for name, counts in state['cache'].items():
+        total = counts['hits'] + counts['misses']
+        rows.append({
+            'Cache': name,
+            'Hits': counts['hits'],
+            'Misses': counts['misses'],
+            'Hit Rate': counts['hits'] / total if total else 0.0
+        })
+    return pd.DataFrame(rows, columns=['Cache', 'Hits', 'Misses', 'Hit Rate'])
+
+
+def trace_lines():
+    # one JSON object per stage plus one per cache counter, so traces from
+    # many sessions can simply be concatenated and aggregated later
+    state = _session()
+    lines = [json.dumps(dict(record, type='stage')) for record in state['records']]
+    for name, counts in state['cache'].items():
+        lines.append(json.dumps({
+            'type': 'cache',
+            'session_id': state['session_id'],
+            'run_id': state['run_id'],
+            'start_ts': state['run_started'],
+            'name': name,
+            'hits': counts['hits'],
+            'misses': counts['misses'],
+        }))
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def export_trace(path=None):
+    path = path or os.environ.get(TRACE_PATH_ENV_VAR, DEFAULT_TRACE_PATH)
+    payload = trace_lines()
+    if payload:
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(payload)
+    return path
+
+
+def load_trace(path=None):
+    path = path or os.environ.get(TRACE_PATH_ENV_VAR, DEFAULT_TRACE_PATH)
+    with open(path, "r", encoding="utf-8") as file:
+        return pd.DataFrame([json.loads(line) for line in file if line.strip()])
+
+
+def summarize_trace(trace_df):
+    stages = trace_df[trace_df['type'] == 'stage']
+    if stages.empty:
+        return pd.DataFrame()
+    grouped = stages.groupby(['kind', 'name'])
+    summary = pd.DataFrame({
+        'Calls': grouped.size(),
+        'Sessions': grouped['session_id'].nunique(),
+        'Mean Wall (s)': grouped['wall_s'].mean(),
+        'P95 Wall (s)': grouped['wall_s'].quantile(0.95),
+        'Mean CPU (s)': grouped['cpu_s'].mean(),
+        'Max Peak Memory (MB)': grouped['peak_mem_bytes'].max() / 1024**2,
+    })
+    return summary.sort_values('Mean Wall (s)', ascending=False).reset_index()
@@ -0,0 +1,256 @@
+import time
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from utils.kernels import ewma_covariance, garch_variance, variance_backcast
+from utils.rng import DEFAULT_SEED, generator
+from utils.trading_calendar import align_column
+
+ROLLING_WINDOW = 20
+EWMA_LAMBDA = 0.94
+GARCH_ALPHA = 0.08
+GARCH_BETA = 0.90
+MINUTES_PER_SESSION = 240      # SSE/SZSE continuous trading: 09:30-11:30 and 13:00-15:00
+BAR_SECONDS = 60.0
+
+# A replay is a generator pipeline: a feed yields (timestamp, price vector) bars, the first
+# few bars warm the state up in batch, and every later bar updates a dict of running
+# statistics in O(N) (rolling moments, GARCH) or O(N^2) (EWMA covariance) without
+# touching the history again.
+
+# ---- feeds ----
+
+def frame_feed(prices):
+    for timestamp, row in zip(prices.index, prices.to_numpy(dtype=float)):
+        yield timestamp, row
+
+def history_feed(stocks, calendar, codes=None, start=None):
+    # closing prices session by session from the stored history; halted sessions are NaN
+    prices = align_column(stocks, calendar, '收盘', codes)
+    if start is not None:
+        prices = prices.loc[pd.Timestamp(start):]
+    return frame_feed(prices)
+
+def synthetic_feed(codes, n_bars, seed=DEFAULT_SEED, bar_vol=0.0015, market_share=0.3,
+                   initial_prices=None, start='2025-01-02 09:30', freq='1min'):
+    # stand-in for a live minute-bar feed: one market factor plus fat-tailed idiosyncratic noise
+    rng = generator(seed, 'replay_feed', len(codes))
+    n = len(codes)
+    betas = rng.uniform(0.6, 1.4, n)
+    prices = np.full(n, 10.0) if initial_prices is None else np.asarray(initial_prices, dtype=float).copy()
+    idiosyncratic_scale = np.sqrt(1 - market_share) / np.sqrt(5 / 3)
+    for timestamp in pd.date_range(start, periods=n_bars, freq=freq):
+        shocks = np.sqrt(market_share) * betas * rng.standard_normal() + idiosyncratic_scale * rng.standard_t(5, n)
+        prices = prices * (1 + bar_vol * shocks)
+        yield timestamp, prices.copy()
+
+def take_warmup(feed, n_bars):
+    # consume the first bars of a feed as a price block; the feed keeps streaming from there
+    bars = list(islice(feed, n_bars))
+    if not bars:
+        return pd.DataFrame()
+    timestamps, rows = zip(*bars)
+    return pd.DataFrame(np.vstack(rows), index=pd.DatetimeIndex(timestamps))
+
+# ---- running statistics ----
+
+def _rolling_init(window, n):
+    return {
+        'window': window,
+        'position': 0,
+        'values': np.zeros((window, n)),
+        'mask': np.zeros((window, n), dtype=bool),
+        'sums': np.zeros(n),
+        'squares': np.zeros(n),
+        'counts': np.zeros(n, dtype=np.int64),
+    }
+
+def _rolling_push(rolling, x, observed):
+    # x is zero wherever observed is False, so missing bars drop out of the moments
+    slot = rolling['position'] % rolling['window']
+    old = rolling['values'][slot]
+    rolling['sums'] += x - old
+    rolling['squares'] += x * x - old * old
+    rolling['counts'] += observed.astype(np.int64) - rolling['mask'][slot]
+    rolling['values'][slot] = x
+    rolling['mask'][slot] = observed
+    rolling['position'] += 1
+    if rolling['position'] % rolling['window'] == 0:
+        # re-sum once per window so add/subtract rounding cannot accumulate
+        rolling['sums'] = rolling['values'].sum(axis=0)
+        rolling['squares'] = (rolling['values']**2).sum(axis=0)
+
+def _rolling_std(rolling, min_periods):
+    counts = rolling['counts'].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (rolling['squares'] - rolling['sums']**2 / counts) / (counts - 1)
+    return np.where(counts >= max(min_periods, 2), np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+def _garch_step(state, x, observed):
+    # one-step-ahead GJR-GARCH(1,1) variance; tickers without a bar keep their forecast
+    garch = state['garch']
+    shock = (garch['alpha'] + garch['gamma'] * (x < 0)) * x * x
+    updated = garch['omega'] + shock + garch['beta'] * garch['variance']
+    garch['variance'] = np.where(observed, updated, garch['variance'])
+
+def _portfolio_risk(state):
+    # one N x 3 product gives EWMA portfolio variance, the GARCH-scaled variance and the
+    # sum of all pairwise EWMA correlations
+    cov = state['cov']
+    diagonal = np.diag(cov)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse_vol = np.where(diagonal > 0, 1 / np.sqrt(diagonal), 0.0)
+        weights = state['positions'] / state['value'] if state['value'] else np.zeros(len(diagonal))
+    garch_weights = weights * np.sqrt(state['garch']['variance']) * inverse_vol
+    vectors = np.column_stack([weights, garch_weights, inverse_vol])
+    products = cov @ vectors
+    quadratic = np.einsum('ij,ij->j', vectors, products)
+    n = int((diagonal > 0).sum())
+    average_correlation = (quadratic[2] - n) / (n * (n - 1)) if n > 1 else np.nan
+    return np.sqrt(max(quadratic[0], 0.0)), np.sqrt(max(quadratic[1], 0.0)), average_correlation
+
+# ---- state ----
+
+def start_replay(warmup_prices, weights, window=ROLLING_WINDOW, lam=EWMA_LAMBDA, alpha=GARCH_ALPHA,
+                 beta=GARCH_BETA, gamma=0.0, portfolio_value=1e6, periods_per_year=252):
+    # the warm-up block is processed in batch with the same recursions the stream uses,
+    # so the first streamed bar continues exactly where the batch left off
+    codes = list(warmup_prices.columns)
+    n = len(codes)
+    # a return is measured against the last traded price, as in update_replay_state
+    returns = warmup_prices.ffill().pct_change(fill_method=None).where(warmup_prices.notna())
+    returns = returns.iloc[1:].to_numpy(dtype=float)
+    observed = ~np.isnan(returns)
+    filled = np.where(observed, returns, 0.0)
+
+    rolling = _rolling_init(window, n)
+    for row, mask in zip(filled[-window:], observed[-window:]):
+        _rolling_push(rolling, row, mask)
+
+    initial_cov = filled.T @ filled / max(len(filled), 1)
+    cov = ewma_covariance(returns, lam, initial_cov) if len(returns) else np.zeros((n, n))
+
+    # variance targeting: omega pins the unconditional variance to the warm-up sample variance
+    sample_variance = np.nanvar(np.where(observed, returns, np.nan), axis=0) if len(returns) else np.full(n, np.nan)
+    fallback = np.nanmedian(sample_variance) if np.isfinite(sample_variance).any() else 1e-4
+    sample_variance = np.where(np.isfinite(sample_variance) & (sample_variance > 0), sample_variance, fallback)
+    persistence = alpha + 0.5 * gamma + beta
+    omega = sample_variance * (1 - persistence)
+    variance = np.empty(n)
+    for j in range(n):
+        eps = returns[observed[:, j], j]
+        if len(eps) < 2:
+            variance[j] = sample_variance[j]
+            continue
+        sigma2 = garch_variance(eps, omega[j], alpha, beta, gamma, backcast=variance_backcast(eps))
+        variance[j] = omega[j] + (alpha + gamma * (eps[-1] < 0)) * eps[-1]**2 + beta * sigma2[-1]
+
+    return {
+        'codes': codes,
+        'lam': lam,
+        'periods_per_year': periods_per_year,
+        'min_periods': max(2, window // 2),
+        'last_prices': warmup_prices.ffill().iloc[-1].to_numpy(dtype=float),
+        'rolling': rolling,
+        'portfolio_rolling': _rolling_init(window, 1),
+        'cov': cov,
+        'outer': np.empty((n, n)),
+        'garch': {
+            'omega': omega,
+            'alpha': alpha,
+            'beta': beta,
+            'gamma': gamma,
+            'variance': variance,
+        },
+        'positions': np.asarray(weights, dtype=float) * portfolio_value,
+        'initial_value': float(portfolio_value),
+        'value': float(portfolio_value),
+        'bars': 0,
+        'latencies': [],
+    }
+
+def update_replay_state(state, timestamp, prices):
+    prices = np.asarray(prices, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = prices / state['last_prices'] - 1
+    observed = np.isfinite(returns)
+    x = np.where(observed, returns, 0.0)
+    state['last_prices'] = np.where(np.isnan(prices), state['last_prices'], prices)
+
+    _rolling_push(state['rolling'], x, observed)
+    lam = state['lam']
+    state['cov'] *= lam
+    np.multiply.outer((1 - lam) * x, x, out=state['outer'])
+    state['cov'] += state['outer']
+    _garch_step(state, x, observed)
+
+    # buy-and-hold: every position drifts with its own return
+    pnl = float(state['positions'] @ x)
+    portfolio_return = pnl / state['value'] if state['value'] else 0.0
+    state['positions'] *= 1 + x
+    state['value'] += pnl
+    state['bars'] += 1
+    _rolling_push(state['portfolio_rolling'], np.array([portfolio_return]), np.array([True]))
+
+    annualize = np.sqrt(state['periods_per_year'])
+    ewma_vol, garch_vol, average_correlation = _portfolio_risk(state)
+    return {
+        'timestamp': timestamp,
+        'value': state['value'],
+        'pnl': pnl,
+        'cumulative_pnl': state['value'] - state['initial_value'],
+        'return': portfolio_return,
+        'rolling_vol': _rolling_std(state['portfolio_rolling'], state['min_periods'])[0] * annualize,
+        'ewma_vol': ewma_vol * annualize,
+        'garch_vol': garch_vol * annualize,
+        'average_correlation': average_correlation,
+        'traded': int(observed.sum()),
+    }
+
+def replay(feed, state, max_bars=None):
+    # generator: one snapshot per bar, with the update latency recorded in the state
+    for timestamp, prices in islice(feed, max_bars):
+        start = time.perf_counter()
+        snapshot = update_replay_state(state, timestamp, prices)
+        latency = time.perf_counter() - start
+        state['latencies'].append(latency)
+        snapshot['latency_ms'] = latency * 1000
+        yield snapshot
+
+def replay_stock_frame(state):
+    annualize = np.sqrt(state['periods_per_year'])
+    ewma_variance = np.diag(state['cov'])
+    return pd.DataFrame({
+        'Last Price': state['last_prices'],
+        'Position': state['positions'],
+        'Weight': state['positions'] / state['value'] if state['value'] else np.nan,
+        'Rolling Vol': _rolling_std(state['rolling'], state['min_periods']) * annualize,
+        'EWMA Vol': np.sqrt(ewma_variance) * annualize,
+        'GARCH Vol': np.sqrt(state['garch']['variance']) * annualize,
+    }, index=state['codes'])
+
+def replay_correlation(state):
+    diagonal = np.diag(state['cov'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(diagonal > 0, 1 / np.sqrt(diagonal), np.nan)
+    return pd.DataFrame(state['cov'] * np.outer(scale, scale), index=state['codes'], columns=state['codes'])
+
+# ---- latency ----
+
+def latency_summary(latencies, bar_seconds=BAR_SECONDS):
+    values = np.asarray(latencies, dtype=float) * 1000
+    if not len(values):
+        return {}
+    p99 = np.percentile(values, 99)
+    return {
+        'Updates': len(values),
+        'Mean (ms)': values.mean(),
+        'P50 (ms)': np.percentile(values, 50),
+        'P95 (ms)': np.percentile(values, 95),
+        'P99 (ms)': p99,
+        'Max (ms)': values.max(),
+        'Updates per Second': 1000 / values.mean(),
+        'Bar Budget Used (P99)': p99 / (bar_seconds * 1000),
+    }
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from utils.optimizer import max_sharpe_weights
+from utils.rng import run_chunked, DEFAULT_SEED
+
+def block_bootstrap_indices(n_obs, block_length, n_samples, rng):
+    # moving-block bootstrap: every row of the result is one resampled history
+    block_length = max(1, min(block_length, n_obs))
+    n_blocks = -(-n_obs // block_length)
+    starts = rng.integers(0, n_obs - block_length + 1, size=(n_samples, n_blocks))
+    indices = starts[:, :, None] + np.arange(block_length)
+    return indices.reshape(n_samples, -1)[:, :n_obs]
+
+def resampled_moments(values, indices, periods_per_year=252):
+    # pairwise-complete mean and covariance for a stack of resamples at once,
+    # matching DataFrame.mean / DataFrame.cov on each resampled history
+    sample = values[indices]
+    mask = ~np.isnan(sample)
+    x = np.where(mask, sample, 0.0)
+    m = mask.astype(float)
+
+    counts = m.sum(axis=1)
+    means = x.sum(axis=1) / counts
+
+    n = np.einsum('sti,stj->sij', m, m)
+    sum_x = np.einsum('sti,stj->sij', x, m)
+    sum_xy = np.einsum('sti,stj->sij', x, x)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = (sum_xy - sum_x * np.swapaxes(sum_x, 1, 2) / n) / (n - 1)
+    return means * periods_per_year, cov * periods_per_year
+
+def _bootstrap_chunk(seed_sequence, n_samples, values, block_length, min_weight, max_weight):
+    rng = np.random.default_rng(seed_sequence)
+    indices = block_bootstrap_indices(values.shape[0], block_length, n_samples, rng)
+    means, covs = resampled_moments(values, indices)
+
+    n_assets = values.shape[1]
+    weights = np.zeros((n_samples, n_assets))
+    stats = np.zeros((n_samples, 3))
+    for s in range(n_samples):
+        w = max_sharpe_weights(means[s], covs[s], min_weight, max_weight)
+        portfolio_return = w @ means[s]
+        portfolio_volatility = np.sqrt(w @ covs[s] @ w)
+        weights[s] = w
+        stats[s] = portfolio_return, portfolio_volatility, portfolio_return / portfolio_volatility
+    return weights, stats
+
+def bootstrap_max_sharpe(returns_data, n_resamples=500, block_length=20, seed=DEFAULT_SEED, n_workers=1,
+                         chunk_size=25, confidence=0.90, min_weight=0.0, max_weight=1.0):
+    values = returns_data.to_numpy(dtype=float)
+    codes = list(returns_data.columns)
+
+    # one child seed per fixed-size chunk, so results do not depend on the worker count
+    chunks = run_chunked(_bootstrap_chunk, seed, n_resamples, chunk_size,
+                         values, block_length, min_weight, max_weight,
+                         stream='bootstrap_max_sharpe', n_workers=n_workers)
+
+    weights = np.vstack([chunk[0] for chunk in chunks])
+    stats = np.vstack([chunk[1] for chunk in chunks])
+
+    lower_q, upper_q = (1 - confidence) / 2, 1 - (1 - confidence) / 2
+    weight_intervals = pd.DataFrame({
+        'Lower': np.quantile(weights, lower_q, axis=0),
+        'Median': np.median(weights, axis=0),
+        'Upper': np.quantile(weights, upper_q, axis=0),
+        'Michaud Average': weights.mean(axis=0)
+    }, index=codes)
+
+    stats_df = pd.DataFrame(stats, columns=['Return', 'Volatility', 'Sharpe'])
+    stat_intervals = pd.DataFrame({
+        'Lower': stats_df.quantile(lower_q),
+        'Median': stats_df.median(),
+        'Upper': stats_df.quantile(upper_q)
+    })
+
+    return {
+        'weights': pd.DataFrame(weights, columns=codes),
+        'stats': stats_df,
+        'weight_intervals': weight_intervals,
+        'stat_intervals': stat_intervals,
+        'michaud_weights': weight_intervals['Michaud Average'],
+        'confidence': confidence
+    }
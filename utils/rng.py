@@ -0,0 +1,38 @@
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+DEFAULT_SEED = 42
+
+# Every stochastic computation draws from a stream derived from (seed, name, key...).
+# Streams are independent SeedSequence children, so work can be split into fixed-size
+# chunks and run on any number of workers with bit-identical combined results.
+
+def _key(part):
+    # stable across processes and Python runs, unlike hash()
+    return zlib.crc32(str(part).encode('utf-8'))
+
+def seed_sequence(seed=DEFAULT_SEED, stream=None, *keys):
+    spawn_key = tuple(_key(part) for part in ((stream,) + keys if stream is not None else keys))
+    return np.random.SeedSequence(seed, spawn_key=spawn_key)
+
+def generator(seed=DEFAULT_SEED, stream=None, *keys):
+    return np.random.default_rng(seed_sequence(seed, stream, *keys))
+
+def chunk_sizes(n_items, chunk_size):
+    return [min(chunk_size, n_items - start) for start in range(0, n_items, chunk_size)]
+
+def chunk_streams(seed, n_items, chunk_size, stream=None):
+    # one child per fixed-size chunk; the chunking, not the worker count, defines the streams
+    sizes = chunk_sizes(n_items, chunk_size)
+    return list(zip(seed_sequence(seed, stream).spawn(len(sizes)), sizes))
+
+def run_chunked(func, seed, n_items, chunk_size, *args, stream=None, n_workers=1):
+    # func(seed_sequence, size, *args) for every chunk, results returned in chunk order
+    streams = chunk_streams(seed, n_items, chunk_size, stream)
+    jobs = [(sequence, size) + args for sequence, size in streams]
+    if n_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(func, *zip(*jobs)))
+    return [func(*job) for job in jobs]
@@ -0,0 +1,269 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import PERIODS_PER_YEAR
+from utils.rng import DEFAULT_SEED, generator
+
+GARCH_ALPHAS = np.linspace(0.02, 0.20, 7)
+GARCH_BETAS = np.linspace(0.75, 0.97, 8)
+REBUILD_FRACTION = 0.1          # rebuild once sessions since the GARCH targets exceed this share of their sample
+
+SCREEN_COLUMNS = [
+    'Annual Return', 'Annual Volatility', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown',
+    'GARCH Persistence', 'ADV (CNY)', 'Amihud', 'Avg Correlation', 'Sessions',
+]
+
+# The index is a dict of per-ticker columns plus the running state they are derived from:
+# sums, squares, downside squares, wealth and peak, and one GARCH(1,1) variance and
+# log-likelihood per (alpha, beta) grid point. Refreshing with new sessions advances that
+# state over the new rows only. The average correlation comes from N x N cross-products of
+# the build sample plus the sessions appended since, so a refresh touches only the new rows
+# and the cross-products are recomputed by a rebuild. The returns block is kept (float32,
+# zero-filled, with a mask) for the O(T x N) correlation to a portfolio. Queries are boolean
+# masks and argpartition over the columns.
+# The GARCH grid's variance target and demeaning come from the build sample, so a refreshed
+# grid drifts from a fresh build; refreshes rebuild once the sessions added since the build
+# exceed REBUILD_FRACTION of it. A refresh returns a new dict and leaves its input untouched,
+# so an index shared across sessions can be swapped rather than mutated under readers.
+
+def _garch_grid():
+    alpha, beta = np.meshgrid(GARCH_ALPHAS, GARCH_BETAS, indexing='ij')
+    stationary = alpha + beta < 0.999
+    return alpha[stationary], beta[stationary]
+
+def _accumulate(index, x, observed):
+    # advance every running statistic over a block of new sessions; arrays are replaced,
+    # never updated in place, so a shallow copy of the index keeps the previous state intact
+    index['n'] = index['n'] + observed.sum(axis=0)
+    index['sum'] = index['sum'] + x.sum(axis=0)
+    index['squares'] = index['squares'] + (x * x).sum(axis=0)
+    index['downside'] = index['downside'] + (np.minimum(x, 0.0)**2).sum(axis=0)
+
+    # halted sessions leave wealth unchanged
+    wealth = index['wealth'] * np.cumprod(1.0 + x, axis=0)
+    peak = np.maximum(index['peak'], np.maximum.accumulate(wealth, axis=0))
+    index['max_drawdown'] = np.minimum(index['max_drawdown'], (wealth / peak - 1.0).min(axis=0))
+    index['wealth'], index['peak'] = wealth[-1], peak[-1]
+
+    # every grid point for every ticker in one (G x N) recursion; variance targeting fixes
+    # omega at build time, so a refresh continues the same filter
+    garch = index['garch']
+    alpha, beta = garch['alpha'][:, None], garch['beta'][:, None]
+    for row, mask in zip(x - garch['mean'], observed):
+        variance = garch['variance']
+        garch['loglik'] = garch['loglik'] - 0.5 * np.where(mask, np.log(variance) + row * row / variance, 0.0)
+        garch['variance'] = np.where(mask, garch['omega'] + alpha * row * row + beta * variance, variance)
+
+def _derive(index, periods_per_year=PERIODS_PER_YEAR):
+    n = index['n'].astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = index['sum'] / n
+        std = np.sqrt(np.maximum(index['squares'] - index['sum']**2 / n, 0.0) / (n - 1))
+        annual_return = mean * periods_per_year
+        annual_volatility = std * np.sqrt(periods_per_year)
+        best = np.argmax(index['garch']['loglik'], axis=0)
+        persistence = index['garch']['alpha'][best] + index['garch']['beta'][best]
+
+        # average pairwise correlation from standardized returns z = m (x - mean) / std:
+        # sum_j z_i.z_j expands into the build cross-products plus the appended rows, so no
+        # pass over the history is needed; each pair's overlap is approximated by ticker i's
+        # sessions
+        valid = std > 0
+        scale = np.where(valid, 1.0 / std, 0.0)
+        shift = np.where(valid, mean * scale, 0.0)
+        cross = index['cross']
+        products = (cross['xx'] @ scale - cross['xm'] @ shift
+                    - mean * (cross['xm'].T @ scale) + mean * (cross['mm'] @ shift))
+        appended = index['appended']
+        total = appended['x'] @ scale - appended['observed'] @ shift
+        products += appended['x'].T @ total - mean * (appended['observed'].T @ total)
+        self_products = scale**2 * (index['squares'] - index['sum']**2 / n)
+        average_correlation = np.where(valid, (scale * products - self_products) / (n - 1) / max(len(n) - 1, 1), np.nan)
+
+        index['columns'] = {
+            'Annual Return': annual_return,
+            'Annual Volatility': annual_volatility,
+            'Sharpe Ratio': np.where(annual_volatility > 0, annual_return / annual_volatility, 0.0),
+            'Sortino Ratio': annual_return / np.sqrt(index['downside'] / n * periods_per_year),
+            'Max Drawdown': index['max_drawdown'],
+            'GARCH Persistence': np.where(n > 1, persistence, np.nan),
+            'ADV (CNY)': index['liquidity']['ADV (CNY)'],
+            'Amihud': index['liquidity']['Amihud'],
+            'Avg Correlation': average_correlation,
+            'Sessions': n,
+        }
+
+def _liquidity_columns(codes, liquidity):
+    if liquidity is None:
+        return {'ADV (CNY)': np.full(len(codes), np.nan), 'Amihud': np.full(len(codes), np.nan)}
+    liquidity = liquidity.reindex(codes)
+    return {column: liquidity[column].to_numpy(dtype=float) for column in ('ADV (CNY)', 'Amihud')}
+
+def _cross_products(x, observed):
+    # x'x, x'm and m'm: enough to standardize the sample with any later mean and std
+    mask = observed.astype(float)
+    return {'xx': x.T @ x, 'xm': x.T @ mask, 'mm': mask.T @ mask}
+
+def build_screening_index(returns_data, liquidity=None):
+    start = time.perf_counter()
+    codes = list(returns_data.columns)
+    values = returns_data.to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    x = np.where(observed, values, 0.0)
+    n_obs = observed.sum(axis=0)
+
+    # variance target and demeaning from the build sample
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n_obs > 0, x.sum(axis=0) / np.maximum(n_obs, 1), 0.0)
+        variance = ((np.where(observed, values - mean, 0.0))**2).sum(axis=0) / np.maximum(n_obs - 1, 1)
+    variance = np.where(variance > 0, variance, np.nanmedian(np.where(variance > 0, variance, np.nan)) if (variance > 0).any() else 1e-4)
+    alpha, beta = _garch_grid()
+    omega = (1 - alpha - beta)[:, None] * variance[None, :]
+
+    index = {
+        'codes': codes,
+        'position': {code: j for j, code in enumerate(codes)},
+        'dates': returns_data.index,
+        'returns': x.astype(np.float32),
+        'observed': observed,
+        'n': np.zeros(len(codes), dtype=np.int64),
+        'sum': np.zeros(len(codes)),
+        'squares': np.zeros(len(codes)),
+        'downside': np.zeros(len(codes)),
+        'wealth': np.ones(len(codes)),
+        'peak': np.zeros(len(codes)),   # the first session's wealth is the first peak, as in metrics
+        'max_drawdown': np.zeros(len(codes)),
+        'cross': _cross_products(x, observed),
+        'appended': {'x': np.zeros((0, len(codes))), 'observed': np.zeros((0, len(codes)))},
+        'garch': {
+            'alpha': alpha,
+            'beta': beta,
+            'mean': mean,
+            'omega': omega,
+            'variance': np.tile(variance, (len(alpha), 1)),
+            'loglik': np.zeros((len(alpha), len(codes))),
+        },
+        'liquidity': _liquidity_columns(codes, liquidity),
+    }
+    _accumulate(index, x, observed)
+    _derive(index)
+    index['target_sessions'] = len(returns_data)
+    index['build_s'] = time.perf_counter() - start
+    index['refresh_s'] = 0.0
+    return index
+
+def refresh_screening_index(index, returns_data, liquidity=None):
+    # appends the sessions after the last indexed date into a new index; a changed universe,
+    # or enough new sessions to move the GARCH targets, is a rebuild
+    if list(returns_data.columns) != index['codes']:
+        return build_screening_index(returns_data, liquidity), len(returns_data)
+    new = returns_data.loc[returns_data.index > index['dates'][-1]]
+    if len(index['dates']) + len(new) - index['target_sessions'] > REBUILD_FRACTION * index['target_sessions']:
+        return build_screening_index(returns_data, liquidity), len(new)
+    index = dict(index, garch=dict(index['garch']))
+    if liquidity is not None:
+        index['liquidity'] = _liquidity_columns(index['codes'], liquidity)
+    if new.empty:
+        return index, 0
+
+    start = time.perf_counter()
+    values = new.to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    x = np.where(observed, values, 0.0)
+    _accumulate(index, x, observed)
+    index['dates'] = index['dates'].append(new.index)
+    index['returns'] = np.vstack([index['returns'], x.astype(np.float32)])
+    index['observed'] = np.vstack([index['observed'], observed])
+    index['appended'] = {'x': np.vstack([index['appended']['x'], x]),
+                         'observed': np.vstack([index['appended']['observed'], observed])}
+    _derive(index)
+    index['refresh_s'] = time.perf_counter() - start
+    return index, len(new)
+
+def correlation_to_portfolio(index, weights):
+    # pairwise-complete correlation of every ticker with the portfolio's return series
+    weights = pd.Series(weights, dtype=float)
+    columns = [index['position'][code] for code in weights.index if code in index['position']]
+    if not columns:
+        return np.full(len(index['codes']), np.nan)
+    w = weights[[code for code in weights.index if code in index['position']]].to_numpy()
+    portfolio = index['returns'][:, columns].astype(float) @ w
+    mask = index['observed'].astype(np.float32)
+    n = mask.sum(axis=0).astype(float)
+    p = portfolio.astype(np.float32)
+    sum_x = index['returns'].sum(axis=0, dtype=float)
+    sum_p = (mask.T @ p).astype(float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = ((index['returns'].T @ p).astype(float) - sum_x * sum_p / n) / (n - 1)
+        var_p = ((mask.T @ (p * p)).astype(float) - sum_p**2 / n) / (n - 1)
+        var_x = (index['squares'] - index['sum']**2 / index['n']) / (n - 1)
+        return cov / np.sqrt(var_p * var_x)
+
+def screening_frame(index, extra=None):
+    frame = pd.DataFrame(index['columns'], index=pd.Index(index['codes'], name='Stock'))
+    for name, values in (extra or {}).items():
+        frame[name] = values
+    return frame
+
+def screen(index, filters=None, sort_by='Sharpe Ratio', top_k=20, ascending=False, extra=None):
+    # filters: {column: (low, high)}, either bound may be None; NaN never passes a bound
+    columns = dict(index['columns'], **(extra or {}))
+    keep = np.ones(len(index['codes']), dtype=bool)
+    for column, (low, high) in (filters or {}).items():
+        values = columns[column]
+        if low is not None:
+            keep &= values >= low
+        if high is not None:
+            keep &= values <= high
+
+    candidates = np.flatnonzero(keep & ~np.isnan(columns[sort_by]))
+    key = columns[sort_by][candidates] * (1 if ascending else -1)
+    if top_k is not None and top_k < len(candidates):
+        head = np.argpartition(key, top_k)[:top_k]
+        candidates, key = candidates[head], key[head]
+    order = candidates[np.argsort(key, kind='stable')]
+
+    frame = pd.DataFrame({name: values[order] for name, values in columns.items()},
+                         index=pd.Index([index['codes'][j] for j in order], name='Stock'))
+    return frame, int(keep.sum())
+
+# ---- scale check ----
+
+def synthetic_returns(n_tickers=3000, n_sessions=750, seed=DEFAULT_SEED):
+    # one market factor, heterogeneous volatility and some late listings and halts
+    rng = generator(seed, 'screener_benchmark')
+    betas = rng.uniform(0.5, 1.5, n_tickers)
+    vols = rng.uniform(0.01, 0.04, n_tickers)
+    market = rng.standard_normal(n_sessions) * 0.012
+    returns = market[:, None] * betas + rng.standard_t(5, (n_sessions, n_tickers)) * vols / np.sqrt(5 / 3)
+    listing = rng.integers(0, n_sessions // 3, n_tickers) * (rng.random(n_tickers) < 0.2)
+    returns[np.arange(n_sessions)[:, None] < listing] = np.nan
+    returns[rng.random(returns.shape) < 0.005] = np.nan
+    dates = pd.bdate_range('2022-01-03', periods=n_sessions)
+    return pd.DataFrame(returns, index=dates, columns=[f"{j:06d}" for j in range(n_tickers)])
+
+def screening_benchmark(n_tickers=3000, n_sessions=750, new_sessions=5, repeats=20, seed=DEFAULT_SEED):
+    returns_data = synthetic_returns(n_tickers, n_sessions + new_sessions, seed)
+    index = build_screening_index(returns_data.iloc[:n_sessions])
+    index, _ = refresh_screening_index(index, returns_data)
+    weights = pd.Series(1 / 20, index=returns_data.columns[:20])
+    filters = {'Annual Volatility': (None, 0.30), 'Sharpe Ratio': (0.8, None)}
+
+    def timed(func):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            func()
+        return (time.perf_counter() - start) / repeats * 1000
+
+    correlation = correlation_to_portfolio(index, weights)
+    return {
+        'Tickers': n_tickers,
+        'Sessions': n_sessions + new_sessions,
+        'Build (s)': index['build_s'],
+        f'Refresh {new_sessions} Sessions (ms)': index['refresh_s'] * 1000,
+        'Portfolio Correlation (ms)': timed(lambda: correlation_to_portfolio(index, weights)),
+        'Filter + Top-20 (ms)': timed(lambda: screen(index, dict(filters, **{'Portfolio Correlation': (None, 0.3)}),
+                                                     top_k=20, extra={'Portfolio Correlation': correlation})),
+    }
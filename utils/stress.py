@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from utils.optimizer import board_of
+
+# windows taken from the loaded price history (start and end are inclusive sessions)
+HISTORICAL_SCENARIOS = {
+    '2018 Sell-off': ('2018-01-29', '2019-01-03'),
+    '2020 COVID Crash': ('2020-01-14', '2020-03-23'),
+}
+
+def historical_scenario(name, returns_data, start, end):
+    daily = returns_data.loc[pd.Timestamp(start):pd.Timestamp(end)]
+    if daily.empty:
+        raise ValueError(f"No sessions between {start} and {end}")
+
+    # stocks not yet listed in the window take the cross-sectional median move
+    listed = daily.notna().any()
+    growth = (1 + daily.fillna(0)).cumprod()
+    shocks = growth.iloc[-1] - 1
+    shocks[~listed] = shocks[listed].median()
+    growth.loc[:, ~listed] = growth.loc[:, listed].median(axis=1).to_numpy()[:, None]
+
+    return {
+        'name': name,
+        'kind': 'historical',
+        'start': daily.index[0],
+        'end': daily.index[-1],
+        'shocks': shocks,
+        'growth': growth,
+        'proxied': list(shocks.index[~listed]),
+    }
+
+def hypothetical_scenario(name, codes, market_shock, betas=None, board_shocks=None, stock_shocks=None):
+    # market move scaled by each stock's beta, plus any board-level and single-name moves on top
+    betas = pd.Series(1.0, index=codes) if betas is None else betas.reindex(codes).fillna(1.0)
+    shocks = betas * market_shock
+    for board, shock in (board_shocks or {}).items():
+        members = [code for code in codes if board_of(code) == board]
+        shocks[members] += shock
+    for code, shock in (stock_shocks or {}).items():
+        shocks[code] += shock
+
+    return {
+        'name': name,
+        'kind': 'hypothetical',
+        'start': None,
+        'end': None,
+        'shocks': shocks.clip(lower=-1.0),
+        'growth': None,
+        'proxied': [],
+    }
+
+def scenario_matrix(scenarios):
+    # N stocks x K scenarios
+    return pd.DataFrame({scenario['name']: scenario['shocks'] for scenario in scenarios})
+
+def apply_scenarios(weights, shocks):
+    # P portfolios x K scenarios in one product
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    return pd.DataFrame(weights @ shocks.to_numpy(), columns=shocks.columns)
+
+def window_drawdowns(weights, scenario):
+    # buy-and-hold value of every portfolio through the window, then its deepest fall
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+    if scenario['growth'] is None:
+        return np.minimum(weights @ scenario['shocks'].to_numpy(), 0.0)
+    values = scenario['growth'].to_numpy() @ weights.T
+    values = np.vstack([np.ones(values.shape[1]), values])
+    return (values / np.maximum.accumulate(values, axis=0) - 1).min(axis=0)
+
+def loss_distribution(pnl, percentiles=(5, 25, 50)):
+    summary = {'Worst': pnl.min()}
+    for p in percentiles:
+        summary[f'P{p}'] = pnl.quantile(p / 100)
+    summary['Best'] = pnl.max()
+    summary['Share Losing'] = (pnl < 0).mean()
+    return pd.DataFrame(summary)
+
+def worst_names(weights, shocks, top=5):
+    contributions = pd.Series(np.asarray(weights, dtype=float) * shocks.to_numpy(), index=shocks.index)
+    worst = contributions.nsmallest(top)
+    return pd.DataFrame({
+        'Stock': worst.index,
+        'Weight': np.asarray(weights, dtype=float)[shocks.index.get_indexer(worst.index)],
+        'Stock Move': shocks[worst.index].to_numpy(),
+        'P&L Contribution': worst.to_numpy(),
+    })
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# SSE and SZSE share one trading calendar, so the master index is the union of
+# every session seen in the loaded histories. Each ticker keeps an int32 column
+# mapping calendar position -> row in its own DataFrame (-1 when it did not trade).
+
+def build_trading_calendar(stocks):
+    codes = list(stocks.keys())
+    all_dates = [df.index.to_numpy(dtype='datetime64[ns]') for df in stocks.values()]
+    dates = pd.DatetimeIndex(np.unique(np.concatenate(all_dates)) if all_dates else [])
+
+    row_map = np.full((len(dates), len(codes)), -1, dtype=np.int32)
+    listing = np.zeros(len(codes), dtype=np.int32)
+    last = np.zeros(len(codes), dtype=np.int32)
+    for j, code in enumerate(codes):
+        positions = dates.get_indexer(stocks[code].index)
+        row_map[positions, j] = np.arange(len(positions), dtype=np.int32)
+        listing[j] = positions.min() if len(positions) else 0
+        last[j] = positions.max() if len(positions) else -1
+
+    # as-of map: the latest row on or before each session (rows only increase, so a running max)
+    asof_map = np.maximum.accumulate(row_map, axis=0)
+
+    return {
+        'dates': dates,
+        'codes': codes,
+        'position': {date: i for i, date in enumerate(dates)},
+        'column': {code: j for j, code in enumerate(codes)},
+        'row_map': row_map,
+        'asof_map': asof_map,
+        'listing': listing,
+        'last': last,
+    }
+
+def locate(calendar, date):
+    return calendar['position'].get(pd.Timestamp(date), -1)
+
+def row_for(calendar, code, date):
+    position = locate(calendar, date)
+    if position < 0:
+        return -1
+    return int(calendar['row_map'][position, calendar['column'][code]])
+
+def asof_positions(calendar, dates):
+    # calendar position of the last session on or before each date (-1 if before the calendar)
+    return calendar['dates'].searchsorted(pd.DatetimeIndex(dates), side='right') - 1
+
+def asof_rows(calendar, code, dates):
+    positions = asof_positions(calendar, dates)
+    rows = calendar['asof_map'][np.maximum(positions, 0), calendar['column'][code]]
+    return np.where(positions >= 0, rows, -1)
+
+def suspension_mask(calendar):
+    # sessions inside a ticker's listed life on which it did not trade
+    positions = np.arange(len(calendar['dates']))[:, None]
+    listed = (positions >= calendar['listing'][None, :]) & (positions <= calendar['last'][None, :])
+    return listed & (calendar['row_map'] < 0)
+
+def listing_mask(calendar):
+    mask = np.zeros(calendar['row_map'].shape, dtype=bool)
+    mask[calendar['listing'], np.arange(len(calendar['codes']))] = True
+    return mask
+
+def align_column(stocks, calendar, column, codes=None, asof=False):
+    codes = list(stocks.keys()) if codes is None else codes
+    columns = [calendar['column'][code] for code in codes]
+    rows = (calendar['asof_map'] if asof else calendar['row_map'])[:, columns]
+
+    values = np.full(rows.shape, np.nan)
+    for k, code in enumerate(codes):
+        source = stocks[code][column].to_numpy(dtype=float)
+        present = rows[:, k] >= 0
+        values[present, k] = source[rows[present, k]]
+    return pd.DataFrame(values, index=calendar['dates'], columns=codes)
+
+def align_series(calendar, series_by_code, codes=None):
+    # per-ticker series computed on each ticker's own sessions (fitted volatilities,
+    # residuals) placed on the master calendar by position; NaN where a ticker has no value
+    codes = list(series_by_code) if codes is None else codes
+    values = np.full((len(calendar['dates']), len(codes)), np.nan)
+    for k, code in enumerate(codes):
+        series = series_by_code[code]
+        positions = calendar['dates'].get_indexer(pd.DatetimeIndex(series.index))
+        present = positions >= 0
+        values[positions[present], k] = series.to_numpy(dtype=float)[present]
+    return pd.DataFrame(values, index=calendar['dates'], columns=codes)
+
+def returns_matrix(stocks, calendar, codes=None, suspended='nan', listing_day='nan'):
+    # suspended: 'nan' leaves halted sessions empty, 'zero' books a 0% return
+    # (the resumption day already carries the move accumulated over the halt).
+    # listing_day: 'nan' drops the first session, 'zero' keeps it at 0%, 'reported'
+    # uses the exchange-reported change (涨跌幅), which on a real listing day is
+    # measured against the offer price.
+    codes = list(stocks.keys()) if codes is None else codes
+    returns = align_column(stocks, calendar, 'Returns', codes)
+    values = returns.to_numpy(copy=True)
+    columns = [calendar['column'][code] for code in codes]
+
+    if suspended == 'zero':
+        values[suspension_mask(calendar)[:, columns]] = 0.0
+
+    first = calendar['listing'][columns]
+    if listing_day == 'nan':
+        values[first, np.arange(len(codes))] = np.nan
+    elif listing_day == 'zero':
+        values[first, np.arange(len(codes))] = 0.0
+    elif listing_day == 'reported':
+        for k, code in enumerate(codes):
+            df = stocks[code]
+            if '涨跌幅' in df.columns:
+                values[first[k], k] = df['涨跌幅'].iloc[0] / 100
+
+    return pd.DataFrame(values, index=calendar['dates'], columns=codes)